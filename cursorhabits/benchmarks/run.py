@@ -0,0 +1,289 @@
+"""
+Pipeline benchmarks.
+
+Times every stage of the pipeline on a synthetic Cursor history (see
+synthetic.py): extracting the databases, normalizing, collapsing
+near-duplicates, filtering noise, each analyzer, finding repeated
+corrections, and the whole CLI run in a fresh process. Results are
+compared with stored baselines, and the run fails when a stage regresses
+by more than the tolerance.
+
+Baselines are only comparable on the machine they were recorded on, so
+re-record them with --save-baseline before comparing a change.
+
+Usage:
+    python -m benchmarks.run --size 10k
+    python -m benchmarks.run --size 100k --save-baseline
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import click
+
+from .synthetic import SIZES, generate_cursor_home, parse_size
+
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+
+# Generated datasets are kept here between runs, keyed by their parameters
+DATA_DIR = Path(tempfile.gettempdir()) / "cursorhabits-benchmarks"
+
+# Allowed slowdown against the baseline before a stage counts as regressed;
+# best-of-3 timings on a shared machine still vary by a third between runs
+DEFAULT_TOLERANCE = 0.5
+
+# Stages faster than this in the baseline are too noisy to fail a run on
+MIN_COMPARED_SECONDS = 0.1
+
+
+def dataset(bubbles: int, workspaces: int, seed: int, data_dir: Path = DATA_DIR) -> dict:
+    """
+    Get a synthetic Cursor home, generating it the first time.
+    
+    Args:
+        bubbles: Bubbles in the global database
+        workspaces: Workspace databases
+        seed: Random seed
+        data_dir: Where datasets are kept
+    
+    Returns:
+        Dictionary with 'home' and 'env' (see synthetic.cursor_user_dir)
+    """
+    home = data_dir / f"{bubbles}-w{workspaces}-s{seed}"
+    marker = home / "stats.json"
+    if not marker.exists():
+        stats = generate_cursor_home(home, bubbles, workspaces, seed)
+        marker.write_text(json.dumps({'env': stats['env'], 'bubbles': stats['bubbles'], 'bytes': stats['bytes']}))
+    return {'home': home, **json.loads(marker.read_text())}
+
+
+def best_of(repeat: int, func: Callable, setup: Optional[Callable] = None) -> tuple:
+    """
+    Time a function, keeping its fastest run.
+    
+    Args:
+        repeat: Number of runs
+        func: Function to time; called with setup's result, if any
+        setup: Untimed function preparing each run's input
+    
+    Returns:
+        (seconds, result of the last run)
+    """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_stages(repeat: int = 3) -> dict:
+    """
+    Time each pipeline stage on the Cursor history the environment points at.
+    
+    Args:
+        repeat: Runs per stage (the fastest counts)
+    
+    Returns:
+        Dictionary of stage name -> {'seconds', 'rows'}
+    """
+    from cursorhabits.corrections import find_repeated_corrections, group_conversations
+    from cursorhabits.dedupe import collapse_near_duplicates
+    from cursorhabits.executor import ANALYSIS_STAGES, MATCHER_STAGES
+    from cursorhabits.extractor import extract_messages, get_cursor_db_path
+    from cursorhabits.filters import filter_noise
+    from cursorhabits.normalize import normalize_messages
+    from cursorhabits.packs import build_matcher, load_packs
+    
+    db_path = get_cursor_db_path()
+    matcher = build_matcher(load_packs())
+    results = {}
+    
+    seconds, messages = best_of(repeat, lambda: extract_messages(db_path))
+    results['extract'] = {'seconds': seconds, 'rows': len(messages)}
+    
+    # Normalizing attaches to each message, so every run gets fresh copies
+    seconds, normalized = best_of(repeat, normalize_messages, lambda: [dict(msg) for msg in messages])
+    results['normalize'] = {'seconds': seconds, 'rows': len(messages)}
+    
+    seconds, collapsed = best_of(repeat, collapse_near_duplicates, lambda: normalized)
+    results['collapse'] = {'seconds': seconds, 'rows': len(normalized)}
+    
+    seconds, filtered = best_of(repeat, filter_noise, lambda: collapsed)
+    results['filter'] = {'seconds': seconds, 'rows': len(collapsed)}
+    
+    for name, analyzer in ANALYSIS_STAGES.items():
+        kwargs = {'matcher': matcher} if name in MATCHER_STAGES else {}
+        seconds, _ = best_of(repeat, lambda: analyzer(filtered, **kwargs))
+        results[f"analyze: {name}"] = {'seconds': seconds, 'rows': len(filtered)}
+    
+    # Every turn of each chat, as the CLI extracts them alongside the messages
+    turns = extract_messages(db_path, keep_repeats=True)
+    
+    def corrections():
+        return find_repeated_corrections(group_conversations(turns), matcher=matcher)
+    
+    seconds, found = best_of(repeat, corrections)
+    results['corrections'] = {'seconds': seconds, 'rows': len(turns)}
+    return results
+
+
+def run_cli(env: dict, repeat: int = 1) -> dict:
+    """
+    Time a whole `cursorhabits --no-llm` run in a fresh process.
+    
+    Every run starts with an empty data directory, so it pays for building
+    its indexes the way a first run does.
+    
+    Args:
+        env: Environment pointing at the Cursor history
+        repeat: Runs (the fastest counts)
+    
+    Returns:
+        {'seconds', 'rows'} for the run, where rows are messages extracted
+    """
+    best, rows = float('inf'), None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            run_env = {**os.environ, **env, 'CURSORHABITS_HOME': str(tmp / "home"), 'OPENAI_API_KEY': ''}
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "cursorhabits.cli", "--no-llm",
+                 "-o", str(tmp / "rules.md"), "--metrics-json", str(tmp / "metrics.json")],
+                cwd=tmp, env=run_env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            )
+            best = min(best, time.perf_counter() - start)
+            metrics = json.loads((tmp / "metrics.json").read_text())
+            rows = next((stage['rows'] for stage in metrics['stages'] if stage['name'] == "extract"), None)
+    return {'seconds': best, 'rows': rows}
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Find stages that got slower than their baseline allows.
+    
+    Args:
+        results: Stage name -> {'seconds', ...} from this run
+        baseline: Stage name -> {'seconds', ...} recorded earlier
+        tolerance: Allowed slowdown, as a fraction of the baseline
+    
+    Returns:
+        Names of regressed stages
+    """
+    regressed = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get('seconds')
+        if before is None or before < MIN_COMPARED_SECONDS:
+            continue
+        if result['seconds'] > before * (1 + tolerance):
+            regressed.append(name)
+    return regressed
+
+
+def load_baselines(path: Path = BASELINES_PATH) -> dict:
+    """Load stored baselines, keyed by dataset name."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_baseline(name: str, results: dict, path: Path = BASELINES_PATH):
+    """Store a run's results as the baseline for a dataset."""
+    baselines = load_baselines(path)
+    baselines[name] = {
+        'machine': f"{platform.machine()} {platform.system()}, Python {platform.python_version()}, {os.cpu_count()} CPUs",
+        'recorded_at': time.strftime("%Y-%m-%d"),
+        'stages': {stage: {'seconds': round(result['seconds'], 4), 'rows': result['rows']} for stage, result in results.items()},
+    }
+    path.write_text(json.dumps(baselines, indent=2) + "\n", encoding='utf-8')
+
+
+@click.command()
+@click.option("--size", default="10k", show_default=True, help=f"Bubbles in the dataset ({', '.join(SIZES)} or a number)")
+@click.option("--workspaces", type=click.IntRange(0), default=3, show_default=True, help="Workspace databases")
+@click.option("--seed", type=int, default=0, show_default=True, help="Dataset random seed")
+@click.option("--repeat", type=click.IntRange(1), default=3, show_default=True, help="Runs per stage (fastest counts)")
+@click.option("--no-cli", is_flag=True, help="Skip timing the whole CLI run")
+@click.option("--tolerance", type=float, default=DEFAULT_TOLERANCE, show_default=True, help="Allowed slowdown before failing")
+@click.option("--save-baseline", "save", is_flag=True, help="Store this run as the dataset's baseline")
+@click.option("--json", "json_path", type=click.Path(dir_okay=False), help="Also write the results to a JSON file")
+def main(size, workspaces, seed, repeat, no_cli, tolerance, save, json_path):
+    """Benchmark every pipeline stage on a synthetic Cursor history."""
+    from rich.console import Console
+    from rich.table import Table
+    
+    console = Console()
+    bubbles = parse_size(size)
+    name = f"{size.lower()}-w{workspaces}-s{seed}"
+    
+    with console.status(f"Preparing {bubbles:,}-bubble dataset..."):
+        data = dataset(bubbles, workspaces, seed)
+    console.print(f"[green]✓[/green] Dataset [bold]{name}[/bold] [dim]({data['bytes'] / 1e6:.0f} MB of bubbles in {data['home']})[/dim]")
+    
+    # Stages read the synthetic history, and keep their indexes out of the real data directory
+    saved_env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(data['env'])
+        os.environ['CURSORHABITS_HOME'] = tmp
+        try:
+            with console.status("Timing stages..."):
+                results = run_stages(repeat)
+            if not no_cli:
+                with console.status("Timing the full CLI run..."):
+                    results['cli'] = run_cli(data['env'], repeat=min(repeat, 2))
+        finally:
+            os.environ.clear()
+            os.environ.update(saved_env)
+    
+    baseline = load_baselines().get(name, {}).get('stages', {})
+    regressed = compare(results, baseline, tolerance)
+    
+    table = Table(title=f"Benchmarks: {name}", title_style="bold", box=None)
+    table.add_column("Stage")
+    table.add_column("Rows", justify="right")
+    table.add_column("Time", justify="right")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Change", justify="right")
+    for stage, result in results.items():
+        before = baseline.get(stage, {}).get('seconds')
+        change = ""
+        if before:
+            ratio = result['seconds'] / before - 1
+            color = "red" if stage in regressed else "green" if ratio < 0 else "dim"
+            change = f"[{color}]{ratio:+.0%}[/{color}]"
+        table.add_row(
+            stage,
+            f"{result['rows']:,}" if result['rows'] is not None else "-",
+            f"{result['seconds']:.3f}s",
+            f"{before:.3f}s" if before else "-",
+            change,
+        )
+    console.print(table)
+    
+    if json_path:
+        Path(json_path).write_text(json.dumps({'dataset': name, 'stages': results}, indent=2) + "\n", encoding='utf-8')
+    
+    if save:
+        save_baseline(name, results)
+        console.print(f"[green]✓[/green] Saved baseline for [bold]{name}[/bold]")
+    elif not baseline:
+        console.print(f"[yellow]⚠[/yellow] No baseline for {name}; record one with --save-baseline")
+    elif regressed:
+        console.print(f"[red]✗[/red] {len(regressed)} stages slower than baseline by over {tolerance:.0%}: {', '.join(regressed)}")
+        raise SystemExit(1)
+    else:
+        console.print(f"[green]✓[/green] No stage slower than baseline by over {tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
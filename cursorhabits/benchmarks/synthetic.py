@@ -0,0 +1,332 @@
+"""
+Synthetic Cursor history generator.
+
+Builds a fake Cursor home directory whose databases look like a real
+user's: a global state.vscdb with composerData:* and bubbleId:* rows, and
+workspace databases with their workspace.json. Chats alternate user and
+assistant bubbles with realistic blob sizes (rich text, context and code
+blocks), and user messages mix habitual instructions, one-off requests and
+noise (stack traces, logs, pasted code, filler) in proportions like real
+histories. The same seed always produces the same databases.
+
+Usage:
+    python -m benchmarks.synthetic /tmp/cursor-home --bubbles 100k --workspaces 5
+"""
+
+import json
+import platform
+import random
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import click
+
+
+# Named dataset sizes, in bubbles in the global database
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+USER, ASSISTANT = 1, 2
+
+# Share of user messages of each kind
+MESSAGE_MIX = {'habit': 0.25, 'request': 0.4, 'noise': 0.35}
+
+# Share of each workspace's chats also stored in its own database, as older
+# Cursor versions did
+WORKSPACE_COPY_SHARE = 0.1
+
+HISTORY_DAYS = 180
+
+INSERT_BATCH = 5_000
+
+# Instructions users give over and over, in the phrasings they retype them in
+HABITS = [
+    ["push to github", "push to github pls", "Push the changes to GitHub", "commit and push to github when done"],
+    ["deploy to vercel and test on the production url, not local", "test it live on vercel", "skip local, deploy it"],
+    ["update the readme with the current state", "update the docs after this", "make sure the README is up to date"],
+    ["check how it looks on mobile", "make sure it's responsive on phone", "test on mobile before finishing"],
+    ["no fallbacks, throw errors clearly", "don't add silent fallbacks", "no try catch that swallows errors"],
+    ["think before you implement, explain your plan first", "plan it first before you build anything"],
+    ["add the api key to .env", "put the secret in the environment variables", "save this token in .env"],
+    ["be concise", "keep it brief, don't over explain", "shorter answers please, less text"],
+    ["verify the data calculations", "double check the math", "make sure the data is correct"],
+    ["comment the code so other devs understand it", "document this function properly"],
+    ["think about it from the user perspective", "how would a real user see this?"],
+    ["clean up the dead code", "refactor and remove dead code", "archive the old components, clean up"],
+]
+
+REQUEST_VERBS = ["add", "fix", "build", "change", "wire up", "rework", "speed up", "rename", "move", "split"]
+REQUEST_OBJECTS = [
+    "the login form", "the pricing table", "the settings page", "the search bar", "the dashboard chart",
+    "the onboarding flow", "the checkout button", "the sidebar navigation", "the user profile card",
+    "the notifications panel", "the data export", "the API client", "the billing webhook", "the dark mode toggle",
+]
+REQUEST_DETAILS = [
+    "so it matches the design", "using the existing hooks", "without breaking the tests", "for the new plan tiers",
+    "and keep the old behavior behind a flag", "so it loads faster", "like we discussed", "with proper validation",
+]
+
+FILLER = ["ok", "continue", "yes", "perfect", "thanks!", "go ahead", "looks good", "hmm", "do it", "sounds good"]
+
+CODE_SNIPPET = '''```tsx
+export function {name}({{ items }}: Props) {{
+  const [open, setOpen] = useState(false);
+  const sorted = useMemo(() => items.sort((a, b) => a.rank - b.rank), [items]);
+  return (
+    <div className="flex flex-col gap-2">
+      {{sorted.map((item) => <Row key={{item.id}} item={{item}} onClick={{() => setOpen(!open)}} />)}}
+    </div>
+  );
+}}
+```'''
+
+
+def _stack_trace(rng: random.Random) -> str:
+    """A pasted JavaScript error with its stack."""
+    frames = "\n".join(
+        f"    at {rng.choice(['render', 'fetchData', 'handleClick', 'useEffect', 'commitRoot'])}."
+        f"{rng.choice(['call', 'apply', 'next'])} (src/components/{rng.choice(REQUEST_OBJECTS).split()[-1]}.tsx:"
+        f"{rng.randint(1, 400)}:{rng.randint(1, 80)})"
+        for _ in range(rng.randint(3, 12))
+    )
+    return f"TypeError: Cannot read properties of undefined (reading '{rng.choice(['map', 'id', 'length'])}')\n{frames}"
+
+
+def _build_log(rng: random.Random) -> str:
+    """Pasted build or dev server output."""
+    lines = [
+        f"[{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}] "
+        f"{rng.choice(['INFO', 'WARN', 'ERROR'])} {rng.choice(['Compiling', 'Building', 'Bundling'])} "
+        f"{rng.choice(['app/page.tsx', 'lib/db.ts', 'components/Chart.tsx'])} ({rng.randint(10, 900)}ms)"
+        for _ in range(rng.randint(4, 30))
+    ]
+    return "\n".join(lines + [f"npm ERR! exit code {rng.randint(1, 2)}"])
+
+
+def _noise(rng: random.Random) -> str:
+    """A user message that isn't an instruction."""
+    kind = rng.random()
+    if kind < 0.35:
+        return rng.choice(FILLER)
+    if kind < 0.55:
+        return _stack_trace(rng)
+    if kind < 0.7:
+        return _build_log(rng)
+    if kind < 0.85:
+        return CODE_SNIPPET.format(name=rng.choice(["List", "Table", "Menu", "Grid"]))
+    return f"https://{rng.choice(['github.com/acme/app/pull', 'vercel.com/acme/app/deployments'])}/{rng.randint(100, 99999)}"
+
+
+def _request(rng: random.Random) -> str:
+    """A one-off task request, sometimes with a habit tacked on."""
+    text = f"{rng.choice(REQUEST_VERBS)} {rng.choice(REQUEST_OBJECTS)} {rng.choice(REQUEST_DETAILS)}"
+    if rng.random() < 0.3:
+        text += f". also {rng.choice(rng.choice(HABITS))}"
+    return text[0].upper() + text[1:]
+
+
+def _user_text(rng: random.Random) -> str:
+    """A user message drawn from MESSAGE_MIX."""
+    kind = rng.random()
+    if kind < MESSAGE_MIX['habit']:
+        text = rng.choice(rng.choice(HABITS))
+        return text.capitalize() if rng.random() < 0.5 else text
+    if kind < MESSAGE_MIX['habit'] + MESSAGE_MIX['request']:
+        return _request(rng)
+    return _noise(rng)
+
+
+def _assistant_text(rng: random.Random) -> str:
+    """An assistant reply: some explanation and a few code blocks."""
+    parts = [f"I'll {rng.choice(REQUEST_VERBS)} {rng.choice(REQUEST_OBJECTS)} {rng.choice(REQUEST_DETAILS)}."]
+    for _ in range(rng.randint(0, 4)):
+        parts.append(CODE_SNIPPET.format(name=rng.choice(["List", "Table", "Menu", "Grid", "Panel"])))
+        parts.append("This keeps the existing behavior and only changes how the items are ordered and rendered. " * rng.randint(1, 4))
+    return "\n\n".join(parts)
+
+
+def _rich_text(text: str) -> str:
+    """The editor state Cursor stores next to a user message's plain text."""
+    return json.dumps({"root": {"children": [{
+        "children": [{"detail": 0, "format": 0, "mode": "normal", "style": "", "text": line, "type": "text", "version": 1}],
+        "direction": "ltr", "format": "", "indent": 0, "type": "paragraph", "version": 1,
+    } for line in text.split("\n")], "direction": "ltr", "format": "", "indent": 0, "type": "root", "version": 1}})
+
+
+def _bubble(rng: random.Random, bubble_id: str, kind: int, created_at: int) -> dict:
+    """A bubble's stored value, with the extra fields that make real blobs large."""
+    if kind == USER:
+        text = _user_text(rng)
+        return {
+            "_v": 2, "type": USER, "bubbleId": bubble_id, "text": text, "richText": _rich_text(text),
+            "createdAt": created_at,
+            "context": {
+                "fileSelections": [
+                    {"uri": {"path": f"/home/dev/app/src/{rng.choice(REQUEST_OBJECTS).split()[-1]}.tsx"}}
+                    for _ in range(rng.randint(0, 3))
+                ],
+                "selections": [], "terminalSelections": [], "folderSelections": [],
+            },
+            "isAgentic": rng.random() < 0.6,
+        }
+    text = _assistant_text(rng)
+    return {
+        "_v": 2, "type": ASSISTANT, "bubbleId": bubble_id, "text": text, "createdAt": created_at,
+        "codeBlocks": [{"languageId": "typescriptreact", "codeBlockIdx": i} for i in range(text.count("```") // 2)],
+        "timingInfo": {"clientStartTime": created_at, "clientEndTime": created_at + rng.randint(800, 40_000)},
+        "tokenCount": {"inputTokens": rng.randint(2_000, 60_000), "outputTokens": rng.randint(50, 3_000)},
+    }
+
+
+def _create_db(path: Path) -> sqlite3.Connection:
+    """Create an empty database with Cursor's tables."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    return conn
+
+
+def cursor_user_dir(home: Path) -> tuple[Path, dict]:
+    """
+    Locate Cursor's User directory under a fake home, as the extractor looks for it.
+    
+    Args:
+        home: Fake home directory
+    
+    Returns:
+        (user_dir, env): the User directory, and the environment variables
+        that point cursorhabits at it
+    """
+    home = Path(home)
+    env = {'HOME': str(home), 'USERPROFILE': str(home)}
+    system = platform.system()
+    if system == "Darwin":
+        return home / "Library" / "Application Support" / "Cursor" / "User", env
+    if system == "Windows":
+        env['APPDATA'] = str(home / "AppData" / "Roaming")
+        return home / "AppData" / "Roaming" / "Cursor" / "User", env
+    return home / ".config" / "Cursor" / "User", env
+
+
+def generate_cursor_home(
+    home: Path,
+    bubbles: int = SIZES['10k'],
+    workspaces: int = 3,
+    seed: int = 0,
+    now: Optional[float] = None,
+) -> dict:
+    """
+    Generate a fake Cursor home with a synthetic chat history.
+    
+    Args:
+        home: Directory to use as the home directory (created if needed)
+        bubbles: Bubbles (user and assistant messages) in the global database
+        workspaces: Number of workspace databases
+        seed: Random seed; the same seed gives the same databases
+        now: Time the history ends at (defaults to now)
+    
+    Returns:
+        Dictionary with 'db_path', 'env' (see cursor_user_dir), 'bubbles',
+        'composers', 'workspace_bubbles' and 'bytes' (total blob size)
+    """
+    rng = random.Random(seed)
+    now_ms = int((now if now is not None else time.time()) * 1000)
+    user_dir, env = cursor_user_dir(home)
+    
+    workspace_dirs = []
+    for i in range(workspaces):
+        workspace_dir = user_dir / "workspaceStorage" / uuid.UUID(int=rng.getrandbits(128)).hex
+        workspace_dir.mkdir(parents=True, exist_ok=True)
+        (workspace_dir / "workspace.json").write_text(json.dumps({"folder": f"file:///home/dev/projects/project-{i}"}))
+        workspace_dirs.append(workspace_dir)
+    
+    db_path = user_dir / "globalStorage" / "state.vscdb"
+    conn = _create_db(db_path)
+    workspace_rows = [[] for _ in workspace_dirs]
+    stats = {'db_path': db_path, 'env': env, 'bubbles': 0, 'composers': 0, 'workspace_bubbles': 0, 'bytes': 0}
+    rows = []
+    
+    def flush():
+        conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", rows)
+        rows.clear()
+    
+    while stats['bubbles'] < bubbles:
+        composer_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        length = min(bubbles - stats['bubbles'], max(2, int(rng.lognormvariate(2.5, 0.8))))
+        created_at = now_ms - int(rng.uniform(0, HISTORY_DAYS) * 86_400_000)
+        workspace = rng.randrange(workspaces) if workspaces else None
+        copy_to_workspace = workspace is not None and rng.random() < WORKSPACE_COPY_SHARE
+        
+        headers = []
+        timestamp = created_at
+        for position in range(length):
+            bubble_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            kind = USER if position % 2 == 0 else ASSISTANT
+            value = json.dumps(_bubble(rng, bubble_id, kind, timestamp))
+            row = (f"bubbleId:{composer_id}:{bubble_id}", value)
+            rows.append(row)
+            if copy_to_workspace:
+                workspace_rows[workspace].append(row)
+            headers.append({"bubbleId": bubble_id, "type": kind})
+            stats['bytes'] += len(value)
+            timestamp += rng.randint(20_000, 600_000)
+        
+        rows.append((f"composerData:{composer_id}", json.dumps({
+            "_v": 3, "composerId": composer_id, "name": _request(rng)[:40],
+            "createdAt": created_at, "lastUpdatedAt": timestamp,
+            "fullConversationHeadersOnly": headers,
+        })))
+        stats['bubbles'] += length
+        stats['composers'] += 1
+        if len(rows) >= INSERT_BATCH:
+            flush()
+    
+    flush()
+    conn.commit()
+    conn.close()
+    
+    for workspace_dir, ws_rows in zip(workspace_dirs, workspace_rows):
+        ws_conn = _create_db(workspace_dir / "state.vscdb")
+        ws_conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", ws_rows)
+        ws_conn.commit()
+        ws_conn.close()
+        stats['workspace_bubbles'] += len(ws_rows)
+    
+    return stats
+
+
+def parse_size(value: str) -> int:
+    """Parse a bubble count: a number, or one of SIZES like '100k'."""
+    value = value.strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+@click.command()
+@click.argument("home", type=click.Path(file_okay=False))
+@click.option("--bubbles", default="10k", show_default=True, help="Bubbles in the global database (e.g. 10k, 100k, 1m)")
+@click.option("--workspaces", type=click.IntRange(0), default=3, show_default=True, help="Workspace databases")
+@click.option("--seed", type=int, default=0, show_default=True, help="Random seed")
+def main(home, bubbles, workspaces, seed):
+    """Generate a synthetic Cursor history under HOME."""
+    start = time.perf_counter()
+    stats = generate_cursor_home(Path(home), parse_size(bubbles), workspaces, seed)
+    click.echo(
+        f"Wrote {stats['bubbles']:,} bubbles in {stats['composers']:,} chats "
+        f"({stats['bytes'] / 1e6:.1f} MB) and {workspaces} workspace databases "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    click.echo("Run cursorhabits on it with: " + " ".join(f"{key}={value}" for key, value in stats['env'].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,16 @@ Your chat history writes your rules.
 __version__ = "0.1.0"
 __author__ = "Rohun Vora"
 
-from .extractor import extract_messages, get_cursor_db_path
-from .analyzer import analyze_patterns, find_repeated_phrases
-from .filters import filter_noise, is_instruction
+# Public names and their modules, imported on first access (PEP 562) so
+# that importing a submodule, e.g. to run the CLI, doesn't load them all
+_LAZY = {
+    "extract_messages": "extractor",
+    "get_cursor_db_path": "extractor",
+    "analyze_patterns": "analyzer",
+    "find_repeated_phrases": "analyzer",
+    "filter_noise": "filters",
+    "is_instruction": "filters",
+}
 
 __all__ = [
     "extract_messages",
@@ -20,3 +27,15 @@ __all__ = [
     "is_instruction",
 ]
 
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module(f".{_LAZY[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -4,10 +4,25 @@ Pattern analysis module.
 Detects repeated patterns, phrases, and similar messages in chat history.
 """
 
+import hashlib
+import heapq
 import re
 from collections import Counter
+from itertools import combinations
+from math import ceil
 from typing import Optional
 
+from .deadline import Deadline
+from .filters import calculate_instruction_score
+from .normalize import get_ir, jaccard, significant_words
+
+try:  # Python 3.11+
+    from re import _constants as _sre_constants
+    from re import _parser as _sre_parse
+except ImportError:
+    import sre_constants as _sre_constants
+    import sre_parse as _sre_parse
+
 
 # Pattern definitions with human-readable labels
 PATTERN_DEFINITIONS = [
@@ -25,31 +40,294 @@ PATTERN_DEFINITIONS = [
     ("clean_code", r'clean.*up|remove.*dead|archive.*old|refactor', "Code Quality"),
 ]
 
+# Words that don't make a phrase distinctive on their own
+PHRASE_STOPWORDS = {'the', 'a', 'an', 'is', 'are', 'to', 'and', 'or', 'in',
+                    'on', 'at', 'for', 'with', 'this', 'that', 'it', 'of', 'be'}
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(bits: int) -> int:
+        return bin(bits).count('1')
+
+
+_REPEATS = {
+    getattr(_sre_constants, op)
+    for op in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(_sre_constants, op)
+}
+
+
+def required_literals(regex: str, min_length: int = 2) -> Optional[list[str]]:
+    """
+    Find literals of which at least one must occur in any match of a regex.
+    
+    Used as a cheap substring prefilter before running the regex itself.
+    
+    Args:
+        regex: Regular expression source
+        min_length: Shortest literal worth prefiltering on
+        
+    Returns:
+        Sorted list of lowercase literals, or None if no useful set exists
+    """
+    try:
+        parsed = _sre_parse.parse(regex)
+    except (re.error, RecursionError):
+        return None
+    
+    options = _required_in_sequence(parsed)
+    if not options or min(len(option) for option in options) < min_length:
+        return None
+    
+    # A literal containing another literal adds nothing to the prefilter
+    options = {option.lower() for option in options}
+    return sorted(
+        option for option in options
+        if not any(other != option and other in option for other in options)
+    )
+
+
+def _required_in_sequence(items) -> Optional[list[str]]:
+    """Pick the most selective required-literal alternatives in a parsed sequence."""
+    best = None
+    run = []
+    
+    def consider(options):
+        nonlocal best
+        if options and (best is None or min(map(len, options)) > min(map(len, best))):
+            best = options
+    
+    for op, av in items:
+        if op is _sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        consider([''.join(run)] if run else None)
+        run = []
+        if op is _sre_constants.SUBPATTERN:
+            consider(_required_in_sequence(av[-1]))
+        elif op is _sre_constants.BRANCH:
+            branches = [_required_in_sequence(branch) for branch in av[1]]
+            if all(branches):
+                consider([option for branch in branches for option in branch])
+        elif op in _REPEATS and av[0] >= 1:
+            consider(_required_in_sequence(av[2]))
+    
+    consider([''.join(run)] if run else None)
+    return best
+
+
+class PatternMatcher:
+    """
+    Compiled set of pattern definitions with a literal prefilter.
+    
+    Each regex only runs on texts that contain one of its required
+    literals, so most (text, pattern) pairs cost a few substring checks.
+    Texts are expected to be lowercased already.
+    """
+    
+    def __init__(self, definitions: Optional[list[tuple]] = None):
+        self.labels = {}
+        self._entries = {}
+        for name, regex, label in definitions or []:
+            self.add(name, regex, label)
+    
+    def add(self, name: str, regex: str, label: str, flags: int = 0, literals: Optional[list] = None):
+        """
+        Add (or replace) a pattern.
+        
+        Args:
+            name: Pattern key
+            regex: Regular expression matched against lowercased text
+            label: Human-readable label
+            flags: Extra re flags
+            literals: Precomputed required_literals(regex), if available
+        """
+        if literals is None:
+            literals = required_literals(regex)
+        self.labels[name] = label
+        self._entries[name] = (re.compile(regex, flags), tuple(literals or ()))
+    
+    @property
+    def names(self) -> list[str]:
+        """Pattern names in definition order."""
+        return list(self._entries)
+    
+    def fingerprint(self) -> str:
+        """
+        Identify the patterns this matcher counts, so saved counts can be checked against it.
+        
+        Returns:
+            sha256 hex digest of each pattern's name, regex and flags
+            (labels don't change what is counted, so they are left out)
+        """
+        digest = hashlib.sha256()
+        for name, (regex, _) in sorted(self._entries.items()):
+            digest.update(f"{name}\0{regex.pattern}\0{regex.flags}\n".encode())
+        return digest.hexdigest()
+    
+    def match(self, text_lower: str) -> list[str]:
+        """
+        Find which patterns match a lowercased text.
+        
+        Args:
+            text_lower: Lowercased message text
+            
+        Returns:
+            Names of the matching patterns, in definition order
+        """
+        matched = []
+        for name, (regex, literals) in self._entries.items():
+            if literals and not any(literal in text_lower for literal in literals):
+                continue
+            if regex.search(text_lower):
+                matched.append(name)
+        return matched
+
+
+# Matcher for the built-in pattern definitions
+DEFAULT_MATCHER = PatternMatcher(PATTERN_DEFINITIONS)
+
+
+class ExampleReservoir:
+    """
+    Bounded collection of the best-scoring example messages.
+    
+    Holds at most k examples in a min-heap keyed by instruction score, so
+    memory stays O(k) no matter how many messages match. A candidate that
+    is nearly identical to a kept example replaces it only if it scores
+    higher.
+    """
+    
+    def __init__(self, k: int = 5, similarity_threshold: float = 0.8):
+        self.k = k
+        self.similarity_threshold = similarity_threshold
+        self._heap = []  # (score, -sequence, text, words)
+        self._sequence = 0
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def add(self, text: str, score: float, words: Optional[frozenset] = None) -> bool:
+        """
+        Offer an example to the reservoir.
+        
+        Args:
+            text: Example message text
+            score: Instruction score (higher is better)
+            words: Precomputed significant words of text, if available
+            
+        Returns:
+            True if the example was kept
+        """
+        self._sequence += 1
+        entry = (score, -self._sequence)
+        
+        # Cheap rejection before any similarity work
+        if len(self._heap) >= self.k and entry <= self._heap[0][:2]:
+            return False
+        
+        if words is None:
+            words = significant_words(text)
+        for i, (kept_score, _, _, kept_words) in enumerate(self._heap):
+            if jaccard(words, kept_words) >= self.similarity_threshold:
+                if score <= kept_score:
+                    return False
+                self._heap[i] = entry + (text, words)
+                heapq.heapify(self._heap)
+                return True
+        
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry + (text, words))
+        else:
+            heapq.heapreplace(self._heap, entry + (text, words))
+        return True
+    
+    def scored(self) -> list[tuple[float, str]]:
+        """Get (score, text) pairs, best first (ties in insertion order)."""
+        return [(score, text) for score, _, text, _ in sorted(self._heap, reverse=True)]
+    
+    def examples(self) -> list[str]:
+        """Get example texts, best first."""
+        return [text for _, text in self.scored()]
+
+
+def message_score(msg: dict) -> float:
+    """Get a message's instruction score, computing it if filtering didn't."""
+    score = msg.get('instruction_score')
+    if score is None:
+        score = calculate_instruction_score(msg['text'], get_ir(msg).lower)
+    return score
+
+
+def message_weight(msg: dict) -> int:
+    """Get how many original messages a (possibly collapsed) message stands for."""
+    return msg.get('occurrences', 1)
+
+
+def match_patterns(text: str, matcher: Optional[PatternMatcher] = None) -> list[str]:
+    """
+    Find which pattern definitions match a message.
+    
+    Args:
+        text: Message text (matched case-insensitively)
+        matcher: Patterns to match (defaults to PATTERN_DEFINITIONS)
+        
+    Returns:
+        Names of the matching patterns, in definition order
+    """
+    return (matcher or DEFAULT_MATCHER).match(text.lower())
+
 
-def analyze_patterns(messages: list[dict]) -> dict:
+def message_patterns(msg: dict, matcher: Optional[PatternMatcher] = None) -> list[str]:
+    """
+    Find which pattern definitions match a message, using its normalized text.
+    
+    Args:
+        msg: Message dictionary with 'text' key
+        matcher: Patterns to match (defaults to PATTERN_DEFINITIONS)
+        
+    Returns:
+        Names of the matching patterns, in definition order
+    """
+    return (matcher or DEFAULT_MATCHER).match(get_ir(msg).lower)
+
+
+def analyze_patterns(messages: list[dict], matcher: Optional[PatternMatcher] = None) -> dict:
     """
     Analyze messages for repeated instruction patterns.
     
     Args:
         messages: List of message dictionaries with 'text' key
+        matcher: Patterns to look for (defaults to PATTERN_DEFINITIONS)
         
     Returns:
         Dictionary mapping pattern names to their data (count, label, examples)
     """
-    texts = [m['text'] for m in messages]
+    matcher = matcher or DEFAULT_MATCHER
+    
+    counts = Counter()
+    reservoirs = {}
+    for msg in messages:
+        names = message_patterns(msg, matcher)
+        if not names:
+            continue
+        score = message_score(msg)
+        words = msg['ir'].words
+        weight = message_weight(msg)
+        for name in names:
+            counts[name] += weight
+            reservoirs.setdefault(name, ExampleReservoir()).add(msg['text'], score, words)
     
     patterns = {}
-    for name, regex, label in PATTERN_DEFINITIONS:
-        matches = []
-        for text in texts:
-            if re.search(regex, text.lower()):
-                matches.append(text)
-        
-        if matches:
+    for name in matcher.names:
+        if counts[name]:
+            scored = reservoirs[name].scored()  # Top 5 examples by instruction score
             patterns[name] = {
-                'count': len(matches),
-                'label': label,
-                'examples': matches[:5],  # Keep top 5 examples
+                'count': counts[name],
+                'label': matcher.labels[name],
+                'examples': [text for _, text in scored],
+                'example_scores': [score for score, _ in scored],
             }
     
     # Sort by frequency (highest first)
@@ -58,40 +336,54 @@ def analyze_patterns(messages: list[dict]) -> dict:
     return patterns
 
 
-def find_repeated_phrases(messages: list[dict], min_count: int = 3) -> list[tuple[str, int]]:
+def count_ngrams(messages: list[dict]) -> Counter:
     """
-    Find phrases that appear multiple times across messages.
+    Count candidate phrases (3-7 word n-grams) across messages.
     
     Args:
         messages: List of message dictionaries with 'text' key
-        min_count: Minimum occurrences to be considered repeated
         
     Returns:
-        List of (phrase, count) tuples, sorted by frequency
+        Counter mapping n-gram text to number of occurrences
     """
-    texts = [m['text'].lower() for m in messages]
-    
-    ngram_counter = Counter()
+    candidates = Counter()
     
-    for text in texts:
-        # Clean and tokenize
-        text = re.sub(r'[^\w\s]', ' ', text)
-        words = text.split()
+    for msg in messages:
+        words = get_ir(msg).tokens()
+        weight = message_weight(msg)
+        
+        # Character offsets of each word, so n-gram length needs no join
+        ends = [0]
+        for word in words:
+            ends.append(ends[-1] + len(word) + 1)
         
         # Extract n-grams of varying lengths (3-7 words)
         for n in range(3, 8):
             for i in range(len(words) - n + 1):
-                ngram = ' '.join(words[i:i+n])
-                
                 # Filter out very short or generic phrases
-                if len(ngram) > 15:
-                    # Skip if mostly stopwords
-                    stopwords = {'the', 'a', 'an', 'is', 'are', 'to', 'and', 'or', 'in', 
-                                'on', 'at', 'for', 'with', 'this', 'that', 'it', 'of', 'be'}
-                    ngram_words = set(ngram.split())
-                    if len(ngram_words - stopwords) >= 2:
-                        ngram_counter[ngram] += 1
+                if ends[i+n] - ends[i] - 1 > 15:
+                    candidates[' '.join(words[i:i+n])] += weight
+    
+    # Skip if mostly stopwords (checked once per distinct n-gram)
+    ngram_counter = Counter()
+    for ngram, count in candidates.items():
+        if len(set(ngram.split()) - PHRASE_STOPWORDS) >= 2:
+            ngram_counter[ngram] = count
     
+    return ngram_counter
+
+
+def select_phrases(ngram_counter: Counter, min_count: int = 3) -> list[tuple[str, int]]:
+    """
+    Pick the most repeated phrases from n-gram counts.
+    
+    Args:
+        ngram_counter: Counter from count_ngrams
+        min_count: Minimum occurrences to be considered repeated
+        
+    Returns:
+        List of (phrase, count) tuples, sorted by frequency
+    """
     # Filter by minimum count
     repeated = [(phrase, count) for phrase, count in ngram_counter.items() if count >= min_count]
     
@@ -112,56 +404,186 @@ def find_repeated_phrases(messages: list[dict], min_count: int = 3) -> list[tupl
     return filtered[:20]  # Top 20
 
 
-def cluster_similar_messages(messages: list[dict], similarity_threshold: float = 0.5) -> list[list[str]]:
+def find_repeated_phrases(messages: list[dict], min_count: int = 3) -> list[tuple[str, int]]:
+    """
+    Find phrases that appear multiple times across messages.
+    
+    Args:
+        messages: List of message dictionaries with 'text' key
+        min_count: Minimum occurrences to be considered repeated
+        
+    Returns:
+        List of (phrase, count) tuples, sorted by frequency
+    """
+    return select_phrases(count_ngrams(messages), min_count=min_count)
+
+
+def cluster_similar_messages(
+    messages: list[dict],
+    similarity_threshold: float = 0.5,
+    deadline: Optional[Deadline] = None,
+) -> list[list[str]]:
     """
     Group similar messages together using word overlap.
     
+    Each message seeds a group of the later messages similar to it, so with
+    a deadline the groups found before it passed are kept, seeded from the
+    first messages.
+    
     Args:
         messages: List of message dictionaries with 'text' key
         similarity_threshold: Minimum Jaccard similarity to group messages
+        deadline: Optional Deadline after which no new groups are started
         
     Returns:
         List of message groups (each group is a list of similar message texts)
     """
-    
-    def get_words(text: str) -> set:
-        """Extract significant words (4+ chars) from text."""
-        return set(re.findall(r'\b\w{4,}\b', text.lower()))
-    
-    def jaccard_similarity(text1: str, text2: str) -> float:
-        """Calculate Jaccard similarity between two texts."""
-        words1 = get_words(text1)
-        words2 = get_words(text2)
-        if not words1 or not words2:
-            return 0.0
-        intersection = len(words1 & words2)
-        union = len(words1 | words2)
-        return intersection / union if union > 0 else 0.0
+    words = [get_ir(msg).words for msg in messages]
+    hashes = [msg['ir'].words_hash for msg in messages]
     
     groups = []
     used = set()
     
     for i, msg1 in enumerate(messages):
+        if deadline is not None and deadline.expired():
+            break
         if i in used:
             continue
         
         group = [msg1['text']]
+        size = message_weight(msg1)
         used.add(i)
         
         for j, msg2 in enumerate(messages[i+1:], i+1):
             if j in used:
                 continue
             
-            if jaccard_similarity(msg1['text'], msg2['text']) >= similarity_threshold:
+            # Identical word sets are similar without computing the overlap
+            if (hashes[i] == hashes[j] and words[i]) or jaccard(words[i], words[j]) >= similarity_threshold:
                 group.append(msg2['text'])
+                size += message_weight(msg2)
                 used.add(j)
         
-        # Only keep groups with 2+ messages
-        if len(group) >= 2:
-            groups.append(group)
+        # Only keep groups with 2+ messages (collapsed near-duplicates count for all they stand for)
+        if size >= 2:
+            groups.append((size, group))
     
     # Sort by group size (largest first)
-    groups.sort(key=lambda x: -len(x))
+    groups.sort(key=lambda x: -x[0])
+    groups = [group for _, group in groups]
     
     return groups[:15]  # Top 15 groups
 
+
+def find_pattern_associations(
+    messages: list[dict],
+    min_support: float = 0.02,
+    min_confidence: float = 0.3,
+    max_size: int = 3,
+    matcher: Optional[PatternMatcher] = None,
+) -> dict:
+    """
+    Find habits that show up together in the same composer session.
+    
+    Each pattern is represented as a bitset over composer sessions, so the
+    support of any pattern set is the popcount of an AND of bitsets.
+    
+    Args:
+        messages: List of message dictionaries with 'text' and 'composer_id' keys
+        min_support: Minimum fraction of sessions a pattern set must appear in
+        min_confidence: Minimum confidence for an association rule
+        max_size: Largest pattern set to mine
+        matcher: Patterns to look for (defaults to PATTERN_DEFINITIONS)
+        
+    Returns:
+        Dictionary with 'sessions' (number of composers), 'itemsets' (frequent
+        pattern sets) and 'rules' (association rules sorted by lift)
+    """
+    matcher = matcher or DEFAULT_MATCHER
+    labels = matcher.labels
+    
+    # Map composer sessions to bit positions and collect hits per pattern
+    composer_index = {}
+    hits = {name: set() for name in matcher.names}
+    for msg in messages:
+        # Collapsed near-duplicates list every session they appeared in
+        composer_ids = msg.get('composer_ids') or [msg.get('composer_id')]
+        positions = [
+            composer_index.setdefault(composer_id, len(composer_index))
+            for composer_id in composer_ids if composer_id
+        ]
+        if not positions:
+            continue
+        for name in message_patterns(msg, matcher):
+            hits[name].update(positions)
+    
+    sessions = len(composer_index)
+    result = {'sessions': sessions, 'itemsets': [], 'rules': []}
+    if sessions == 0:
+        return result
+    
+    min_count = max(2, ceil(min_support * sessions))
+    
+    def to_bitset(positions: set) -> int:
+        buf = bytearray((sessions + 7) // 8)
+        for pos in positions:
+            buf[pos >> 3] |= 1 << (pos & 7)
+        return int.from_bytes(bytes(buf), 'little')
+    
+    # Level 1: frequent single patterns
+    support = {}
+    level = {}
+    for name, positions in hits.items():
+        if len(positions) >= min_count:
+            bits = to_bitset(positions)
+            level[(name,)] = bits
+            support[(name,)] = len(positions)
+    
+    # Level k: join (k-1)-sets sharing a prefix and intersect their bitsets
+    size = 1
+    while level and size < max_size:
+        next_level = {}
+        keys = sorted(level)
+        for a, b in combinations(keys, 2):
+            if a[:-1] != b[:-1]:
+                continue
+            itemset = a + (b[-1],)
+            bits = level[a] & level[b]
+            count = _popcount(bits)
+            if count >= min_count:
+                next_level[itemset] = bits
+                support[itemset] = count
+        level = next_level
+        size += 1
+    
+    for itemset, count in support.items():
+        if len(itemset) < 2:
+            continue
+        result['itemsets'].append({
+            'patterns': itemset,
+            'labels': [labels[name] for name in itemset],
+            'count': count,
+            'support': count / sessions,
+        })
+        
+        # Single-consequent rules: {rest} -> consequent
+        for consequent in itemset:
+            antecedent = tuple(name for name in itemset if name != consequent)
+            confidence = count / support[antecedent]
+            lift = confidence / (support[(consequent,)] / sessions)
+            if confidence >= min_confidence and lift > 1.0:
+                result['rules'].append({
+                    'antecedent': antecedent,
+                    'consequent': consequent,
+                    'antecedent_labels': [labels[name] for name in antecedent],
+                    'consequent_label': labels[consequent],
+                    'count': count,
+                    'support': count / sessions,
+                    'confidence': confidence,
+                    'lift': lift,
+                })
+    
+    result['itemsets'].sort(key=lambda x: (-x['count'], -len(x['patterns'])))
+    result['rules'].sort(key=lambda x: (-x['lift'], -x['confidence'], -x['count']))
+    
+    return result
@@ -10,11 +10,7 @@ import platform
 from pathlib import Path
 from typing import Optional
 
-from rich.console import Console
-from rich.prompt import Confirm
-from rich.panel import Panel
-
-console = Console()
+from .ui import console
 
 
 def get_cursor_settings_path() -> Optional[Path]:
@@ -70,6 +66,9 @@ def apply_rules(rules_path: Path, global_rules: bool = False, project_rules: boo
 
 def _apply_global_rules(rules_content: str):
     """Apply rules to global Cursor settings."""
+    from rich.panel import Panel
+    from rich.prompt import Confirm
+    
     settings_path = get_cursor_settings_path()
     
     if not settings_path:
@@ -137,6 +136,9 @@ def _apply_global_rules(rules_content: str):
 
 def _apply_project_rules(rules_content: str):
     """Apply rules to project .cursor/rules/ directory."""
+    from rich.panel import Panel
+    from rich.prompt import Confirm
+    
     rules_dir = get_project_rules_path()
     rules_file = rules_dir / "habits.mdc"
     
@@ -0,0 +1,289 @@
+"""
+Synthesis backend module.
+
+Chooses where rules are synthesized: OpenAI, or any server that speaks its
+chat completions API (such as an on-prem inference server), configured in
+~/.cursorhabits/config.toml or the environment. A backend keeps one HTTP
+client for the whole run, so repeated and batched requests reuse pooled
+keep-alive connections instead of connecting again each time.
+"""
+
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from .storage import get_data_dir
+
+
+DEFAULT_BATCH_WORKERS = 4
+
+# Seconds synthesis waits for a backend before using the basic rules
+DEFAULT_SYNTHESIS_DEADLINE = 30.0
+
+# [llm] keys of config.toml and the environment variables that override them
+CONFIG_ENV = {
+    'backend': "CURSORHABITS_LLM_BACKEND",
+    'base_url': "CURSORHABITS_LLM_BASE_URL",
+    'model': "CURSORHABITS_LLM_MODEL",
+    'api_key_env': "CURSORHABITS_LLM_API_KEY_ENV",
+}
+
+
+def get_config_path() -> Path:
+    """Get the path of the cursorhabits config file."""
+    return get_data_dir() / "config.toml"
+
+
+def load_backend_config(path: Optional[Path] = None) -> dict:
+    """
+    Read the backend settings: the [llm] table of the config file, then the environment.
+    
+    Example config.toml:
+        
+        [llm]
+        backend = "openai"                      # see BACKENDS
+        base_url = "http://gpu-box:8000/v1"     # any OpenAI-compatible server
+        model = "llama-3.1-8b-instruct"
+        api_key_env = "INFERENCE_API_KEY"       # where to read the API key from
+    
+    Args:
+        path: Config file (defaults to get_config_path())
+    
+    Returns:
+        Dictionary with any of 'backend', 'base_url', 'model' and 'api_key_env'
+    
+    Raises:
+        ValueError: If the config file can't be parsed or has unknown keys
+    """
+    path = Path(path) if path else get_config_path()
+    config = {}
+    
+    if path.exists():
+        try:
+            try:
+                import tomllib
+            except ImportError:  # Python < 3.11
+                import tomli as tomllib
+            config = dict(tomllib.loads(path.read_text(encoding='utf-8')).get('llm', {}))
+        except ImportError:
+            raise ValueError(f"{path}: reading the config needs Python 3.11+ or the 'tomli' package")
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"{path}: could not parse config ({e})")
+        
+        unknown = sorted(set(config) - set(CONFIG_ENV))
+        if unknown:
+            raise ValueError(f"{path}: unknown [llm] settings: {', '.join(unknown)}")
+    
+    for key, env in CONFIG_ENV.items():
+        if os.environ.get(env):
+            config[key] = os.environ[env]
+    
+    # The OpenAI client's own variable works too
+    if not config.get('base_url') and os.environ.get("OPENAI_BASE_URL"):
+        config['base_url'] = os.environ["OPENAI_BASE_URL"]
+    
+    return config
+
+
+class SynthesisBackend:
+    """
+    Interface of a synthesis backend: chat completion requests in, text out.
+    
+    Requests are dictionaries of OpenAI chat completion arguments (model,
+    messages, temperature, max_tokens). Subclasses implement complete and
+    stream; batches run complete on a thread pool by default.
+    """
+    
+    name = "backend"
+    
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None):
+        self.base_url = base_url
+        self.model = model
+    
+    def prepare(self, request: dict) -> dict:
+        """Get the request as it will be sent (with the configured model, if any)."""
+        return {**request, 'model': self.model} if self.model else request
+    
+    def describe(self) -> str:
+        """Short description for the CLI, e.g. "openai (llama-3 at http://gpu-box:8000/v1)"."""
+        details = " at ".join(part for part in (self.model, self.base_url) if part)
+        return f"{self.name} ({details})" if details else self.name
+    
+    def complete(self, request: dict, timeout: Optional[float] = None) -> str:
+        """
+        Run one request.
+        
+        Args:
+            request: Chat completion arguments, from prepare
+            timeout: If set, give up (without retrying) after this many seconds
+        
+        Returns:
+            The response text
+        """
+        raise NotImplementedError
+    
+    def stream(self, request: dict, timeout: Optional[float] = None):
+        """
+        Run one request, streaming the response.
+        
+        Args:
+            request: Chat completion arguments, from prepare
+            timeout: If set, give up (without retrying) after this many seconds
+        
+        Returns:
+            Async iterator of response text chunks
+        """
+        raise NotImplementedError
+    
+    async def aclose(self):
+        """Release resources stream opened on the running event loop."""
+    
+    def complete_batch(
+        self,
+        requests: list[dict],
+        timeout: Optional[float] = None,
+        max_workers: int = DEFAULT_BATCH_WORKERS,
+    ) -> list:
+        """
+        Run several requests concurrently over the backend's shared connections.
+        
+        Args:
+            requests: Chat completion arguments, from prepare
+            timeout: Per-request timeout in seconds
+            max_workers: Maximum requests in flight
+        
+        Returns:
+            Response text or the raised exception, per request, in order
+        """
+        def run(request):
+            try:
+                return self.complete(request, timeout)
+            except Exception as e:
+                return e
+        
+        if len(requests) <= 1:
+            return [run(request) for request in requests]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(run, requests))
+    
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether an error from complete may go away on retry."""
+        return False
+    
+    def close(self):
+        """Close the backend's connections."""
+
+
+class OpenAIBackend(SynthesisBackend):
+    """OpenAI, or any server that speaks its chat completions API."""
+    
+    name = "openai"
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, model: Optional[str] = None):
+        super().__init__(base_url, model)
+        from openai import OpenAI
+        
+        # Local servers usually don't check the key, but the client needs one
+        self.api_key = api_key or "not-needed"
+        self.client = OpenAI(api_key=self.api_key, base_url=base_url)
+        self._async_client = None
+    
+    def complete(self, request: dict, timeout: Optional[float] = None) -> str:
+        client = self.client.with_options(timeout=timeout, max_retries=0) if timeout else self.client
+        response = client.chat.completions.create(**request)
+        return response.choices[0].message.content
+    
+    async def stream(self, request: dict, timeout: Optional[float] = None):
+        if self._async_client is None:
+            # Async clients belong to one event loop, so this lives until aclose
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        client = self._async_client
+        if timeout:
+            client = client.with_options(timeout=timeout, max_retries=0)
+        
+        stream = await client.chat.completions.create(**request, stream=True)
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+    
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+    
+    def is_retryable(self, error: Exception) -> bool:
+        # Timeouts, connection errors, rate limits and server errors
+        from openai import APIConnectionError, APIStatusError
+        if isinstance(error, APIConnectionError):
+            return True
+        return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+    
+    def close(self):
+        self.client.close()
+
+
+# Backends by config name; factories take api_key, base_url and model
+BACKENDS: dict[str, Callable[..., SynthesisBackend]] = {
+    'openai': OpenAIBackend,
+}
+
+# Backends created so far, by settings, so a run reuses their connections
+_active = {}
+
+
+def register_backend(name: str, factory: Callable[..., SynthesisBackend]):
+    """
+    Make a backend selectable as `backend = "<name>"` in config.toml.
+    
+    Args:
+        name: Config name
+        factory: Called with api_key, base_url and model keyword arguments
+    """
+    BACKENDS[name] = factory
+
+
+def get_backend(config: Optional[dict] = None) -> Optional[SynthesisBackend]:
+    """
+    Get the configured backend, reusing it (and its connections) across calls.
+    
+    Args:
+        config: Backend settings (defaults to load_backend_config())
+    
+    Returns:
+        The backend, or None if none is available (no API key and no custom
+        base URL, or the OpenAI package isn't installed)
+    
+    Raises:
+        ValueError: If the config is invalid or names an unknown backend
+    """
+    config = load_backend_config() if config is None else config
+    name = config.get('backend', 'openai')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown synthesis backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    
+    if config.get('api_key_env'):
+        api_key = os.environ.get(config['api_key_env'])
+    else:
+        # Also check common Cursor locations
+        api_key = os.environ.get("OPENAI_API_KEY") or os.environ.get("CURSOR_OPENAI_API_KEY")
+    
+    if not api_key and not config.get('base_url'):
+        return None
+    
+    key = (name, config.get('base_url'), config.get('model'), api_key)
+    if key not in _active:
+        try:
+            _active[key] = BACKENDS[name](api_key=api_key, base_url=config.get('base_url'), model=config.get('model'))
+        except ImportError:
+            return None
+    return _active[key]
+
+
+def close_backends():
+    """Close every backend created by get_backend."""
+    for backend in _active.values():
+        backend.close()
+    _active.clear()
@@ -0,0 +1,115 @@
+"""
+Time-budgeted analysis module.
+
+Counts patterns and phrases batch by batch over the newest chats first, so
+that whenever the wall-clock budget runs out there is a usable result for
+the most recent part of the history.
+"""
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from .analyzer import PatternMatcher, cluster_similar_messages
+from .deadline import Deadline
+from .executor import run_analyzers
+from .filters import filter_noise
+from .normalize import Vocabulary, normalize_messages
+from .state import AnalysisState
+
+
+# Share of the budget kept back for associations, discovery and clustering
+# on the messages counted so far
+SECONDARY_RESERVE = 0.3
+
+# Stages that run to completion once started; both are close to linear in
+# the message count. Clustering (quadratic) runs last, up to the deadline.
+SECONDARY_STAGES = ['associations', 'discovered']
+
+
+def analyze_within_budget(
+    batches: Iterable[dict],
+    deadline: Deadline,
+    matcher: Optional[PatternMatcher] = None,
+) -> tuple[dict, dict]:
+    """
+    Analyze message batches until they run out or the deadline nears.
+    
+    The first batch is always analyzed, so even a tiny budget yields a
+    result. Associations and discovery run on everything counted so far
+    only if the deadline hasn't passed by then; clustering then gets
+    whatever time is left and stops starting new groups when it runs out.
+    
+    Args:
+        batches: Batches from extractor.iter_recent_messages, newest first
+        deadline: When to stop
+        matcher: Patterns to count (defaults to PATTERN_DEFINITIONS)
+    
+    Returns:
+        (results, coverage): results in the shape of run_analyzers plus
+        'messages' (the meaningful messages analyzed); coverage with
+        'composers', 'total', 'since', 'messages', 'complete' and 'clusters'
+        ('complete', 'truncated' or 'skipped')
+    """
+    state = AnalysisState(matcher=matcher)
+    vocab = Vocabulary()
+    analyzed = []
+    coverage = {'composers': 0, 'total': 0, 'since': None, 'messages': 0, 'complete': True, 'clusters': 'skipped'}
+    stop_counting = deadline.seconds * SECONDARY_RESERVE
+    
+    for batch in batches:
+        filtered = filter_noise(normalize_messages(batch['messages'], vocab))
+        state.update(filtered)
+        analyzed.extend(filtered)
+        coverage.update(
+            composers=batch['composers'],
+            total=batch['total'],
+            since=batch['since'] or coverage['since'],
+            messages=coverage['messages'] + len(batch['messages']),
+        )
+        if deadline.remaining() < stop_counting:
+            break
+    
+    coverage['complete'] = coverage['composers'] >= coverage['total']
+    
+    if analyzed and not deadline.expired():
+        results, _ = run_analyzers(analyzed, stages=SECONDARY_STAGES, matcher=matcher)
+    else:
+        results = {'associations': {'sessions': 0, 'itemsets': [], 'rules': []}, 'discovered': {}}
+    
+    # Messages are newest first, so a cut-short clustering keeps the newest groups
+    results['clusters'] = []
+    if analyzed and not deadline.expired():
+        results['clusters'] = cluster_similar_messages(analyzed, deadline=deadline)
+        coverage['clusters'] = 'truncated' if deadline.expired() else 'complete'
+    
+    results['patterns'] = state.patterns()
+    results['phrases'] = state.phrases()
+    results['messages'] = analyzed
+    return results, coverage
+
+
+def coverage_note(coverage: dict, budget: float) -> str:
+    """
+    Describe how much of the history a budgeted run covered.
+    
+    Args:
+        coverage: Coverage from analyze_within_budget
+        budget: The budget in seconds
+    
+    Returns:
+        One-line, human-readable note
+    """
+    clusters = {
+        'truncated': " Similar-message groups cover only the newest of them.",
+        'skipped': " Similar messages weren't grouped.",
+    }.get(coverage.get('clusters'), "")
+    
+    if coverage['complete']:
+        if clusters:
+            return f"Covers all {coverage['total']} chats, but the {budget:g}s budget ran out while grouping.{clusters}"
+        return f"Covers all {coverage['total']} chats (finished within the {budget:g}s budget)."
+    
+    note = f"Partial: covers your {coverage['composers']} most recent of {coverage['total']} chats"
+    if coverage['since']:
+        note += f" (since {datetime.fromtimestamp(coverage['since'] / 1000).strftime('%Y-%m-%d')})"
+    return note + f"; the {budget:g}s budget ran out before the rest.{clusters}"
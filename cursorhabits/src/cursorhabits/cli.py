@@ -8,37 +8,61 @@ Usage:
     cursorhabits apply        # Apply rules to Cursor settings
 """
 
+import re
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
 import click
 from pathlib import Path
 
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.table import Table
-from rich import box
-
-from .extractor import extract_messages, get_cursor_db_path
-from .filters import filter_noise
-from .analyzer import analyze_patterns, find_repeated_phrases, cluster_similar_messages
-from .synthesizer import synthesize_rules, synthesize_rules_basic
-from .output import print_results, save_rules
-from .apply import apply_rules
+# Only what --help needs is imported here; each command imports the rest,
+# so `cursorhabits apply` never loads the analysis stack or rich's tables
+from .backends import DEFAULT_SYNTHESIS_DEADLINE, close_backends
+from .ui import console, spinner
 
-console = Console()
+if TYPE_CHECKING:
+    from .deadline import Deadline
+    from .trends import PatternCube
 
 
 @click.group(invoke_without_command=True)
 @click.option("--days", type=int, default=None, help="Only analyze messages from last N days")
-@click.option("--output", "-o", default="suggested_rules.md", help="Output file for rules")
+@click.option("--output", "-o", default="suggested_rules.md",
+              help="Output file for rules (with --format json/ndjson, for the records; default stdout)")
 @click.option("--no-llm", is_flag=True, help="Skip LLM synthesis (faster, less polished)")
 @click.option("--export", type=click.Path(), help="Export raw messages to JSON")
+@click.option("--incremental", is_flag=True, help="Reuse saved pattern/phrase counts, only count new messages")
+@click.option("--state", "state_path", type=click.Path(), default=None, help="State file for --incremental")
+@click.option("--pack", "pack_paths", multiple=True, type=click.Path(exists=True), help="Extra pattern pack (TOML/JSON), repeatable")
+@click.option("--no-collapse", is_flag=True, help="Keep near-duplicate messages separate")
+@click.option("--sample", type=click.FloatRange(0, 1, min_open=True), default=None,
+              help="Analyze a random FRACTION of each chat (e.g. 0.1) and estimate counts")
+@click.option("--budget", type=click.FloatRange(0, min_open=True), default=None, metavar="SECONDS",
+              help="Stop after about SECONDS, reporting on the newest chats analyzed so far")
+@click.option("--per-workspace", is_flag=True, help="Also write a rules file for each workspace")
+@click.option("--concurrency", type=click.IntRange(1), default=None, metavar="N",
+              help="Synthesize each category as its own AI request, N at a time, streaming into the output file")
+@click.option("--llm-timeout", type=click.FloatRange(0, min_open=True), default=DEFAULT_SYNTHESIS_DEADLINE,
+              metavar="SECONDS", show_default=True,
+              help="Use the basic rules if AI synthesis takes longer than SECONDS")
+@click.option("--all-patterns", is_flag=True, help="Also write rules for habits your existing Cursor rules already cover")
+@click.option("--profile", is_flag=True, help="Show time, rows, bytes read and peak memory for each stage")
+@click.option("--metrics-json", type=click.Path(dir_okay=False), default=None, metavar="PATH",
+              help="Write per-stage metrics to PATH as JSON")
+@click.option("--format", "fmt", type=click.Choice(["text", "json", "ndjson"]), default="text", show_default=True,
+              help="json/ndjson: write results, rules and stage metrics as records instead of the terminal report")
 @click.pass_context
-def main(ctx, days, output, no_llm, export):
+def main(ctx, days, output, no_llm, export, incremental, state_path, pack_paths, no_collapse, sample, budget,
+         per_workspace, concurrency, llm_timeout, all_patterns, profile, metrics_json, fmt):
     """
     Turn your Cursor chat history into personalized rules.
     
     Run without arguments to analyze all messages and generate rules.
     """
+    # Backends pool their connections for the whole run; close them however it ends
+    ctx.call_on_close(close_backends)
+    
     # If a subcommand is invoked, don't run the default behavior
     if ctx.invoked_subcommand is not None:
         return
@@ -49,29 +73,119 @@ def main(ctx, days, output, no_llm, export):
     ctx.obj["output"] = output
     ctx.obj["no_llm"] = no_llm
     
+    if incremental and days:
+        raise click.UsageError("--incremental covers your whole history and can't be combined with --days")
+    if incremental and sample:
+        raise click.UsageError("--incremental keeps exact counts and can't be combined with --sample")
+    if budget and (incremental or sample or export or per_workspace):
+        raise click.UsageError("--budget can't be combined with --incremental, --sample, --export or --per-workspace")
+    
+    if fmt != "text":
+        if per_workspace:
+            raise click.UsageError(f"--per-workspace writes rules files and can't be combined with --format {fmt}")
+        # Records go to stdout unless -o names a file; messages go to stderr, without rich
+        if ctx.get_parameter_source("output") == click.core.ParameterSource.DEFAULT:
+            output = "-"
+        console.set_headless()
+    
     # Main analysis flow
-    run_analysis(days=days, output=output, use_llm=not no_llm, export_path=export)
+    run_analysis(
+        days=days,
+        output=output,
+        use_llm=not no_llm,
+        export_path=export,
+        incremental=incremental,
+        state_path=state_path,
+        pack_paths=pack_paths,
+        collapse=not no_collapse,
+        sample=sample,
+        budget=budget,
+        per_workspace=per_workspace,
+        concurrency=concurrency,
+        llm_timeout=llm_timeout,
+        skip_covered=not all_patterns,
+        profile=profile,
+        metrics_json=metrics_json,
+        fmt=fmt,
+    )
 
 
-def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm: bool = True, export_path: str = None):
+def run_analysis(
+    days: int = None,
+    output: str = "suggested_rules.md",
+    use_llm: bool = True,
+    export_path: str = None,
+    incremental: bool = False,
+    state_path: str = None,
+    pack_paths: tuple = (),
+    collapse: bool = True,
+    sample: float = None,
+    budget: float = None,
+    per_workspace: bool = False,
+    concurrency: int = None,
+    llm_timeout: float = DEFAULT_SYNTHESIS_DEADLINE,
+    skip_covered: bool = True,
+    profile: bool = False,
+    metrics_json: str = None,
+    fmt: str = "text",
+):
     """Run the full analysis pipeline."""
+    from .backends import get_backend
+    from .deadline import Deadline
+    from .conversations import ConversationIndex
+    from .corrections import find_repeated_corrections, group_conversations
+    from .dedupe import collapse_near_duplicates
+    from .executor import format_timings, run_analyzers
+    from .extractor import extract_messages, get_cursor_db_path, unique_by_text
+    from .filters import filter_noise
+    from .normalize import normalize_messages
+    from .packs import build_matcher, load_packs, pack_rule_templates
+    from .profiling import StageProfiler
+    from .sampling import apply_estimates, sample_report
+    from .state import AnalysisState, get_state_path
+    
+    deadline = Deadline(budget) if budget else None
+    # Records always carry stage timings; memory tracing slows the run, so only on request
+    profiler = StageProfiler(
+        enabled=profile or bool(metrics_json) or fmt != "text",
+        trace_memory=profile or bool(metrics_json),
+    )
     
     # Header
-    console.print()
-    console.print(Panel.fit(
-        "[bold]cursorhabits[/bold]\n[dim]Your chat history writes your rules[/dim]",
-        border_style="cyan",
-        padding=(0, 2),
-    ))
-    console.print()
+    if not console.headless:
+        from rich.panel import Panel
+        
+        console.print()
+        console.print(Panel.fit(
+            "[bold]cursorhabits[/bold]\n[dim]Your chat history writes your rules[/dim]",
+            border_style="cyan",
+            padding=(0, 2),
+        ))
+        console.print()
+    
+    # Load pattern packs (built-in patterns plus any team-specific ones)
+    try:
+        packs = load_packs(pack_paths)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]✗[/red] {e}")
+        raise SystemExit(1)
+    matcher = build_matcher(packs)
+    rule_templates = pack_rule_templates(packs)
+    if packs:
+        console.print(f"[green]✓[/green] Loaded [bold]{len(packs)}[/bold] pattern packs")
+    
+    # Synthesis backend (OpenAI or a configured OpenAI-compatible server), shared by every request
+    if use_llm:
+        try:
+            backend = get_backend()
+        except ValueError as e:
+            console.print(f"[red]✗[/red] {e}")
+            raise SystemExit(1)
+        if backend and backend.base_url:
+            console.print(f"[green]✓[/green] Synthesizing with [bold]{backend.describe()}[/bold]")
     
     # Step 1: Find database
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-        transient=True,
-    ) as progress:
+    with spinner() as progress, profiler.stage("find database"):
         task = progress.add_task("Finding Cursor database...", total=None)
         
         try:
@@ -82,15 +196,23 @@ def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm:
         
         progress.update(task, description=f"Found database at {db_path.parent.name}/...")
     
+    if deadline:
+        run_budgeted_analysis(
+            db_path, deadline, days, output, use_llm, matcher, rule_templates, concurrency, llm_timeout, skip_covered,
+            profiler, fmt,
+        )
+        report_metrics(profiler, profile, metrics_json)
+        return
+    
     # Step 2: Extract messages
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-        transient=True,
-    ) as progress:
+    with spinner() as progress, profiler.stage("extract") as stage:
         task = progress.add_task("Extracting messages...", total=None)
-        messages = extract_messages(db_path, days=days)
+        # Repeated corrections need every turn of each chat, including exact repeats.
+        # A sample holds only part of each chat, so sampled runs skip them.
+        find_corrections = not sample
+        turns = extract_messages(db_path, days=days, sample=sample, profiler=profiler, keep_repeats=find_corrections)
+        messages = list(unique_by_text(turns)) if find_corrections else turns
+        stage['rows'] = len(messages)
         progress.update(task, description=f"Extracted {len(messages)} messages")
     
     if not messages:
@@ -99,7 +221,9 @@ def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm:
         raise SystemExit(1)
     
     console.print(f"[green]✓[/green] Found [bold]{len(messages)}[/bold] messages", end="")
-    if days:
+    if sample:
+        console.print(f" [dim]({sample:.0%} sample{f' of the last {days} days' if days else ''})[/dim]")
+    elif days:
         console.print(f" [dim](last {days} days)[/dim]")
     else:
         console.print()
@@ -107,7 +231,6 @@ def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm:
     # Step 3: Export if requested
     if export_path:
         import json
-        from datetime import datetime
         
         export_data = {
             "exported_at": datetime.now().isoformat(),
@@ -119,17 +242,21 @@ def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm:
         console.print(f"[green]✓[/green] Exported to [bold]{export_path}[/bold]")
     
     # Step 4: Filter noise
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-        transient=True,
-    ) as progress:
+    with spinner() as progress, profiler.stage("filter", rows=len(messages)):
         task = progress.add_task("Filtering noise...", total=None)
-        filtered = filter_noise(messages)
-        removed = len(messages) - len(filtered)
+        candidates = normalized = normalize_messages(messages)
+        
+        # Incremental counts track exact messages, so near-duplicates stay separate there
+        collapse = collapse and not incremental
+        if collapse:
+            candidates = collapse_near_duplicates(candidates)
+        
+        filtered = filter_noise(candidates)
+        removed = len(candidates) - len(filtered)
         progress.update(task, description=f"Filtered {removed} noisy messages")
     
+    if len(candidates) < len(messages):
+        console.print(f"[green]✓[/green] Collapsed [bold]{len(messages) - len(candidates)}[/bold] near-duplicate messages")
     console.print(f"[green]✓[/green] Kept [bold]{len(filtered)}[/bold] meaningful messages [dim](filtered {removed} noise)[/dim]")
     
     if not filtered:
@@ -137,47 +264,407 @@ def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm:
         raise SystemExit(1)
     
     # Step 5: Analyze patterns
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-        transient=True,
-    ) as progress:
+    with spinner() as progress, profiler.stage("analyze", rows=len(filtered)):
         task = progress.add_task("Analyzing patterns...", total=None)
-        patterns = analyze_patterns(filtered)
-        phrases = find_repeated_phrases(filtered)
-        clusters = cluster_similar_messages(filtered)
+        
+        if incremental:
+            # Pattern and phrase counts come from the saved state plus new messages
+            state_file = Path(state_path) if state_path else get_state_path()
+            with profiler.stage("update state", rows=len(filtered)):
+                with AnalysisState.load(state_file, matcher=matcher) as state:
+                    new_count = state.update(filtered)
+                    state.save(state_file)
+                    counted = {'patterns': state.patterns(), 'phrases': state.phrases()}
+            results, timings = run_analyzers(
+                filtered,
+                stages=['clusters', 'associations', 'discovered'],
+                matcher=matcher,
+                profiler=profiler,
+            )
+            results.update(counted)
+        else:
+            results, timings = run_analyzers(filtered, matcher=matcher, profiler=profiler)
+        
+        # Instructions re-issued within a chat, from the turns extracted above
+        corrections = []
+        if find_corrections:
+            progress.update(task, description="Finding repeated corrections...")
+            start = time.perf_counter()
+            with profiler.stage("conversation index"), ConversationIndex() as index:
+                # Composer metadata lists each chat's bubbles in order, timestamps or not
+                index.refresh(db_path)
+                positions = index.positions({turn['composer_id'] for turn in turns})
+            with profiler.stage("corrections", rows=len(turns)):
+                corrections = find_repeated_corrections(group_conversations(turns, positions), matcher=matcher)
+            timings['corrections'] = time.perf_counter() - start
+            timings['total'] += timings['corrections']
+        
+        patterns = results['patterns']
+        phrases = results['phrases']
+        clusters = results['clusters']
+        associations = results['associations']
+        
+        # Discovered categories are treated like the built-in patterns from here on
+        patterns = dict(sorted(
+            {**patterns, **results['discovered']}.items(),
+            key=lambda x: -x[1]['count'],
+        ))
+        
+        # Scale sampled counts up to the whole history, with confidence intervals
+        phrase_intervals = None
+        if sample:
+            report = sample_report(patterns, phrases, filtered, matcher=matcher)
+            patterns, phrases = apply_estimates(patterns, phrases, report)
+            phrase_intervals = {phrase: (low, high) for phrase, _, low, high in report['phrases']}
     
     pattern_count = len(patterns)
-    console.print(f"[green]✓[/green] Detected [bold]{pattern_count}[/bold] patterns")
+    console.print(f"[green]✓[/green] Detected [bold]{pattern_count}[/bold] patterns", end="")
+    if results['discovered']:
+        console.print(f" [dim]({len(results['discovered'])} newly discovered)[/dim]")
+    else:
+        console.print()
+    if incremental:
+        console.print(f"  [dim]Counted {new_count} new messages into {state_file}[/dim]")
+    console.print(f"  [dim]{format_timings(timings)}[/dim]")
+    if sample and not console.headless:
+        from .output import print_sample_summary
+        
+        print_sample_summary(report, sample)
+    
+    if per_workspace:
+        # Partitioned before collapsing, so duplicates from different workspaces stay apart
+        with profiler.stage("per-workspace reports", rows=len(normalized)):
+            write_workspace_reports(normalized, output, use_llm, matcher, rule_templates, collapse, llm_timeout)
+    
+    write_report(
+        patterns, phrases, clusters, associations,
+        use_llm=use_llm,
+        output=output,
+        rule_templates=rule_templates,
+        phrase_intervals=phrase_intervals,
+        corrections=corrections,
+        concurrency=concurrency,
+        llm_timeout=llm_timeout,
+        matcher=matcher if skip_covered else None,
+        profiler=profiler,
+        fmt=fmt,
+    )
+    report_metrics(profiler, profile, metrics_json)
+
+
+def report_metrics(profiler, profile: bool, metrics_json: str = None):
+    """Show the run's per-stage metrics and/or write them to a JSON file."""
+    metrics = profiler.to_dict()
+    if profile and not console.headless:
+        from .output import print_profile
+        
+        print_profile(metrics)
+    if metrics_json:
+        profiler.write_json(metrics_json, metrics)
+        console.print(f"[green]✓[/green] Metrics saved to [bold]{metrics_json}[/bold]")
+    profiler.close()
+
+
+def refresh_trends(cube: "PatternCube", db_path: Path, matcher, rebuild: bool = False) -> Optional[int]:
+    """
+    Bring the trends cube up to date with the Cursor history.
+    
+    Nothing is read while no bubbles were added. Otherwise only the bubbles
+    added or rewritten since the last update are read and counted, unless
+    the cube is rebuilt (on request, or when the patterns changed).
+    
+    Args:
+        cube: The PatternCube to update
+        db_path: Path to the global state.vscdb file
+        matcher: Patterns to count
+        rebuild: Re-count the whole history
+    
+    Returns:
+        Number of messages counted, or None if the cube was already current
+    """
+    from .extractor import extract_messages, get_bubble_signature, get_composer_timestamps, get_workspace_db_paths
+    from .filters import filter_noise
+    from .normalize import normalize_messages
+    
+    # Only new bubbles change a signature; Cursor touches the files far more often
+    sources = {str(path): get_bubble_signature(path) for path in [db_path] + get_workspace_db_paths()}
+    rebuild = rebuild or cube.needs_rebuild(matcher)
+    if not rebuild and cube.is_current(sources, matcher):
+        return None
+    
+    # Every message counts on the day it was sent, repeats included
+    messages = extract_messages(db_path, keep_repeats=True, since=None if rebuild else cube.sources)
+    composer_timestamps = get_composer_timestamps(db_path)
+    if rebuild:
+        return cube.rebuild(filter_noise(normalize_messages(messages)), composer_timestamps, matcher, sources)
+    read = [(msg['composer_id'], msg['bubble_id']) for msg in messages]
+    return cube.update(filter_noise(normalize_messages(messages)), composer_timestamps, matcher, sources, read=read)
+
+
+def write_workspace_reports(
+    messages: list[dict],
+    output: str,
+    use_llm: bool,
+    matcher,
+    rule_templates: dict,
+    collapse: bool = True,
+    llm_timeout: float = DEFAULT_SYNTHESIS_DEADLINE,
+):
+    """Analyze each workspace on its own and save one rules file per workspace next to output."""
+    from .executor import run_partitioned
+    from .extractor import get_workspace_names, partition_by_workspace
+    from .llm_cache import LLMCache
+    from .output import save_rules
+    from .synthesizer import synthesize_rules_basic, synthesize_rules_batch
+    
+    partitions = partition_by_workspace(messages)
+    if not partitions:
+        console.print("[yellow]⚠[/yellow] No messages are tagged with a workspace; skipping per-workspace rules.")
+        return
+    
+    with spinner() as progress:
+        task = progress.add_task(f"Analyzing {len(partitions)} workspaces...", total=None)
+        results, elapsed = run_partitioned(partitions, matcher=matcher, collapse=collapse)
+        
+        names = get_workspace_names()
+        output_path = Path(output)
+        jobs = []
+        used = set()
+        
+        for workspace, result in sorted(results.items(), key=lambda x: -x[1]['meaningful']):
+            patterns = dict(sorted(
+                {**result['patterns'], **result['discovered']}.items(),
+                key=lambda x: -x[1]['count'],
+            ))
+            if not patterns:
+                continue
+            
+            name = names.get(workspace, workspace)
+            slug = re.sub(r'[^A-Za-z0-9._-]+', '-', name).strip('-.') or workspace
+            if slug in used:
+                slug = f"{slug}-{workspace[:8]}"
+            used.add(slug)
+            jobs.append({**result, 'patterns': patterns, 'name': name, 'slug': slug})
+        
+        # All workspaces go to the backend as one batch, over its pooled connections
+        synthesized = [None] * len(jobs)
+        if use_llm:
+            progress.update(task, description=f"Synthesizing rules for {len(jobs)} workspaces with AI...")
+            with LLMCache() as cache:
+                synthesized = synthesize_rules_batch(jobs, timeout=llm_timeout, cache=cache)
+            console.print(f"[dim]LLM cache: {cache.stats()}[/dim]")
+        
+        saved = []
+        for job, rules_content in zip(jobs, synthesized):
+            if rules_content is None:
+                rules_content = synthesize_rules_basic(job['patterns'], job['phrases'], job['associations'], rule_templates)
+            
+            path = output_path.with_name(f"{output_path.stem}.{job['slug']}{output_path.suffix}")
+            save_rules(rules_content, path)
+            saved.append((job['name'], job['meaningful'], path))
+    
+    console.print(
+        f"[green]✓[/green] Saved rules for [bold]{len(saved)}[/bold] of {len(partitions)} workspaces "
+        f"[dim]({elapsed:.2f}s)[/dim]"
+    )
+    for name, meaningful, path in saved:
+        console.print(f"  [dim]{name}: {meaningful} messages → {path}[/dim]")
+
+
+def run_budgeted_analysis(
+    db_path: Path,
+    deadline: "Deadline",
+    days: int,
+    output: str,
+    use_llm: bool,
+    matcher,
+    rule_templates: dict,
+    concurrency: int = None,
+    llm_timeout: float = DEFAULT_SYNTHESIS_DEADLINE,
+    skip_covered: bool = True,
+    profiler=None,
+    fmt: str = "text",
+):
+    """Analyze the newest chats first until the deadline, then report what was covered."""
+    from .budget import analyze_within_budget, coverage_note
+    from .extractor import iter_recent_messages
+    from .profiling import StageProfiler
+    
+    profiler = profiler or StageProfiler(enabled=False)
+    with spinner() as progress, profiler.stage("extract and analyze") as stage:
+        progress.add_task(f"Analyzing your newest chats ({deadline.seconds:g}s budget)...", total=None)
+        results, coverage = analyze_within_budget(
+            iter_recent_messages(db_path, days=days), deadline, matcher=matcher
+        )
+        stage['rows'] = len(results['messages'])
+    
+    if not results['messages']:
+        console.print("[red]✗[/red] No meaningful messages found in your Cursor history.")
+        raise SystemExit(1)
+    
+    note = coverage_note(coverage, deadline.seconds)
+    mark = "[green]✓[/green]" if coverage['complete'] and coverage['clusters'] == 'complete' else "[yellow]⚠[/yellow]"
+    console.print(f"{mark} Analyzed [bold]{len(results['messages'])}[/bold] meaningful messages")
+    console.print(f"  [dim]{note}[/dim]")
+    
+    patterns = dict(sorted(
+        {**results['patterns'], **results['discovered']}.items(),
+        key=lambda x: -x[1]['count'],
+    ))
+    
+    write_report(
+        patterns, results['phrases'], results['clusters'], results['associations'],
+        use_llm=use_llm,
+        output=output,
+        rule_templates=rule_templates,
+        note=note,
+        deadline=deadline,
+        concurrency=concurrency,
+        llm_timeout=llm_timeout,
+        matcher=matcher if skip_covered else None,
+        profiler=profiler,
+        fmt=fmt,
+    )
+
+
+def write_report(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: dict,
+    use_llm: bool,
+    output: str,
+    rule_templates: dict = None,
+    phrase_intervals: dict = None,
+    note: str = None,
+    deadline: "Deadline" = None,
+    corrections: list = None,
+    concurrency: int = None,
+    llm_timeout: float = DEFAULT_SYNTHESIS_DEADLINE,
+    matcher=None,
+    profiler=None,
+    fmt: str = "text",
+):
+    """
+    Synthesize rules, display the results and save the rules file.
+    
+    With a matcher, habits the user's existing Cursor rules already cover
+    are left out of synthesis (but still shown in the results).
+    
+    With fmt 'json' or 'ndjson', the results, rules and stage metrics are
+    written to output as records instead (see records.build_report).
+    """
+    import asyncio
+    
+    from .coverage import find_covered, read_existing_rules, uncovered
+    from .llm_cache import LLMCache
+    from .profiling import StageProfiler
+    from .synthesizer import synthesize_rules_basic, synthesize_rules_streaming, synthesize_with_deadline
+    
+    profiler = profiler or StageProfiler(enabled=False)
+    all_patterns, all_clusters = patterns, clusters
+    covered = None
+    if matcher is not None:
+        with profiler.stage("rule coverage", rows=len(patterns) + len(clusters)):
+            covered = find_covered(patterns, clusters, read_existing_rules(), matcher)
+            patterns, clusters = uncovered(patterns, clusters, covered)
+        if covered['patterns'] or covered['clusters']:
+            console.print(
+                f"[green]✓[/green] [bold]{len(covered['patterns'])}[/bold] patterns and "
+                f"[bold]{len(covered['clusters'])}[/bold] message clusters already covered by your rules "
+                f"[dim](not synthesized again; --all-patterns to include them)[/dim]"
+            )
     
     # Step 6: Synthesize rules
     console.print()
     
-    if use_llm:
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-            transient=True,
-        ) as progress:
-            task = progress.add_task("Synthesizing rules with AI...", total=None)
-            rules_content = synthesize_rules(patterns, phrases, clusters)
+    # Out of time: the basic rules are instant
+    if deadline and deadline.expired():
+        use_llm = False
+    
+    synthesis = None
+    with profiler.stage("synthesize", rows=len(patterns)):
+        if use_llm:
+            with spinner() as progress:
+                task = progress.add_task("Synthesizing rules with AI...", total=None)
+                # A --budget run only has what's left of it
+                limit = min(llm_timeout, max(deadline.remaining(), 1.0)) if deadline else llm_timeout
+                with LLMCache() as cache:
+                    if concurrency:
+                        # One request per category; the output file fills in as they stream back
+                        progress.update(task, description=f"Synthesizing rules with AI, streaming into {output}...")
+                        rules_content = asyncio.run(synthesize_rules_streaming(
+                            patterns, phrases, clusters, associations,
+                            rule_templates=rule_templates,
+                            corrections=corrections,
+                            # Records are written whole at the end
+                            output_path=output if fmt == "text" else None,
+                            max_concurrency=concurrency,
+                            timeout=limit,
+                            cache=cache,
+                        ))
+                        if rules_content is None:
+                            # LLM failed, fall back to basic
+                            rules_content = synthesize_rules_basic(patterns, phrases, associations, rule_templates, corrections)
+                            use_llm = False
+                    else:
+                        # Basic rules are built alongside and used if the AI misses the deadline
+                        rules_content, synthesis = synthesize_with_deadline(
+                            patterns, phrases, clusters, associations,
+                            rule_templates=rule_templates,
+                            corrections=corrections,
+                            deadline=limit,
+                            cache=cache,
+                        )
+                        use_llm = synthesis['source'] == 'llm'
             
-            if rules_content is None:
-                # LLM failed, fall back to basic
-                progress.update(task, description="AI unavailable, using basic synthesis...")
-                rules_content = synthesize_rules_basic(patterns, phrases)
-                use_llm = False
-    else:
-        rules_content = synthesize_rules_basic(patterns, phrases)
+            console.print(f"[dim]LLM cache: {cache.stats()}[/dim]")
+            if synthesis and not console.headless:
+                from .output import print_synthesis_stats
+                
+                print_synthesis_stats(synthesis, limit)
+        else:
+            rules_content = synthesize_rules_basic(patterns, phrases, associations, rule_templates, corrections)
+    
+    if note:
+        rules_content = rules_content.rstrip() + f"\n\n> **Coverage:** {note}\n"
+    
+    if fmt != "text":
+        from .records import build_report, write_records
+        
+        report = build_report(
+            all_patterns, phrases, all_clusters, associations,
+            rules_content=rules_content,
+            rules_source='llm' if use_llm else 'basic',
+            phrase_intervals=phrase_intervals,
+            corrections=corrections,
+            covered=covered,
+            synthesis=synthesis,
+            note=note,
+            metrics=profiler.to_dict() if profiler.enabled else None,
+        )
+        write_records(report, fmt, output)
+        if output != "-":
+            console.print(f"[green]✓[/green] Records saved to [bold]{output}[/bold]")
+        return
+    
+    from rich.panel import Panel
+    
+    from .output import print_results, save_rules
     
     # Step 7: Display results
-    print_results(patterns, phrases, use_llm=use_llm)
+    print_results(
+        all_patterns, phrases,
+        use_llm=use_llm,
+        associations=associations,
+        phrase_intervals=phrase_intervals,
+        corrections=corrections,
+    )
     
     # Step 8: Save rules
     output_path = Path(output)
-    save_rules(rules_content, output_path)
+    with profiler.stage("save"):
+        save_rules(rules_content, output_path)
     
     console.print()
     console.print(f"[green]✓[/green] Rules saved to [bold]{output_path}[/bold]")
@@ -201,6 +688,7 @@ def run_analysis(days: int = None, output: str = "suggested_rules.md", use_llm:
 @click.option("--file", type=click.Path(exists=True), default="suggested_rules.md", help="Rules file to apply")
 def apply(global_rules, project, file):
     """Apply generated rules to Cursor settings."""
+    from .apply import apply_rules
     
     if not global_rules and not project:
         # Default to project
@@ -215,6 +703,125 @@ def apply(global_rules, project, file):
     apply_rules(rules_path, global_rules=global_rules, project_rules=project)
 
 
+@main.command()
+@click.option("--days", type=int, default=28, help="Window to report on (default: 28)")
+@click.option("--workspace", default=None, help="Only report on one workspace")
+@click.option("--rebuild", is_flag=True, help="Rebuild the trends index from your full history")
+def trends(days, workspace, rebuild):
+    """Show how your habits trend over time."""
+    from rich import box
+    from rich.table import Table
+    
+    from .extractor import get_cursor_db_path
+    from .packs import build_matcher, load_packs
+    from .trends import TOTAL, PatternCube, sparkline
+    
+    try:
+        db_path = get_cursor_db_path()
+    except (FileNotFoundError, RuntimeError) as e:
+        console.print(f"[red]✗[/red] {e}")
+        raise SystemExit(1)
+    
+    try:
+        matcher = build_matcher(load_packs())
+    except (OSError, ValueError) as e:
+        console.print(f"[red]✗[/red] {e}")
+        raise SystemExit(1)
+    
+    with PatternCube() as cube:
+        with spinner() as progress:
+            progress.add_task("Indexing your history by day...", total=None)
+            counted = refresh_trends(cube, db_path, matcher, rebuild=rebuild)
+        if counted is not None:
+            console.print(f"[green]✓[/green] Indexed [bold]{counted}[/bold] messages by day")
+        
+        window = cube.window_counts(days, workspace=workspace)
+        weekly = cube.week_over_week(workspace=workspace)
+        series = cube.daily_series(days, workspace=workspace)
+    
+    if not window.get(TOTAL):
+        console.print(f"[yellow]⚠[/yellow] No messages in the last {days} days.")
+        return
+    
+    table = Table(box=box.SIMPLE, title=f"Habit trends (last {days} days)")
+    table.add_column("Pattern")
+    table.add_column(f"{days}d", justify="right")
+    table.add_column("This week", justify="right")
+    table.add_column("Last week", justify="right")
+    table.add_column("Trend", no_wrap=True)
+    
+    labels = matcher.labels
+    ranked = sorted((name for name in window if name != TOTAL), key=lambda name: -window[name])
+    for name in ranked:
+        this_week, last_week = weekly.get(name, (0, 0))
+        if this_week > last_week:
+            change = f"[green]{this_week}[/green]"
+        elif this_week < last_week:
+            change = f"[red]{this_week}[/red]"
+        else:
+            change = str(this_week)
+        table.add_row(
+            labels.get(name, name),
+            str(window[name]),
+            change,
+            str(last_week),
+            f"[cyan]{sparkline(series.get(name, [0] * days), width=21)}[/cyan]",
+        )
+    
+    console.print(table)
+    console.print(f"[dim]{window[TOTAL]} meaningful messages in window[/dim]")
+
+
+@main.command()
+@click.argument("query")
+@click.option("-k", "top_k", type=click.IntRange(min=1), default=10, help="Number of results (default: 10)")
+@click.option("--min-score", type=float, default=0.3, help="Minimum similarity to show (0-1)")
+@click.option("--rebuild", is_flag=True, help="Rebuild the similarity index from your full history")
+def similar(query, top_k, min_score, rebuild):
+    """Find past messages similar to QUERY ("have I said this before?")."""
+    from rich import box
+    from rich.table import Table
+    
+    from .extractor import extract_messages, get_bubble_signature, get_cursor_db_path, get_workspace_db_paths
+    from .filters import clean_text
+    from .index import SimilarityIndex
+    
+    try:
+        db_path = get_cursor_db_path()
+    except (FileNotFoundError, RuntimeError) as e:
+        console.print(f"[red]✗[/red] {e}")
+        raise SystemExit(1)
+    
+    index = SimilarityIndex()
+    # Only new bubbles change a signature; Cursor touches the files far more often
+    sources = {str(path): get_bubble_signature(path) for path in [db_path] + get_workspace_db_paths()}
+    
+    if rebuild or index.is_stale(sources):
+        with spinner() as progress:
+            progress.add_task("Indexing your messages...", total=None)
+            building = rebuild or index.is_stale()
+            messages = extract_messages(db_path)
+            count = index.build(messages, sources) if building else index.update(messages, sources)
+        console.print(f"[green]✓[/green] Indexed [bold]{count}[/bold]{'' if building else ' new'} messages")
+    
+    results = index.search(query, k=top_k, min_score=min_score)
+    
+    if not results:
+        console.print("[yellow]No similar messages found.[/yellow] [dim]Looks like you haven't said this before.[/dim]")
+        return
+    
+    table = Table(box=box.SIMPLE, title=f"Messages similar to \"{query}\"")
+    table.add_column("Score", justify="right", style="cyan")
+    table.add_column("Message")
+    for result in results:
+        text = clean_text(result['text'])
+        if len(text) > 120:
+            text = text[:117] + "..."
+        table.add_row(f"{result['score']:.2f}", text)
+    
+    console.print(table)
+
+
 if __name__ == "__main__":
     main()
 
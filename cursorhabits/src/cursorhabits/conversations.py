@@ -0,0 +1,366 @@
+"""
+Conversation index module.
+
+Keeps a compact SQLite index from composer (chat session) ID to its bubbles
+in conversation order, built from composerData metadata, so a single thread
+or the most recent threads can be read back in order without scanning the
+whole Cursor database.
+
+Only the global database is indexed. Workspace databases hold copies of
+chats that are in the global one too, and reading those (e.g. for
+workspace tags) is left to extract_messages.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .extractor import parse_conversation_header
+from .storage import get_data_dir
+
+
+# Bubble keys per IN (...) query when reading only the user's turns
+FETCH_CHUNK = 500
+
+# Bump when the index layout changes; older indexes are dropped and rebuilt
+INDEX_VERSION = 2
+
+
+def get_conversation_index_path() -> Path:
+    """Get the default path of the conversation index database."""
+    return get_data_dir() / "conversations.sqlite"
+
+
+def _bubble_entry(composer_id: str, bubble: dict, bubble_id: str, created_at=None) -> Optional[dict]:
+    """Turn bubble data into a conversation turn, or None if it has no text."""
+    text = bubble.get('text', '') or bubble.get('rawText', '')
+    if not text or not text.strip():
+        return None
+    return {
+        'composer_id': composer_id,
+        'bubble_id': bubble_id,
+        'type': bubble.get('type'),
+        'text': text.strip(),
+        'created_at': bubble.get('createdAt') or created_at,
+    }
+
+
+def _signature(value) -> str:
+    """Hash of a stored composerData value, to spot changed composers without parsing them."""
+    if not isinstance(value, bytes):
+        value = str(value).encode()
+    return hashlib.sha1(value).hexdigest()
+
+
+class ConversationIndex:
+    """
+    Composer → ordered bubble list, stored in SQLite.
+    
+    Bubbles are keyed by (composer_id, position), so reading one thread is a
+    primary-key range scan, and composers are indexed by creation time for
+    recent-thread lookups.
+    """
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else get_conversation_index_path()
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(INDEX_VERSION):
+            with self.conn:
+                self.conn.execute("DROP TABLE IF EXISTS composers")
+                self.conn.execute("DROP TABLE IF EXISTS bubbles")
+                self.conn.execute("DELETE FROM meta")
+                self.conn.execute("INSERT INTO meta VALUES ('version', ?)", (str(INDEX_VERSION),))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS composers (
+                composer_id TEXT PRIMARY KEY,
+                created_at INTEGER,
+                updated_at INTEGER,
+                inline INTEGER NOT NULL,
+                signature TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS composers_by_time ON composers (created_at);
+            CREATE TABLE IF NOT EXISTS bubbles (
+                composer_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                bubble_id TEXT NOT NULL,
+                type INTEGER,
+                created_at,
+                PRIMARY KEY (composer_id, position)
+            ) WITHOUT ROWID;
+        """)
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @property
+    def built_at(self) -> float:
+        """Epoch seconds of the last rebuild or refresh (0.0 if never built)."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        return float(row[0]) if row else 0.0
+    
+    def rebuild(self, db_path: Path) -> int:
+        """
+        Replace the index contents with the conversations in a Cursor database.
+        
+        Args:
+            db_path: Path to the state.vscdb file
+        
+        Returns:
+            Number of composers indexed
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM composers")
+            self.conn.execute("DELETE FROM bubbles")
+        self._update(db_path)
+        return self.conn.execute("SELECT COUNT(*) FROM composers").fetchone()[0]
+    
+    def refresh(self, db_path: Path) -> int:
+        """
+        Re-index the composers whose metadata changed since the last build.
+        
+        A composer's metadata lists its bubbles, so a new turn in a chat
+        changes it. Unchanged composers are compared by hash and never
+        parsed, and nothing is read if the database file is unchanged.
+        
+        Args:
+            db_path: Path to the state.vscdb file
+        
+        Returns:
+            Number of composers added, changed or removed (0 if none)
+        """
+        if self.built_at >= Path(db_path).stat().st_mtime:
+            return 0
+        return self._update(db_path)
+    
+    def _update(self, db_path: Path) -> int:
+        """Apply the composers added, changed or removed in a Cursor database to the index."""
+        # Taken before reading, so changes made during the read are seen next time
+        started = time.time()
+        known = dict(self.conn.execute("SELECT composer_id, signature FROM composers"))
+        changed = {}
+        present = set()
+        
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT key, value FROM cursorDiskKV WHERE key >= 'composerData:' AND key < 'composerData;'"
+            )
+            for key, value in rows:
+                composer_id = key.split(':', 1)[1]
+                signature = _signature(value)
+                present.add(composer_id)
+                if known.get(composer_id) != signature:
+                    changed[composer_id] = (signature, parse_conversation_header(value))
+        finally:
+            conn.close()
+        
+        stale = [(composer_id,) for composer_id in changed.keys() | (known.keys() - present)]
+        with self.conn:
+            self.conn.executemany("DELETE FROM composers WHERE composer_id = ?", stale)
+            self.conn.executemany("DELETE FROM bubbles WHERE composer_id = ?", stale)
+            self.conn.executemany(
+                "INSERT INTO composers VALUES (?, ?, ?, ?, ?)",
+                (
+                    (composer_id, header['created_at'], header['updated_at'], int(header['inline']), signature)
+                    for composer_id, (signature, header) in changed.items()
+                    if header is not None
+                ),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO bubbles VALUES (?, ?, ?, ?, ?)",
+                (
+                    (composer_id, position, bubble_id, bubble_type, created_at)
+                    for composer_id, (_, header) in changed.items()
+                    if header is not None
+                    for position, (bubble_id, bubble_type, created_at) in enumerate(header['bubbles'])
+                ),
+            )
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (str(started),))
+        
+        return len(stale)
+    
+    def bubbles(self, composer_id: str) -> list[tuple]:
+        """
+        Get a composer's bubbles in conversation order.
+        
+        Args:
+            composer_id: Composer (chat session) ID
+        
+        Returns:
+            List of (bubble_id, type, created_at) tuples
+        """
+        return self.conn.execute(
+            "SELECT bubble_id, type, created_at FROM bubbles WHERE composer_id = ? ORDER BY position",
+            (composer_id,),
+        ).fetchall()
+    
+    def positions(self, composer_ids: Iterable[str]) -> dict[str, dict[str, int]]:
+        """
+        Get where each bubble of some composers falls in its conversation.
+        
+        Args:
+            composer_ids: Composer (chat session) IDs
+        
+        Returns:
+            Dictionary mapping each indexed composer ID to a mapping from
+            bubble ID to its position in the conversation
+        """
+        positions = {}
+        for composer_id in composer_ids:
+            rows = self.conn.execute(
+                "SELECT bubble_id, position FROM bubbles WHERE composer_id = ?", (composer_id,)
+            ).fetchall()
+            if rows:
+                positions[composer_id] = dict(rows)
+        return positions
+    
+    def recent(self, n: int) -> list[str]:
+        """
+        Get the IDs of the most recently created composers.
+        
+        Args:
+            n: Number of composers
+        
+        Returns:
+            Composer IDs, newest first
+        """
+        rows = self.conn.execute(
+            "SELECT composer_id FROM composers ORDER BY created_at DESC LIMIT ?", (n,)
+        ).fetchall()
+        return [composer_id for (composer_id,) in rows]
+    
+    def composer_ids(self, since: Optional[float] = None) -> list[str]:
+        """
+        Get the IDs of all composers, newest first.
+        
+        Args:
+            since: If set, only composers created after this time (epoch milliseconds)
+        
+        Returns:
+            Composer IDs, newest first
+        """
+        if since is None:
+            return self.recent(-1)  # SQLite treats LIMIT -1 as no limit
+        rows = self.conn.execute(
+            "SELECT composer_id FROM composers WHERE created_at > ? ORDER BY created_at DESC", (since,)
+        ).fetchall()
+        return [composer_id for (composer_id,) in rows]
+    
+    def get_conversation(self, db_path: Path, composer_id: str, user_only: bool = False) -> list[dict]:
+        """
+        Read one conversation in order, touching only its own rows.
+        
+        Args:
+            db_path: Path to the state.vscdb file the index was built from
+            composer_id: Composer (chat session) ID
+            user_only: Only read the user's turns (assistant bubbles are never fetched)
+        
+        Returns:
+            Turns in conversation order, as dictionaries with 'composer_id',
+            'bubble_id', 'type' (1 = user, 2 = assistant), 'text' and 'created_at'
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            return self._read_turns(conn, composer_id, user_only)
+        finally:
+            conn.close()
+    
+    def conversations(self, db_path: Path, composer_ids: Optional[Iterable[str]] = None, user_only: bool = False):
+        """
+        Read conversations one at a time, in order.
+        
+        Args:
+            db_path: Path to the state.vscdb file the index was built from
+            composer_ids: Composers to read (defaults to all, newest first)
+            user_only: Only read the user's turns (assistant bubbles are never fetched)
+        
+        Yields:
+            Each conversation's turns, as returned by get_conversation
+        """
+        if composer_ids is None:
+            composer_ids = self.composer_ids()
+        
+        conn = sqlite3.connect(db_path)
+        try:
+            for composer_id in composer_ids:
+                yield self._read_turns(conn, composer_id, user_only)
+        finally:
+            conn.close()
+    
+    def recent_conversations(self, db_path: Path, n: int, user_only: bool = False) -> dict[str, list[dict]]:
+        """
+        Read the most recent conversations in order.
+        
+        Args:
+            db_path: Path to the state.vscdb file the index was built from
+            n: Number of conversations
+            user_only: Only read the user's turns (assistant bubbles are never fetched)
+        
+        Returns:
+            Dictionary mapping composer IDs (newest first) to their turns
+        """
+        composer_ids = self.recent(n)
+        return dict(zip(composer_ids, self.conversations(db_path, composer_ids, user_only)))
+    
+    def _read_turns(self, conn: sqlite3.Connection, composer_id: str, user_only: bool = False) -> list[dict]:
+        """Read one conversation's turns from an open Cursor database connection."""
+        row = self.conn.execute(
+            "SELECT inline FROM composers WHERE composer_id = ?", (composer_id,)
+        ).fetchone()
+        if row is None:
+            return []
+        
+        bubbles = self.bubbles(composer_id)
+        stored = {}
+        try:
+            if row[0]:
+                # Older composers embed the whole conversation in their metadata
+                value = conn.execute(
+                    "SELECT value FROM cursorDiskKV WHERE key = ?", (f"composerData:{composer_id}",)
+                ).fetchone()
+                for bubble in json.loads(value[0]).get('conversation', []) if value else []:
+                    if isinstance(bubble, dict) and bubble.get('bubbleId'):
+                        stored[bubble['bubbleId']] = bubble
+            else:
+                if user_only:
+                    # Header types say which bubbles are the user's, so only those are read
+                    wanted = [bubble_id for bubble_id, bubble_type, _ in bubbles if bubble_type in (1, None)]
+                    rows = []
+                    for start in range(0, len(wanted), FETCH_CHUNK):
+                        chunk = [f"bubbleId:{composer_id}:{bubble_id}" for bubble_id in wanted[start:start + FETCH_CHUNK]]
+                        rows.extend(conn.execute(
+                            f"SELECT key, value FROM cursorDiskKV WHERE key IN ({','.join('?' * len(chunk))})",
+                            chunk,
+                        ))
+                else:
+                    rows = conn.execute(
+                        "SELECT key, value FROM cursorDiskKV WHERE key >= ? AND key < ?",
+                        (f"bubbleId:{composer_id}:", f"bubbleId:{composer_id};"),
+                    )
+                for key, value in rows:
+                    try:
+                        stored[key.split(':', 2)[2]] = json.loads(value)
+                    except (json.JSONDecodeError, TypeError, IndexError):
+                        continue
+        except (sqlite3.Error, json.JSONDecodeError, TypeError, AttributeError):
+            return []
+        
+        turns = []
+        for bubble_id, _, created_at in bubbles:
+            bubble = stored.get(bubble_id)
+            if isinstance(bubble, dict) and (not user_only or bubble.get('type') == 1):
+                turn = _bubble_entry(composer_id, bubble, bubble_id, created_at)
+                if turn:
+                    turns.append(turn)
+        return turns
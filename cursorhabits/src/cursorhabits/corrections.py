@@ -0,0 +1,200 @@
+"""
+Repeated-correction detection module.
+
+Walks each conversation's user turns in order and finds instructions the
+user had to give again in the same session, either retyped (near-duplicate
+SimHash fingerprints) or rephrased (the same known pattern). Those are the
+habits the assistant forgets, so they make the highest-priority rules.
+"""
+
+from typing import Iterable, Optional
+
+from .analyzer import DEFAULT_MATCHER, PatternMatcher, message_patterns, message_score
+from .dedupe import BANDS, MAX_DISTANCE, _hamming, collapse_near_duplicates, simhash_fingerprints
+from .filters import filter_noise
+from .normalize import Vocabulary, normalize_messages
+
+
+# Earlier turns compared per band lookup, so a session costs O(turns) even
+# when many turns share a band
+MAX_CANDIDATES = 8
+
+
+def _session_repeats(turns: list[dict], fingerprints: list[int], turn_patterns: list[list[str]]) -> tuple[dict, list]:
+    """
+    Find what was re-issued within one session, in a single pass over its turns.
+    
+    Returns:
+        (pattern_repeats, retyped): [re-issue count, turns] by pattern name,
+        and (first turn, re-issue count) pairs for retyped turns
+    """
+    band_bits = 64 // BANDS
+    band_mask = (1 << band_bits) - 1
+    buckets = [{} for _ in range(BANDS)]
+    retyped = {}
+    seen_patterns = {}
+    pattern_repeats = {}
+    
+    for position, (turn, fingerprint, names) in enumerate(zip(turns, fingerprints, turn_patterns)):
+        for name in names:
+            if name in seen_patterns:
+                repeats = pattern_repeats.setdefault(name, [0, [seen_patterns[name]]])
+                repeats[0] += 1
+                repeats[1].append(turn)
+            else:
+                seen_patterns[name] = turn
+        
+        if not fingerprint:
+            continue
+        
+        bands = [(fingerprint >> (band * band_bits)) & band_mask for band in range(BANDS)]
+        original = None
+        for band, value in enumerate(bands):
+            for earlier, earlier_fingerprint in buckets[band].get(value, ())[:MAX_CANDIDATES]:
+                if _hamming(fingerprint, earlier_fingerprint) <= MAX_DISTANCE:
+                    original = earlier
+                    break
+            if original is not None:
+                break
+        
+        if original is not None:
+            retyped[original] = retyped.get(original, 0) + 1
+        else:
+            for band, value in enumerate(bands):
+                buckets[band].setdefault(value, []).append((position, fingerprint))
+    
+    return pattern_repeats, [(turns[position], count) for position, count in retyped.items()]
+
+
+def group_conversations(messages: Iterable[dict], positions: Optional[dict] = None) -> list[list[dict]]:
+    """
+    Group extracted messages into each session's user turns, in order.
+    
+    Turns are ordered by their position in the conversation when all of
+    them are known, else by 'created_at' when every turn of a session has
+    one of the same type, and otherwise keep the order they were read in.
+    
+    Args:
+        messages: Message dictionaries with 'composer_id' keys, e.g. from
+            extract_messages(..., keep_repeats=True)
+        positions: Bubble positions by composer, from
+            ConversationIndex.positions
+    
+    Returns:
+        Each session's turns, sessions in order of their first message
+    """
+    sessions = {}
+    for msg in messages:
+        sessions.setdefault(msg['composer_id'], []).append(msg)
+    
+    conversations = []
+    for composer_id, turns in sessions.items():
+        order = (positions or {}).get(composer_id, {})
+        # Epoch milliseconds or ISO timestamps, never a mix of the two
+        kinds = {type(turn.get('created_at')) for turn in turns}
+        if all(turn.get('bubble_id') in order for turn in turns):
+            turns = sorted(turns, key=lambda turn: order[turn['bubble_id']])
+        elif kinds <= {int, float} or kinds == {str}:
+            turns = sorted(turns, key=lambda turn: turn['created_at'])
+        conversations.append(turns)
+    return conversations
+
+
+def find_repeated_corrections(
+    conversations: Iterable[list[dict]],
+    matcher: Optional[PatternMatcher] = None,
+    min_sessions: int = 2,
+) -> list[dict]:
+    """
+    Find instructions re-issued within the same session, ranked by how often.
+    
+    Each session is scanned once, with SimHash band lookups capped at
+    MAX_CANDIDATES earlier turns, so cost grows linearly with its length.
+    
+    Args:
+        conversations: Each session's user turns in order (message
+            dictionaries with 'text' and 'composer_id' keys), e.g. from
+            group_conversations
+        matcher: Patterns to recognize rephrased repeats (defaults to built-ins)
+        min_sessions: Minimum sessions an instruction must be repeated in
+    
+    Returns:
+        List of dictionaries with 'text' (a rule-ready example), 'pattern'
+        and 'label' (None for retyped free-text instructions), 'sessions',
+        'repeats' (re-issues after the first) and 'examples', sorted by
+        sessions then repeats
+    """
+    matcher = matcher or DEFAULT_MATCHER
+    vocab = Vocabulary()
+    
+    # Exact repeats are common, so each distinct text is normalized, filtered
+    # and matched once: text -> (ir, meaningful, pattern names). Turns are
+    # copied, since callers may share them with another vocabulary's IRs.
+    analyzed = {}
+    sessions = []
+    for turns in conversations:
+        kept = []
+        for turn in turns:
+            if turn['text'] not in analyzed:
+                probe = {'text': turn['text']}
+                meaningful = bool(filter_noise(normalize_messages([probe], vocab)))
+                analyzed[turn['text']] = (probe['ir'], meaningful, message_patterns(probe, matcher))
+            ir, meaningful, _ = analyzed[turn['text']]
+            if meaningful:
+                kept.append({**turn, 'ir': ir})
+        if len(kept) > 1:
+            sessions.append(kept)
+    
+    fingerprints = simhash_fingerprints([turn for turns in sessions for turn in turns]).tolist()
+    
+    by_pattern = {}
+    retyped = []
+    offset = 0
+    
+    for turns in sessions:
+        pattern_repeats, session_retyped = _session_repeats(
+            turns,
+            fingerprints[offset:offset + len(turns)],
+            [analyzed[turn['text']][2] for turn in turns],
+        )
+        offset += len(turns)
+        
+        for name, (count, repeated) in pattern_repeats.items():
+            entry = by_pattern.setdefault(name, {'sessions': 0, 'repeats': 0, 'examples': {}})
+            entry['sessions'] += 1
+            entry['repeats'] += count
+            for turn in repeated:
+                if turn['text'] not in entry['examples']:
+                    entry['examples'][turn['text']] = message_score(turn)
+        
+        # Retyped instructions a pattern already explains are counted there
+        for turn, count in session_retyped:
+            if not analyzed[turn['text']][2]:
+                retyped.append({**turn, 'occurrences': count})
+    
+    corrections = []
+    for name, entry in by_pattern.items():
+        if entry['sessions'] >= min_sessions:
+            examples = sorted(entry['examples'], key=lambda text: -entry['examples'][text])
+            corrections.append({
+                'text': examples[0],
+                'pattern': name,
+                'label': matcher.labels[name],
+                'sessions': entry['sessions'],
+                'repeats': entry['repeats'],
+                'examples': examples[:3],
+            })
+    
+    # The same retyped instruction across sessions collapses into one entry
+    for rep in collapse_near_duplicates(retyped):
+        if len(rep['composer_ids']) >= min_sessions:
+            corrections.append({
+                'text': rep['text'],
+                'pattern': None,
+                'label': None,
+                'sessions': len(rep['composer_ids']),
+                'repeats': rep['occurrences'],
+                'examples': [rep['text']],
+            })
+    
+    return sorted(corrections, key=lambda c: (-c['sessions'], -c['repeats']))
@@ -0,0 +1,175 @@
+"""
+Existing-rule coverage module.
+
+Reads the rules the user already has (Cursor's global aiRules setting and
+the project's .cursor/rules/*.mdc files) and works out which detected
+patterns and clusters they already cover, so synthesis only spends prompt
+tokens on habits that aren't written down yet.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Optional
+
+from .analyzer import DEFAULT_MATCHER, PatternMatcher
+from .index import embed_messages
+from .normalize import Vocabulary, normalize_messages
+
+
+# Cosine similarity (hashed embeddings, as in the similarity index) at which
+# a rule restates a pattern's examples or a cluster's messages
+COVERED_SIMILARITY = 0.45
+
+# Lines of a rules file that aren't rules: phrase suggestions ("(12x) ..."),
+# italic notes and separators
+_NOT_A_RULE = re.compile(r'^(\(\d+x\)|\*.*\*$|-{3,}$)')
+
+
+def _rule_lines(text: str) -> list[str]:
+    """Split rules text into individual rules, without markdown headers, bullets or notes."""
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        line = re.sub(r'^([-*+]|\d+[.)])\s+', '', line).strip()
+        if line and not _NOT_A_RULE.match(line):
+            lines.append(line)
+    return lines
+
+
+def _strip_frontmatter(text: str) -> str:
+    """Remove an .mdc file's YAML frontmatter."""
+    if text.startswith('---'):
+        end = text.find('\n---', 3)
+        if end != -1:
+            return text[end + 4:]
+    return text
+
+
+def read_existing_rules(settings_path: Optional[Path] = None, rules_dir: Optional[Path] = None) -> list[dict]:
+    """
+    Read the user's existing Cursor rules, one rule per entry.
+    
+    Args:
+        settings_path: Cursor's settings.json (defaults to the installed Cursor's)
+        rules_dir: Project rules directory (defaults to .cursor/rules/ in the current directory)
+    
+    Returns:
+        List of dictionaries with 'text' and 'source' (where the rule is written)
+    """
+    from .apply import get_cursor_settings_path, get_project_rules_path
+    
+    settings_path = settings_path or get_cursor_settings_path()
+    rules_dir = rules_dir or get_project_rules_path()
+    rules = []
+    
+    if settings_path and Path(settings_path).exists():
+        try:
+            with open(settings_path, 'r', encoding='utf-8') as f:
+                ai_rules = json.load(f).get("cursor.general.aiRules", "")
+        except (OSError, json.JSONDecodeError, AttributeError):
+            ai_rules = ""
+        if isinstance(ai_rules, str):
+            rules.extend({'text': line, 'source': "global aiRules"} for line in _rule_lines(ai_rules))
+    
+    if Path(rules_dir).is_dir():
+        for path in sorted(Path(rules_dir).glob("*.mdc")):
+            try:
+                text = path.read_text(encoding='utf-8')
+            except (OSError, UnicodeDecodeError):
+                continue
+            rules.extend({'text': line, 'source': path.name} for line in _rule_lines(_strip_frontmatter(text)))
+    
+    return rules
+
+
+def find_covered(
+    patterns: dict,
+    clusters: list,
+    rules: list[dict],
+    matcher: Optional[PatternMatcher] = None,
+    threshold: float = COVERED_SIMILARITY,
+) -> dict:
+    """
+    Work out which patterns and clusters the existing rules already cover.
+    
+    A pattern is covered if a rule matches it (the same pattern matcher used
+    on messages) or restates one of its examples; a cluster is covered if a
+    rule restates one of its messages. Restating is judged by cosine
+    similarity of hashed embeddings, as in the similarity index.
+    
+    Args:
+        patterns: Dictionary of detected patterns
+        clusters: List of similar message groups
+        rules: Existing rules, from read_existing_rules
+        matcher: Patterns to recognize in rules (defaults to built-ins)
+        threshold: Minimum similarity for a rule to restate a message
+    
+    Returns:
+        Dictionary with 'patterns' mapping covered pattern names to the
+        covering rule ('rule', 'source', 'score'; a pattern match scores
+        1.0), and 'clusters', the set of covered cluster indices
+    """
+    coverage = {'patterns': {}, 'clusters': set()}
+    if not rules:
+        return coverage
+    
+    matcher = matcher or DEFAULT_MATCHER
+    for rule in rules:
+        for name in matcher.match(rule['text'].lower()):
+            if name in patterns and name not in coverage['patterns']:
+                coverage['patterns'][name] = {'rule': rule['text'], 'source': rule['source'], 'score': 1.0}
+    
+    # Everything else is compared with the rules by embedding
+    owners = []
+    texts = []
+    for name, data in patterns.items():
+        if name not in coverage['patterns']:
+            for example in data.get('examples', [])[:3]:
+                owners.append(name)
+                texts.append(example)
+    for i, cluster in enumerate(clusters):
+        for msg in cluster[:3]:
+            owners.append(i)
+            texts.append(msg)
+    if not texts:
+        return coverage
+    
+    vocab = Vocabulary()
+    rule_vectors = embed_messages(normalize_messages([{'text': rule['text']} for rule in rules], vocab))
+    text_vectors = embed_messages(normalize_messages([{'text': text} for text in texts], vocab))
+    scores = text_vectors @ rule_vectors.T
+    best = scores.argmax(axis=1)
+    
+    for owner, row, j in zip(owners, scores, best):
+        score = float(row[j])
+        if score < threshold:
+            continue
+        if isinstance(owner, int):
+            coverage['clusters'].add(owner)
+        elif score > coverage['patterns'].get(owner, {}).get('score', 0.0):
+            coverage['patterns'][owner] = {'rule': rules[j]['text'], 'source': rules[j]['source'], 'score': score}
+    
+    return coverage
+
+
+def uncovered(patterns: dict, clusters: list, coverage: Optional[dict]) -> tuple[dict, list]:
+    """
+    Drop what the existing rules already cover.
+    
+    Args:
+        patterns: Dictionary of detected patterns
+        clusters: List of similar message groups
+        coverage: Result of find_covered (None keeps everything)
+    
+    Returns:
+        (patterns, clusters) not covered by existing rules
+    """
+    if not coverage:
+        return patterns, clusters
+    return (
+        {name: data for name, data in patterns.items() if name not in coverage['patterns']},
+        [cluster for i, cluster in enumerate(clusters) if i not in coverage['clusters']],
+    )
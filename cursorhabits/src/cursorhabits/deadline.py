@@ -0,0 +1,28 @@
+"""
+Deadline module.
+
+A wall-clock deadline, shared by budgeted analysis and AI synthesis. Kept
+on its own so synthesis can use it without importing the analysis stack.
+"""
+
+import time
+
+
+class Deadline:
+    """A wall-clock deadline measured from when it was created."""
+    
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started = time.monotonic()
+    
+    def elapsed(self) -> float:
+        """Seconds since the deadline was created."""
+        return time.monotonic() - self.started
+    
+    def remaining(self) -> float:
+        """Seconds left before the deadline (negative once it has passed)."""
+        return self.seconds - self.elapsed()
+    
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
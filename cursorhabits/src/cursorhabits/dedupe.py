@@ -0,0 +1,143 @@
+"""
+Near-duplicate collapse module.
+
+Collapses retyped variants of the same message ("push to github pls",
+"push to GitHub please") using 64-bit SimHash fingerprints bucketed by
+Hamming-distance bands. Each kept representative carries an occurrence
+count that the analyzers weight by, so totals stay correct while the
+working set shrinks.
+"""
+
+import numpy as np
+
+from .normalize import get_ir
+
+
+# Fingerprints within this many differing bits are near-duplicates
+MAX_DISTANCE = 3
+
+# Bands per fingerprint; MAX_DISTANCE + 1 bands guarantee (pigeonhole) that
+# near-duplicates share at least one band exactly
+BANDS = MAX_DISTANCE + 1
+
+BATCH_SIZE = 20_000
+
+# Filler that retyped variants add or drop freely; ignored when fingerprinting
+FINGERPRINT_STOPWORDS = {
+    'a', 'an', 'the', 'to', 'you', 'your', 'u', 'and', 'now', 'just', 'can', 'could',
+    'please', 'pls', 'plz', 'thanks', 'thx', 'ty', 'ok', 'okay', 'hey', 'hi',
+}
+
+
+def _fingerprint_token_ids(ir) -> list[int]:
+    """Token IDs that count towards a fingerprint (all tokens if none survive)."""
+    tokens = ir.vocab.tokens
+    kept = [
+        token_id for token_id in ir.token_ids
+        if tokens[token_id] not in FINGERPRINT_STOPWORDS and not tokens[token_id].isdigit()
+    ]
+    return kept or list(ir.token_ids)
+
+
+def simhash_fingerprints(messages: list[dict]) -> np.ndarray:
+    """
+    Compute a 64-bit SimHash fingerprint per message from its tokens.
+    
+    Filler words and bare numbers are left out, since short messages
+    otherwise differ by too many bits for those alone.
+    
+    Args:
+        messages: List of message dictionaries with 'text' key
+        
+    Returns:
+        uint64 array with one fingerprint per message (0 for messages without tokens)
+    """
+    fingerprints = np.zeros(len(messages), dtype=np.uint64)
+    
+    for start in range(0, len(messages), BATCH_SIZE):
+        batch = messages[start:start + BATCH_SIZE]
+        rows, features = [], []
+        for row, msg in enumerate(batch):
+            ir = get_ir(msg)
+            hashes = ir.vocab.hashes
+            token_ids = _fingerprint_token_ids(ir)
+            rows.extend([row] * len(token_ids))
+            features.extend(hashes[token_id] for token_id in token_ids)
+        if not features:
+            continue
+        
+        # Each feature votes +1/-1 on every bit; the fingerprint keeps the majority
+        bits = np.unpackbits(
+            np.array(features, dtype=np.uint64).view(np.uint8).reshape(-1, 8),
+            axis=1,
+            bitorder='little',
+        ).view(np.int8) * 2 - 1
+        rows = np.array(rows, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        votes = np.zeros((len(batch), 64), dtype=np.int32)
+        votes[rows[starts]] = np.add.reduceat(bits, starts, axis=0, dtype=np.int32)
+        
+        packed = np.packbits(votes > 0, axis=1, bitorder='little')
+        fingerprints[start:start + len(batch)] = packed.view(np.uint64).ravel()
+    
+    return fingerprints
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def collapse_near_duplicates(messages: list[dict], max_distance: int = MAX_DISTANCE) -> list[dict]:
+    """
+    Collapse near-duplicate messages into weighted representatives.
+    
+    The first message of each group (in input order) is kept. It gains an
+    'occurrences' count (summed over the group, respecting existing counts)
+    and a 'composer_ids' list of every session the group appeared in.
+    
+    Args:
+        messages: List of message dictionaries with 'text' key
+        max_distance: Maximum differing fingerprint bits (at most MAX_DISTANCE)
+        
+    Returns:
+        List of representative messages (copies; inputs are not modified)
+    """
+    max_distance = min(max_distance, MAX_DISTANCE)
+    fingerprints = simhash_fingerprints(messages)
+    band_bits = 64 // BANDS
+    band_mask = (1 << band_bits) - 1
+    
+    buckets = [{} for _ in range(BANDS)]
+    representatives = []
+    
+    for msg, fingerprint in zip(messages, fingerprints.tolist()):
+        bands = [(fingerprint >> (band * band_bits)) & band_mask for band in range(BANDS)]
+        
+        match = None
+        if fingerprint:
+            for band, value in enumerate(bands):
+                for candidate in buckets[band].get(value, ()):
+                    if _hamming(fingerprint, candidate[0]) <= max_distance:
+                        match = candidate[1]
+                        break
+                if match is not None:
+                    break
+        
+        if match is not None:
+            match['occurrences'] += msg.get('occurrences', 1)
+            for composer_id in msg.get('composer_ids') or [msg.get('composer_id')]:
+                if composer_id and composer_id not in match['composer_ids']:
+                    match['composer_ids'].append(composer_id)
+            continue
+        
+        rep = msg.copy()
+        rep['occurrences'] = msg.get('occurrences', 1)
+        rep['composer_ids'] = list(msg.get('composer_ids') or ([msg['composer_id']] if msg.get('composer_id') else []))
+        representatives.append(rep)
+        
+        # Only representatives are bucketed, so each lookup compares against groups, not members
+        if fingerprint:
+            for band, value in enumerate(bands):
+                buckets[band].setdefault(value, []).append((fingerprint, rep))
+    
+    return representatives
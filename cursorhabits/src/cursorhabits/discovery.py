@@ -0,0 +1,154 @@
+"""
+Habit discovery module.
+
+Finds recurring topics outside the known pattern definitions using
+sparse TF-IDF over message words and clustering of distinctive terms into
+candidate categories.
+"""
+
+from array import array
+from typing import Optional
+
+import numpy as np
+
+from .analyzer import ExampleReservoir, PatternMatcher, message_patterns, message_score, message_weight
+from .normalize import get_ir
+
+
+# Common 4+ letter words that never make a habit on their own
+DISCOVERY_STOPWORDS = {
+    'about', 'after', 'again', 'also', 'because', 'been', 'before', 'being', 'both',
+    'could', 'does', 'doing', 'done', 'each', 'even', 'every', 'from', 'getting',
+    'going', 'good', 'have', 'here', 'into', 'just', 'know', 'like', 'look', 'make',
+    'many', 'more', 'most', 'much', 'need', 'only', 'other', 'please', 'really',
+    'should', 'some', 'something', 'still', 'sure', 'than', 'thanks', 'that',
+    'their', 'them', 'then', 'there', 'these', 'they', 'thing', 'things', 'think',
+    'this', 'those', 'through', 'time', 'very', 'want', 'well', 'were', 'what',
+    'when', 'where', 'which', 'while', 'will', 'with', 'without', 'work', 'would',
+    'your', 'yours', 'always', 'never', 'dont', 'doesn', 'didn', 'isn', 'ensure',
+    'remember', 'keep', 'check', 'make', 'using', 'used', 'actually', 'right',
+}
+
+
+def discover_categories(
+    messages: list[dict],
+    max_terms: int = 60,
+    min_df: int = 3,
+    max_df_ratio: float = 0.5,
+    similarity_threshold: float = 0.3,
+    min_support: float = 0.005,
+    max_categories: int = 8,
+    matcher: Optional[PatternMatcher] = None,
+) -> dict:
+    """
+    Discover habit categories that the built-in patterns don't cover.
+    
+    Only messages that match no known pattern are considered.
+    Distinctive terms are picked by summed TF-IDF weight, then grouped with
+    the terms they co-occur with (cosine similarity of their document sets).
+    
+    Args:
+        messages: Filtered list of message dictionaries
+        max_terms: Number of distinctive terms to consider for clustering
+        min_df: Minimum number of messages a term must appear in
+        max_df_ratio: Maximum fraction of messages a term may appear in
+        similarity_threshold: Minimum co-occurrence cosine to join a category
+        min_support: Minimum fraction of considered messages a category must cover
+        max_categories: Maximum number of categories to return
+        matcher: Known patterns whose messages are skipped (defaults to built-ins)
+        
+    Returns:
+        Dictionary in the same shape as analyze_patterns, with extra
+        'terms' and 'discovered' keys on each category
+    """
+    docs = [msg for msg in messages if not message_patterns(msg, matcher)]
+    if len(docs) < min_df:
+        return {}
+    
+    # Sparse document-term incidence as parallel (doc, term) arrays
+    term_index = {}
+    terms = []
+    doc_ids = array('i')
+    term_ids = array('i')
+    doc_lengths = array('i')
+    doc_weights = np.array([message_weight(msg) for msg in docs], dtype=np.float64)
+    for doc_id, msg in enumerate(docs):
+        words = [w for w in get_ir(msg).words if w not in DISCOVERY_STOPWORDS and not w.isdigit()]
+        doc_lengths.append(len(words))
+        for word in words:
+            term_id = term_index.get(word)
+            if term_id is None:
+                term_id = term_index[word] = len(terms)
+                terms.append(word)
+            doc_ids.append(doc_id)
+            term_ids.append(term_id)
+    
+    if not terms:
+        return {}
+    
+    n_docs = len(docs)
+    doc_ids = np.frombuffer(doc_ids, dtype=np.int32)
+    term_ids = np.frombuffer(term_ids, dtype=np.int32)
+    doc_lengths = np.frombuffer(doc_lengths, dtype=np.int32)
+    
+    # TF-IDF with binary term frequency and length-normalized documents
+    df = np.bincount(term_ids, minlength=len(terms))
+    idf = np.log(n_docs / np.maximum(df, 1))
+    norms = 1.0 / np.sqrt(np.maximum(doc_lengths, 1))
+    weights = np.bincount(term_ids, weights=idf[term_ids] * norms[doc_ids], minlength=len(terms))
+    
+    eligible = (df >= min_df) & (df <= max(min_df, max_df_ratio * n_docs))
+    weights[~eligible] = 0.0
+    top = np.argsort(-weights)[:max_terms]
+    top = top[weights[top] > 0]
+    if len(top) == 0:
+        return {}
+    
+    # Dense incidence restricted to the top terms, then term-term cosine
+    column = np.full(len(terms), -1, dtype=np.int64)
+    column[top] = np.arange(len(top))
+    mask = column[term_ids] >= 0
+    incidence = np.zeros((n_docs, len(top)), dtype=np.float32)
+    incidence[doc_ids[mask], column[term_ids[mask]]] = 1.0
+    cooccurrence = incidence.T @ incidence
+    top_df = np.diag(cooccurrence).copy()
+    similarity = cooccurrence / np.sqrt(np.outer(top_df, top_df))
+    
+    # Greedy clustering: each seed (strongest unassigned term) takes its neighbours
+    assigned = np.zeros(len(top), dtype=bool)
+    categories = {}
+    for seed in range(len(top)):
+        if assigned[seed]:
+            continue
+        members = [seed] + [
+            j for j in np.argsort(-similarity[seed])
+            if j != seed and not assigned[j] and similarity[seed, j] >= similarity_threshold
+        ][:3]
+        assigned[members] = True
+        
+        hits = incidence[:, members].sum(axis=1)
+        matched = np.nonzero(hits)[0]
+        count = int(doc_weights[matched].sum())
+        if count < max(min_df, min_support * doc_weights.sum()):
+            continue
+        
+        member_terms = [terms[top[j]] for j in members]
+        reservoir = ExampleReservoir()
+        for doc_id in matched:
+            msg = docs[doc_id]
+            # Prefer messages that mention more of the category's terms
+            reservoir.add(msg['text'], float(hits[doc_id]) + message_score(msg), msg['ir'].words)
+        scored = reservoir.scored()
+        
+        categories['discovered_' + '_'.join(member_terms[:2])] = {
+            'count': count,
+            'label': ' / '.join(term.replace('_', ' ').title() for term in member_terms[:2]),
+            'examples': [text for _, text in scored],
+            'example_scores': [score for score, _ in scored],
+            'terms': member_terms,
+            'discovered': True,
+        }
+        if len(categories) >= max_categories:
+            break
+    
+    return dict(sorted(categories.items(), key=lambda x: -x[1]['count']))
@@ -0,0 +1,253 @@
+"""
+Concurrent analysis module.
+
+Runs the independent analyzers in separate worker processes on a shared
+message list and joins their results, recording how long each stage took.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from .analyzer import (
+    analyze_patterns,
+    find_repeated_phrases,
+    cluster_similar_messages,
+    find_pattern_associations,
+)
+from .discovery import discover_categories
+from .dedupe import collapse_near_duplicates
+from .filters import filter_noise
+from .profiling import StageProfiler
+
+
+# Analysis stages in the order their results are reported
+ANALYSIS_STAGES = {
+    'patterns': analyze_patterns,
+    'phrases': find_repeated_phrases,
+    'clusters': cluster_similar_messages,
+    'associations': find_pattern_associations,
+    'discovered': discover_categories,
+}
+
+# Stages that accept a custom PatternMatcher
+MATCHER_STAGES = {'patterns', 'associations', 'discovered'}
+
+# Below this many messages, process startup costs more than it saves
+MIN_PARALLEL_MESSAGES = 500
+
+# Messages shared with worker processes (set once per worker by _init_worker)
+_shared_messages: list[dict] = []
+_shared_matcher = None
+
+
+def available_cpus() -> int:
+    """Return the number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+def _init_worker(messages: list[dict], matcher=None):
+    """Install the shared message list (and matcher) in a worker process."""
+    global _shared_messages, _shared_matcher
+    _shared_messages = messages
+    _shared_matcher = matcher
+
+
+def _run_stage(name: str, messages: Optional[list[dict]] = None, matcher=None) -> tuple:
+    """Run one analysis stage and return (result, elapsed_seconds, cpu_seconds)."""
+    if messages is None:
+        messages, matcher = _shared_messages, _shared_matcher
+    kwargs = {'matcher': matcher} if matcher is not None and name in MATCHER_STAGES else {}
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = ANALYSIS_STAGES[name](messages, **kwargs)
+    return result, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def run_analyzers(
+    messages: list[dict],
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    stages: Optional[list[str]] = None,
+    matcher=None,
+    profiler=None,
+) -> tuple[dict, dict]:
+    """
+    Run all analysis stages, concurrently when worthwhile.
+    
+    The message list is handed to each worker once through the pool
+    initializer (inherited without copying on fork-based platforms), so
+    total time approaches that of the slowest single stage.
+    
+    Args:
+        messages: Filtered list of message dictionaries
+        parallel: If False, run the stages one after another
+        max_workers: Worker process count (defaults to one per stage, capped
+            at the number of available CPUs)
+        stages: Names of the stages to run (defaults to all ANALYSIS_STAGES)
+        matcher: PatternMatcher for pattern-based stages (defaults to built-ins)
+        profiler: Optional StageProfiler to record each stage in (stages run in
+            worker processes report wall and CPU time only)
+        
+    Returns:
+        Tuple of (results, timings) dictionaries keyed by stage name.
+        timings also contains 'total' for the overall wall time.
+    """
+    start = time.perf_counter()
+    stages = list(stages or ANALYSIS_STAGES)
+    profiler = profiler or StageProfiler(enabled=False)
+    results = {}
+    timings = {}
+    
+    workers = max_workers or min(len(stages), available_cpus())
+    
+    if parallel and workers > 1 and len(messages) >= MIN_PARALLEL_MESSAGES:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(messages, matcher),
+            ) as pool:
+                futures = {name: pool.submit(_run_stage, name) for name in stages}
+                finished = {name: future.result() for name, future in futures.items()}
+            for name, (result, elapsed, cpu_seconds) in finished.items():
+                results[name], timings[name] = result, elapsed
+                profiler.add(name, elapsed, cpu_seconds, rows=len(messages))
+        except (OSError, BrokenProcessPool):
+            # Process pools can be unavailable (sandboxes, frozen apps) - run inline
+            results, timings = {}, {}
+    
+    for name in stages:
+        if name not in results:
+            with profiler.stage(name, rows=len(messages)):
+                results[name], timings[name], _ = _run_stage(name, messages, matcher)
+    
+    timings['total'] = time.perf_counter() - start
+    return results, timings
+
+
+def format_timings(timings: dict) -> str:
+    """
+    Format stage timings as a single summary line.
+    
+    Args:
+        timings: Timings dictionary from run_analyzers
+        
+    Returns:
+        Human-readable summary, e.g. "patterns 0.02s · phrases 0.41s (total 0.43s)"
+    """
+    stages = " · ".join(
+        f"{name} {seconds:.2f}s" for name, seconds in timings.items() if name != 'total'
+    )
+    return f"{stages} (total {timings.get('total', 0.0):.2f}s)"
+
+
+def batch_partitions(sizes: dict[str, int], min_batch: Optional[int] = None) -> list[list[str]]:
+    """
+    Group partitions so that each worker task has enough messages to be worth it.
+    
+    Partitions are taken largest first; a batch is closed once it holds at
+    least min_batch messages, so big partitions get a task of their own and
+    small ones share one.
+    
+    Args:
+        sizes: Number of messages in each partition, keyed by partition name
+        min_batch: Messages per batch (defaults to MIN_PARALLEL_MESSAGES)
+        
+    Returns:
+        List of batches, each a list of partition names
+    """
+    min_batch = MIN_PARALLEL_MESSAGES if min_batch is None else min_batch
+    batches = []
+    current, current_size = [], 0
+    
+    for name in sorted(sizes, key=lambda n: -sizes[n]):
+        current.append(name)
+        current_size += sizes[name]
+        if current_size >= min_batch:
+            batches.append(current)
+            current, current_size = [], 0
+    
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _analyze_partitions(
+    partitions: dict[str, list[dict]],
+    stages: Optional[list[str]] = None,
+    matcher=None,
+    collapse: bool = False,
+) -> dict:
+    """Collapse, filter and analyze each partition in turn (one worker task)."""
+    results = {}
+    for name, messages in partitions.items():
+        if collapse:
+            messages = collapse_near_duplicates(messages)
+        filtered = filter_noise(messages)
+        results[name], _ = run_analyzers(filtered, parallel=False, stages=stages, matcher=matcher)
+        results[name]['meaningful'] = len(filtered)
+    return results
+
+
+def run_partitioned(
+    partitions: dict[str, list[dict]],
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    stages: Optional[list[str]] = None,
+    matcher=None,
+    collapse: bool = False,
+) -> tuple[dict, float]:
+    """
+    Filter and analyze independent partitions of the history, concurrently when worthwhile.
+    
+    Small partitions are batched together (see batch_partitions) so worker
+    startup and message transfer aren't paid once per tiny partition.
+    
+    Args:
+        partitions: Normalized (unfiltered) messages, keyed by partition name
+        parallel: If False, analyze the partitions one after another
+        max_workers: Worker process count (defaults to the number of available CPUs)
+        stages: Names of the stages to run (defaults to all ANALYSIS_STAGES)
+        matcher: PatternMatcher for pattern-based stages (defaults to built-ins)
+        collapse: Whether to collapse near-duplicates within each partition first
+        
+    Returns:
+        Tuple of (results, elapsed_seconds). results maps each partition name
+        to its run_analyzers results plus 'meaningful', the number of
+        messages that survived filtering.
+    """
+    start = time.perf_counter()
+    batches = batch_partitions({name: len(messages) for name, messages in partitions.items()})
+    results = {}
+    
+    workers = min(max_workers or available_cpus(), len(batches))
+    
+    if parallel and workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(
+                        _analyze_partitions,
+                        {name: partitions[name] for name in batch},
+                        stages,
+                        matcher,
+                        collapse,
+                    )
+                    for batch in batches
+                ]
+                for future in futures:
+                    results.update(future.result())
+        except (OSError, BrokenProcessPool):
+            # Process pools can be unavailable (sandboxes, frozen apps) - run inline
+            results = {}
+    
+    if not results:
+        results = _analyze_partitions(partitions, stages, matcher, collapse)
+    
+    return results, time.perf_counter() - start
@@ -7,12 +7,17 @@ Supports macOS, Windows, and Linux.
 
 import sqlite3
 import json
+import math
 import os
 import platform
 import hashlib
+import random
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional
+from urllib.parse import unquote
+
+from .profiling import StageProfiler
 
 
 def get_cursor_db_path() -> Path:
@@ -79,135 +84,484 @@ def get_workspace_db_paths() -> list[Path]:
     return db_paths
 
 
-def extract_messages(db_path: Path, days: Optional[int] = None) -> list[dict]:
+def get_workspace_names() -> dict[str, str]:
     """
-    Extract user messages from Cursor's SQLite database.
+    Map workspace storage directories to the name of the project folder they belong to.
+    
+    Returns:
+        Dictionary mapping workspace directory names (the 'workspace' tag on
+        messages) to project folder names
+    """
+    names = {}
+    for db_path in get_workspace_db_paths():
+        try:
+            with open(db_path.parent / "workspace.json", encoding="utf-8") as f:
+                data = json.load(f)
+            # Single-folder workspaces have 'folder', multi-root ones 'workspace'
+            folder = data.get('folder') or data.get('workspace') or ''
+        except (OSError, json.JSONDecodeError, AttributeError):
+            continue
+        name = folder.rstrip('/').rsplit('/', 1)[-1]
+        if name:
+            names[db_path.parent.name] = unquote(name)
+    return names
+
+
+def partition_by_workspace(messages: list[dict]) -> dict[str, list[dict]]:
+    """
+    Split messages by the workspace they were sent in.
+    
+    Messages read from the global database carry no workspace tag; they are
+    assigned to the workspace of any other message from the same composer.
+    Messages whose workspace is still unknown are left out.
     
     Args:
-        db_path: Path to the state.vscdb file
-        days: If set, only extract messages from the last N days
+        messages: List of message dictionaries with 'composer_id' keys
         
     Returns:
-        List of message dictionaries with 'text' and 'composer_id' keys
+        Dictionary mapping workspace names to their messages
     """
-    messages = []
+    composer_workspaces = {}
+    for msg in messages:
+        if msg.get('workspace'):
+            composer_workspaces.setdefault(msg.get('composer_id'), msg['workspace'])
+    
+    partitions = {}
+    for msg in messages:
+        workspace = msg.get('workspace') or composer_workspaces.get(msg.get('composer_id'))
+        if workspace:
+            partitions.setdefault(workspace, []).append(msg)
+    return partitions
+
+
+def get_bubble_signature(db_path: Path) -> Optional[list[int]]:
+    """
+    Summarize a database's bubbles without reading them, to tell whether any were added.
+    
+    Cursor rewrites its database constantly (window state, settings), so the
+    file's mtime says little; the count and highest rowid of the bubble rows
+    only change when a bubble is added, removed or rewritten.
+    
+    Args:
+        db_path: Path to a state.vscdb file
+        
+    Returns:
+        [count, max rowid] of its bubble rows, or None if it can't be read
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            count, max_rowid = conn.execute(
+                "SELECT COUNT(*), MAX(rowid) FROM cursorDiskKV WHERE key >= 'bubbleId:' AND key < 'bubbleId;'"
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return [count, max_rowid or 0]
+
+
+def get_composer_timestamps(db_path: Path) -> dict:
+    """
+    Read when each composer (chat session) was created.
     
-    # Get composer timestamps for date filtering
+    Args:
+        db_path: Path to the state.vscdb file
+        
+    Returns:
+        Dictionary mapping composer IDs to creation time in epoch milliseconds
+    """
     composer_timestamps = {}
     
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    cursor.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'composerData:%'")
+    for key, value in cursor.fetchall():
+        try:
+            data = json.loads(value)
+            composer_id = key.replace('composerData:', '')
+            created = data.get('createdAt') or data.get('lastUpdatedAt')
+            if created:
+                composer_timestamps[composer_id] = created
+        except (json.JSONDecodeError, TypeError, KeyError):
+            pass
+    conn.close()
     
-    if days:
-        cursor.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'composerData:%'")
-        for key, value in cursor.fetchall():
-            try:
-                data = json.loads(value)
-                composer_id = key.replace('composerData:', '')
-                created = data.get('createdAt') or data.get('lastUpdatedAt')
-                if created:
-                    composer_timestamps[composer_id] = created
-            except (json.JSONDecodeError, KeyError):
-                pass
+    return composer_timestamps
+
+
+def parse_conversation_header(value) -> Optional[dict]:
+    """
+    Read a composer's ordered list of bubbles from its composerData value.
+    
+    Newer Cursor versions list bubble headers in 'fullConversationHeadersOnly'
+    and store the bubbles under their own keys; older ones embed the whole
+    'conversation' in composerData.
+    
+    Args:
+        value: The stored composerData JSON
+        
+    Returns:
+        Dictionary with 'created_at', 'updated_at', 'inline' (whether bubbles
+        are embedded in composerData) and 'bubbles', an ordered list of
+        (bubble_id, type, created_at) tuples, or None if it can't be parsed
+    """
+    try:
+        data = json.loads(value)
+        bubbles = data.get('fullConversationHeadersOnly')
+        inline = bubbles is None
+        if inline:
+            bubbles = data.get('conversation') or []
+        return {
+            'created_at': data.get('createdAt'),
+            'updated_at': data.get('lastUpdatedAt'),
+            'inline': inline,
+            'bubbles': [
+                (bubble['bubbleId'], bubble.get('type'), bubble.get('createdAt'))
+                for bubble in bubbles
+                if isinstance(bubble, dict) and bubble.get('bubbleId')
+            ],
+        }
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return None
+
+
+def _rowid_since(conn: sqlite3.Connection, signature: Optional[list[int]]) -> int:
+    """
+    Get the rowid above which a database's bubbles are new since an earlier read.
+    
+    Added bubbles (and rewritten ones, whose key conflict replaces the row)
+    get rowids above the highest one so far. If more bubbles were added than
+    there are rows above it, VACUUM renumbered the rows and all of them count
+    as new.
+    
+    Args:
+        conn: Open connection to a state.vscdb file
+        signature: Its get_bubble_signature at the earlier read (None if never read)
+        
+    Returns:
+        Rowid to read bubbles after (0 to read them all)
+    """
+    if not signature:
+        return 0
+    count, max_rowid = signature
+    total, newer = conn.execute(
+        "SELECT COUNT(*), COUNT(CASE WHEN rowid > ? THEN 1 END) FROM cursorDiskKV "
+        "WHERE key >= 'bubbleId:' AND key < 'bubbleId;'",
+        (max_rowid,),
+    ).fetchone()
+    return max_rowid if total - count <= newer else 0
+
+
+def _bubble_keys_by_composer(conn: sqlite3.Connection) -> dict[str, list[str]]:
+    """Group bubble keys by composer with a keys-only scan of the key index, which never reads the values."""
+    strata = {}
+    for (key,) in conn.execute("SELECT key FROM cursorDiskKV WHERE key >= 'bubbleId:' AND key < 'bubbleId;'"):
+        parts = key.split(':')
+        if len(parts) >= 2:
+            strata.setdefault(parts[1], []).append(key)
+    return strata
+
+
+def _parse_bubble(key: str, value) -> Optional[dict]:
+    """Turn a bubble row into a message dictionary, or None if it isn't a user message."""
+    if value is None:
+        return None
+    
+    try:
+        data = json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    
+    # Type 1 = user message, Type 2 = assistant
+    if not isinstance(data, dict) or data.get('type') != 1:
+        return None
+    text = data.get('text', '') or data.get('rawText', '')
+    if not text or len(text.strip()) <= 5:
+        return None
+    
+    parts = key.split(':')
+    return {
+        'text': text.strip(),
+        'composer_id': parts[1],
+        'bubble_id': parts[2] if len(parts) > 2 else data.get('bubbleId', 'unknown'),
+        'created_at': data.get('createdAt'),
+    }
+
+
+def unique_by_text(messages, seen: Optional[set] = None):
+    """
+    Drop messages whose text was already seen, keeping the first copy.
+    
+    Args:
+        messages: Message dictionaries, in order of preference
+        seen: Text hashes seen so far, updated in place (to dedupe across calls)
+        
+    Yields:
+        Messages with text not seen before
+    """
+    seen = set() if seen is None else seen
+    for msg in messages:
+        text_hash = hashlib.md5(msg['text'].encode()).hexdigest()
+        if text_hash not in seen:
+            seen.add(text_hash)
+            yield msg
+
+
+def _unique_by_bubble(messages):
+    """Drop further copies of the same bubble (from workspace databases), keeping the first."""
+    seen = set()
+    for msg in messages:
+        key = (msg['composer_id'], msg['bubble_id'])
+        if key not in seen:
+            seen.add(key)
+            yield msg
+
+
+def _tag_workspaces(messages: list[dict]):
+    """Tag each message with the workspace its composer was found in, if any."""
+    composer_workspaces = {}
+    for msg in messages:
+        if msg.get('workspace'):
+            composer_workspaces.setdefault(msg['composer_id'], msg['workspace'])
+    for msg in messages:
+        if not msg.get('workspace') and msg['composer_id'] in composer_workspaces:
+            msg['workspace'] = composer_workspaces[msg['composer_id']]
+
+
+def _read_bubbles(
+    conn: sqlite3.Connection,
+    recent_composers: Optional[set] = None,
+    sample: Optional[float] = None,
+    seed: int = 0,
+    workspace: Optional[str] = None,
+    after: int = 0,
+) -> list[dict]:
+    """
+    Read the user messages in one database.
+    
+    Args:
+        conn: Open connection to a state.vscdb file
+        recent_composers: If set, only read bubbles of these composers
+        sample: If set, the fraction of each composer's bubbles to read
+        seed: Seed for choosing which bubbles are sampled
+        workspace: Workspace tag for the messages (workspace databases only)
+        after: Only read bubble rows with a higher rowid (unsampled reads only)
+        
+    Returns:
+        List of message dictionaries from _parse_bubble, with 'sample_weight'
+        when sampling and 'workspace' when given
+    """
+    messages = []
+    for key, value, weight in _bubble_rows(conn, sample, seed, after):
+        # Filtered on the key, so skipped bubbles are never parsed
+        if recent_composers is not None and key.split(':')[1] not in recent_composers:
+            continue
+        message = _parse_bubble(key, value)
+        if message is None:
+            continue
+        if sample is not None:
+            message['sample_weight'] = weight
+        if workspace:
+            message['workspace'] = workspace
+        messages.append(message)
+    return messages
+
+
+def _bubble_rows(conn: sqlite3.Connection, sample: Optional[float] = None, seed: int = 0, after: int = 0) -> list[tuple]:
+    """
+    Read bubble rows, optionally as a stratified random sample per composer.
+    
+    Args:
+        conn: Open connection to a state.vscdb file
+        sample: If set, the fraction of each composer's bubbles to read
+        seed: Seed for choosing which bubbles are sampled
+        after: Only read rows with a higher rowid (unsampled reads only)
+        
+    Returns:
+        List of (key, value, weight) tuples, where weight is how many bubbles
+        of the same composer each sampled bubble stands for
+    """
+    if sample is None:
+        rows = conn.execute(
+            "SELECT key, value FROM cursorDiskKV WHERE key LIKE 'bubbleId:%' AND rowid > ?", (after,)
+        ).fetchall()
+        return [(key, value, 1) for key, value in rows]
+    
+    strata = _bubble_keys_by_composer(conn)
+    
+    # The same fraction of every composer's bubbles, at least one each
+    rng = random.Random(seed)
+    chosen = []
+    for composer_id in sorted(strata):
+        keys = strata[composer_id]
+        taken = min(len(keys), max(1, math.ceil(len(keys) * sample)))
+        weight = len(keys) / taken
+        chosen.extend((key, weight) for key in rng.sample(keys, taken))
+    
+    # Only the sampled rows' values are fetched and parsed
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS sampled_bubbles (key TEXT PRIMARY KEY, weight REAL)")
+    conn.execute("DELETE FROM sampled_bubbles")
+    conn.executemany("INSERT INTO sampled_bubbles VALUES (?, ?)", chosen)
+    return conn.execute(
+        "SELECT kv.key, kv.value, s.weight FROM sampled_bubbles AS s "
+        "JOIN cursorDiskKV AS kv ON kv.key = s.key"
+    ).fetchall()
+
+
+def extract_messages(
+    db_path: Path,
+    days: Optional[int] = None,
+    sample: Optional[float] = None,
+    seed: int = 0,
+    profiler: Optional[StageProfiler] = None,
+    keep_repeats: bool = False,
+    since: Optional[dict] = None,
+) -> list[dict]:
+    """
+    Extract user messages from Cursor's SQLite database.
+    
+    Args:
+        db_path: Path to the state.vscdb file
+        days: If set, only extract messages from the last N days
+        sample: If set, only read this fraction of each composer's bubbles,
+            and tag each message with a 'sample_weight'
+        seed: Seed for choosing which bubbles are sampled
+        profiler: Optional StageProfiler to record each database read in
+        keep_repeats: Keep every message sent more than once, in read order,
+            instead of only the first one with each text (each bubble still
+            appears once); unique_by_text gives the usual result
+        since: Signature of each database by path (from get_bubble_signature)
+            at an earlier read; if set, only bubbles added or rewritten since
+            are read. Not combined with sample.
         
+    Returns:
+        List of message dictionaries with 'text' and 'composer_id' keys
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    messages = []
+    
+    if days:
+        composer_timestamps = get_composer_timestamps(db_path)
         cutoff = (datetime.now() - timedelta(days=days)).timestamp() * 1000
         recent_composers = {k for k, v in composer_timestamps.items() if v > cutoff}
     else:
         recent_composers = None
     
-    # Extract messages from bubbleId entries
-    cursor.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'bubbleId:%'")
-    
-    for key, value in cursor.fetchall():
+    with profiler.stage(db_path.name) as stage:
+        conn = sqlite3.connect(db_path)
         try:
-            # Skip null values
-            if value is None:
-                continue
-                
-            parts = key.split(':')
-            if len(parts) >= 2:
-                composer_id = parts[1]
-                
-                # Filter by date if specified
-                if recent_composers is not None and composer_id not in recent_composers:
-                    continue
-                
-                data = json.loads(value)
-                
-                # Type 1 = user message, Type 2 = assistant
-                if data.get('type') == 1:
-                    text = data.get('text', '') or data.get('rawText', '')
-                    if text and len(text.strip()) > 5:
-                        bubble_id = parts[2] if len(parts) > 2 else data.get('bubbleId', 'unknown')
-                        messages.append({
-                            'text': text.strip(),
-                            'composer_id': composer_id,
-                            'bubble_id': bubble_id,
-                            'created_at': data.get('createdAt'),
-                        })
-        except (json.JSONDecodeError, KeyError, IndexError):
-            continue
-    
-    conn.close()
+            after = _rowid_since(conn, since.get(str(db_path))) if since is not None else 0
+            messages.extend(_read_bubbles(conn, recent_composers, sample, seed, after=after))
+        finally:
+            conn.close()
+        stage['rows'] = len(messages)
     
     # Also extract from workspace databases
     workspace_dbs = get_workspace_db_paths()
     for ws_db in workspace_dbs:
         try:
-            ws_messages = _extract_from_db(ws_db, recent_composers)
+            with profiler.stage(f"{ws_db.parent.name[:8]}/{ws_db.name}") as stage:
+                ws_messages = _extract_from_db(ws_db, recent_composers, sample, seed, since)
+                stage['rows'] = len(ws_messages)
             messages.extend(ws_messages)
         except Exception:
             continue
     
-    # Deduplicate by text hash
-    seen = set()
-    unique_messages = []
-    for msg in messages:
-        text_hash = hashlib.md5(msg['text'].encode()).hexdigest()
-        if text_hash not in seen:
-            seen.add(text_hash)
-            unique_messages.append(msg)
+    # Workspace databases hold copies of chats that are in the global one too,
+    # and dedupe keeps the global copy, so the tag goes on every copy first
+    _tag_workspaces(messages)
     
-    return unique_messages
+    if keep_repeats:
+        return list(_unique_by_bubble(messages))
+    return list(unique_by_text(messages))
 
 
-def _extract_from_db(db_path: Path, recent_composers: Optional[set] = None) -> list[dict]:
-    """Extract messages from a single database file."""
-    messages = []
+def iter_recent_messages(db_path: Path, days: Optional[int] = None, batch_size: int = 25):
+    """
+    Extract user messages chat by chat, newest composer first.
     
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'bubbleId:%'")
+    Unlike extract_messages, each batch is read only when it is asked for,
+    so a caller can stop early and still have the most recent history.
+    
+    Args:
+        db_path: Path to the state.vscdb file
+        days: If set, only extract messages from the last N days
+        batch_size: Number of composers per batch
         
-        for key, value in cursor.fetchall():
+    Yields:
+        Dictionaries with 'messages' (deduplicated against earlier batches),
+        'composers' (composers read so far), 'total' (composers overall) and
+        'since' (creation time of the oldest composer read so far, if known)
+    """
+    composer_timestamps = get_composer_timestamps(db_path)
+    
+    # Global database first, then workspace databases, like extract_messages
+    sources = [(sqlite3.connect(db_path), None)]
+    for ws_db in get_workspace_db_paths():
+        try:
+            sources.append((sqlite3.connect(ws_db), ws_db.parent.name))
+        except sqlite3.Error:
+            continue
+    
+    try:
+        located = {}
+        for source in sources:
             try:
-                # Skip null values
-                if value is None:
-                    continue
-                    
-                parts = key.split(':')
-                if len(parts) >= 2:
-                    composer_id = parts[1]
-                    
-                    if recent_composers is not None and composer_id not in recent_composers:
-                        continue
-                    
-                    data = json.loads(value)
-                    if data.get('type') == 1:
-                        text = data.get('text', '') or data.get('rawText', '')
-                        if text and len(text.strip()) > 5:
-                            messages.append({
-                                'text': text.strip(),
-                                'composer_id': composer_id,
-                                'workspace': db_path.parent.name,
-                            })
-            except (json.JSONDecodeError, KeyError, IndexError):
+                for composer_id in _bubble_keys_by_composer(source[0]):
+                    located.setdefault(composer_id, []).append(source)
+            except sqlite3.Error:
                 continue
         
-        conn.close()
-    except Exception:
-        pass
-    
-    return messages
+        order = sorted(located, key=lambda c: composer_timestamps.get(c, 0), reverse=True)
+        if days:
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp() * 1000
+            order = [c for c in order if composer_timestamps.get(c, 0) > cutoff]
+        
+        seen = set()
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            messages = []
+            
+            for composer_id in batch:
+                # The global copy is read first, so it takes the workspace database's tag
+                workspace = next((ws for _, ws in located[composer_id] if ws), None)
+                for conn, _ in located[composer_id]:
+                    rows = conn.execute(
+                        "SELECT key, value FROM cursorDiskKV WHERE key >= ? AND key < ?",
+                        (f"bubbleId:{composer_id}:", f"bubbleId:{composer_id};"),
+                    )
+                    parsed = (_parse_bubble(key, value) for key, value in rows)
+                    for msg in unique_by_text((msg for msg in parsed if msg is not None), seen):
+                        if workspace:
+                            msg['workspace'] = workspace
+                        messages.append(msg)
+            
+            yield {
+                'messages': messages,
+                'composers': start + len(batch),
+                'total': len(order),
+                'since': composer_timestamps.get(batch[-1]),
+            }
+    finally:
+        for conn, _ in sources:
+            conn.close()
 
+
+def _extract_from_db(
+    db_path: Path,
+    recent_composers: Optional[set] = None,
+    sample: Optional[float] = None,
+    seed: int = 0,
+    since: Optional[dict] = None,
+) -> list[dict]:
+    """Extract messages from a workspace database file, tagged with its workspace."""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            after = _rowid_since(conn, since.get(str(db_path))) if since is not None else 0
+            return _read_bubbles(conn, recent_composers, sample, seed, workspace=db_path.parent.name, after=after)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return []
@@ -78,17 +78,18 @@ INSTRUCTION_INDICATORS = [
 ]
 
 
-def is_noise(text: str) -> bool:
+def is_noise(text: str, text_lower: Optional[str] = None) -> bool:
     """
     Check if a message is noise (not an instruction).
     
     Args:
         text: Message text to check
+        text_lower: Precomputed text.lower(), if available
         
     Returns:
         True if the message is noise and should be filtered
     """
-    text_lower = text.lower().strip()
+    text_lower = (text.lower() if text_lower is None else text_lower).strip()
     
     # Too short to be meaningful
     if len(text_lower) < 15:
@@ -123,17 +124,18 @@ def is_noise(text: str) -> bool:
     return False
 
 
-def is_instruction(text: str) -> bool:
+def is_instruction(text: str, text_lower: Optional[str] = None) -> bool:
     """
     Check if a message contains instruction-like content.
     
     Args:
         text: Message text to check
+        text_lower: Precomputed text.lower(), if available
         
     Returns:
         True if the message appears to be an instruction
     """
-    text_lower = text.lower()
+    text_lower = text.lower() if text_lower is None else text_lower
     
     # Check for instruction indicators
     for pattern in INSTRUCTION_INDICATORS:
@@ -149,18 +151,19 @@ def is_instruction(text: str) -> bool:
     return False
 
 
-def calculate_instruction_score(text: str) -> float:
+def calculate_instruction_score(text: str, text_lower: Optional[str] = None) -> float:
     """
     Calculate a score indicating how likely a message is to be an instruction.
     
     Args:
         text: Message text to score
+        text_lower: Precomputed text.lower(), if available
         
     Returns:
         Score from 0.0 (not instruction) to 1.0 (definitely instruction)
     """
     score = 0.0
-    text_lower = text.lower()
+    text_lower = text.lower() if text_lower is None else text_lower
     
     # Instruction indicators add to score
     for pattern in INSTRUCTION_INDICATORS:
@@ -203,16 +206,17 @@ def filter_noise(messages: list[dict], threshold: float = 0.2) -> list[dict]:
     
     for msg in messages:
         text = msg.get('text', '')
+        text_lower = msg['ir'].lower if 'ir' in msg else text.lower()
         
         # Skip if clearly noise
-        if is_noise(text):
+        if is_noise(text, text_lower):
             continue
         
         # Calculate instruction score
-        score = calculate_instruction_score(text)
+        score = calculate_instruction_score(text, text_lower)
         
         # Keep if score is above threshold OR if it's clearly an instruction
-        if score >= threshold or is_instruction(text):
+        if score >= threshold or is_instruction(text, text_lower):
             # Add score to message for potential later use
             msg_copy = msg.copy()
             msg_copy['instruction_score'] = score
@@ -0,0 +1,281 @@
+"""
+Similarity index module.
+
+Embeds messages offline with feature hashing plus a sparse random
+projection into a NumPy matrix, persists it, and answers top-k cosine
+queries ("have I told the agent this before?") without re-reading history.
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .normalize import MessageIR, Vocabulary, get_ir
+from .storage import get_data_dir
+
+
+# Embedding width; each hashed feature touches PROJECTIONS of these dimensions
+EMBEDDING_DIM = 128
+PROJECTIONS = 2
+
+# Bump when the embedding or storage layout changes so stale indexes get rebuilt
+INDEX_VERSION = 2
+
+# Messages embedded per vectorized batch
+BATCH_SIZE = 50_000
+
+_MASK64 = (1 << 64) - 1
+_BIGRAM_MIX = 0x9E3779B97F4A7C15
+
+
+def get_index_dir() -> Path:
+    """Get the directory holding the similarity index."""
+    index_dir = get_data_dir() / "index"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    return index_dir
+
+
+def _feature_hashes(ir: MessageIR) -> list[int]:
+    """Stable 64-bit hashes of a message's unigram and bigram features."""
+    hashes = ir.vocab.hashes
+    unigrams = [hashes[token_id] for token_id in ir.token_ids]
+    bigrams = [
+        ((first * _BIGRAM_MIX) & _MASK64) ^ second
+        for first, second in zip(unigrams, unigrams[1:])
+    ]
+    return unigrams + bigrams
+
+
+def embed_messages(messages: list[dict]) -> np.ndarray:
+    """
+    Embed messages as L2-normalized hashed random projections.
+    
+    Each feature (word or word pair) hash picks PROJECTIONS output
+    dimensions and signs, which is equivalent to multiplying the hashed
+    bag-of-features vector by a sparse random ±1 matrix.
+    
+    Args:
+        messages: List of message dictionaries with 'text' key
+        
+    Returns:
+        float32 array of shape (len(messages), EMBEDDING_DIM)
+    """
+    vectors = np.zeros((len(messages), EMBEDDING_DIM), dtype=np.float32)
+    
+    for start in range(0, len(messages), BATCH_SIZE):
+        rows, features = [], []
+        for row, msg in enumerate(messages[start:start + BATCH_SIZE], start):
+            feature_hashes = _feature_hashes(get_ir(msg))
+            rows.extend([row] * len(feature_hashes))
+            features.extend(feature_hashes)
+        if not features:
+            continue
+        
+        rows = np.array(rows, dtype=np.int64)
+        features = np.array(features, dtype=np.uint64)
+        for j in range(PROJECTIONS):
+            columns = ((features >> np.uint64(16 * j)) & np.uint64(0xFFFF)) % np.uint64(EMBEDDING_DIM)
+            signs = 1.0 - 2.0 * ((features >> np.uint64(48 + j)) & np.uint64(1)).astype(np.float32)
+            np.add.at(vectors, (rows, columns.astype(np.int64)), signs)
+    
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def embed_text(text: str) -> np.ndarray:
+    """
+    Embed a single query text.
+    
+    Args:
+        text: Query text
+        
+    Returns:
+        float32 vector of length EMBEDDING_DIM
+    """
+    return embed_messages([{'text': text, 'ir': MessageIR(text, Vocabulary())}])[0]
+
+
+class SimilarityIndex:
+    """
+    Persisted message embeddings with their texts.
+    
+    Vectors live in a memory-mapped .npy file; texts and metadata live in
+    SQLite so a query only reads the rows it returns. Messages are keyed by
+    composer and bubble ID, so new history is appended without re-embedding
+    what is already indexed.
+    """
+    
+    def __init__(self, index_dir: Optional[Path] = None):
+        self.index_dir = Path(index_dir) if index_dir else get_index_dir()
+        self.vectors_path = self.index_dir / "vectors.npy"
+        self.meta_path = self.index_dir / "meta.json"
+        self.texts_path = self.index_dir / "messages.sqlite"
+        self._vectors = None
+    
+    @property
+    def meta(self) -> dict:
+        """Index metadata ({} if the index was never built)."""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+    
+    def is_stale(self, sources: Optional[dict] = None) -> bool:
+        """
+        Check whether the index is missing, outdated, or behind its sources.
+        
+        Args:
+            sources: Signature of each source database by path, from
+                extractor.get_bubble_signature (None to only check that
+                the index exists and is current)
+        
+        Returns:
+            True if the index should be built or updated
+        """
+        meta = self.meta
+        return (
+            meta.get('version') != INDEX_VERSION
+            or not self.vectors_path.exists()
+            or (sources is not None and meta.get('sources') != sources)
+        )
+    
+    def build(self, messages: list[dict], sources: Optional[dict] = None) -> int:
+        """
+        Embed and store messages, replacing any previous index.
+        
+        Args:
+            messages: List of message dictionaries with 'text' key (and
+                'composer_id' and 'bubble_id' to update it later)
+            sources: Signature of the source databases the messages came from
+            
+        Returns:
+            Number of messages indexed
+        """
+        self._vectors = None
+        np.save(self.vectors_path, embed_messages(messages))
+        
+        if self.texts_path.exists():
+            self.texts_path.unlink()
+        conn = sqlite3.connect(self.texts_path)
+        with conn:
+            conn.execute(
+                "CREATE TABLE messages ("
+                "id INTEGER PRIMARY KEY, text TEXT, composer_id TEXT, created_at TEXT, bubble_id TEXT)"
+            )
+            self._insert(conn, messages, 0)
+        conn.close()
+        
+        self._write_meta(len(messages), sources)
+        return len(messages)
+    
+    def update(self, messages: list[dict], sources: Optional[dict] = None) -> int:
+        """
+        Embed and append the messages that aren't indexed yet.
+        
+        Builds the index from scratch if it is missing or outdated.
+        
+        Args:
+            messages: List of message dictionaries with 'text', 'composer_id'
+                and 'bubble_id' keys, e.g. the whole history again
+            sources: Signature of the source databases the messages came from
+            
+        Returns:
+            Number of messages added
+        """
+        if self.is_stale():
+            return self.build(messages, sources)
+        
+        conn = sqlite3.connect(self.texts_path)
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            indexed = set(conn.execute("SELECT composer_id, bubble_id FROM messages"))
+            new = [msg for msg in messages if (msg.get('composer_id'), msg.get('bubble_id')) not in indexed]
+            
+            if new:
+                self._vectors = None
+                vectors = np.concatenate([np.load(self.vectors_path), embed_messages(new)])
+                with conn:
+                    self._insert(conn, new, count)
+                np.save(self.vectors_path, vectors)
+        finally:
+            conn.close()
+        
+        self._write_meta(count + len(new), sources)
+        return len(new)
+    
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, messages: list[dict], first_id: int):
+        """Store message texts, numbered from first_id (their rows in the vector matrix)."""
+        conn.executemany(
+            "INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+            (
+                (i, msg['text'], msg.get('composer_id'),
+                 None if msg.get('created_at') is None else str(msg['created_at']),
+                 msg.get('bubble_id'))
+                for i, msg in enumerate(messages, first_id)
+            ),
+        )
+    
+    def _write_meta(self, count: int, sources: Optional[dict]):
+        """Record the index layout, size and the sources it is up to date with."""
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'dim': EMBEDDING_DIM,
+                'count': count,
+                'built_at': time.time(),
+                'sources': sources,
+            }, f)
+    
+    def search(self, query: str, k: int = 10, min_score: float = 0.0) -> list[dict]:
+        """
+        Find the messages most similar to a query.
+        
+        Args:
+            query: Query text
+            k: Maximum number of results
+            min_score: Minimum cosine similarity to report
+            
+        Returns:
+            List of dictionaries with 'score', 'text', 'composer_id' and
+            'created_at', best first
+        """
+        if self._vectors is None:
+            self._vectors = np.load(self.vectors_path, mmap_mode='r')
+        vectors = self._vectors
+        if len(vectors) == 0:
+            return []
+        
+        scores = vectors @ embed_text(query)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = [int(i) for i in top if scores[i] >= min_score]
+        if not top:
+            return []
+        
+        conn = sqlite3.connect(self.texts_path)
+        placeholders = ",".join("?" * len(top))
+        rows = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                f"SELECT id, text, composer_id, created_at FROM messages WHERE id IN ({placeholders})", top
+            )
+        }
+        conn.close()
+        
+        return [
+            {
+                'score': float(scores[i]),
+                'text': rows[i][0],
+                'composer_id': rows[i][1],
+                'created_at': rows[i][2],
+            }
+            for i in top
+        ]
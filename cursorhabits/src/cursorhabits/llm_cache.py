@@ -0,0 +1,148 @@
+"""
+LLM response cache module.
+
+Stores LLM responses on disk keyed by a hash of the full request (model,
+sampling parameters and messages), so rerunning on unchanged patterns
+answers instantly without a network call. Entries expire after a TTL and
+the least recently used ones are evicted once the cache outgrows its size
+limit.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from .storage import get_data_dir
+
+
+# Bump when the cached response format changes
+CACHE_VERSION = 1
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+
+def get_llm_cache_path() -> Path:
+    """Get the default path of the LLM response cache database."""
+    cache_dir = get_data_dir() / "cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / "llm.sqlite"
+
+
+def request_key(request: dict) -> str:
+    """
+    Hash an LLM request into a cache key.
+    
+    Args:
+        request: Keyword arguments of the completion call (model,
+            temperature, max_tokens, messages, ...)
+    
+    Returns:
+        Hex SHA-256 digest, identical for byte-identical requests
+    """
+    payload = json.dumps([CACHE_VERSION, request], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk LLM response cache with a TTL and LRU size eviction.
+    
+    Counts hits and misses for the lifetime of the object.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = Path(path) if path else get_llm_cache_path()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS responses_by_use ON responses (used_at);
+        """)
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+        
+        Args:
+            key: Key from request_key
+        
+        Returns:
+            The cached response, or None if missing or expired
+        """
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        
+        if row is None or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        
+        with self.conn:
+            self.conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+    
+    def put(self, key: str, content: str):
+        """
+        Store a response, then evict expired and least recently used entries.
+        
+        Args:
+            key: Key from request_key
+            content: Response text
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, content, len(content.encode()), now, now),
+            )
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            
+            # Drop the least recently used entries until the cache fits
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY used_at", (key,)
+                ).fetchall()
+                evicted = []
+                for old_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    total -= size
+                self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+    
+    def stats(self) -> str:
+        """Summarize hits and misses, e.g. "1 hit, 0 misses"."""
+        hits = "hit" if self.hits == 1 else "hits"
+        misses = "miss" if self.misses == 1 else "misses"
+        return f"{self.hits} {hits}, {self.misses} {misses}"
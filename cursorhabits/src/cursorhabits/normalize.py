@@ -0,0 +1,128 @@
+"""
+Text normalization module.
+
+Tokenizes each message once into a shared intermediate representation
+(lowercased text, token IDs and significant-word set) that the filters and
+every analyzer reuse, instead of each re-tokenizing the raw text.
+"""
+
+import hashlib
+import re
+from array import array
+from typing import Optional
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Words shorter than this are ignored for similarity
+MIN_SIGNIFICANT_LENGTH = 4
+
+_MASK64 = (1 << 64) - 1
+
+
+def stable_hash(token: str) -> int:
+    """Hash a token to 64 bits, identically across processes and runs."""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+
+
+def significant_words(text: str) -> set:
+    """Extract significant words (4+ chars) from text."""
+    return set(re.findall(r'\b\w{4,}\b', text.lower()))
+
+
+def jaccard(words1: set, words2: set) -> float:
+    """Calculate Jaccard similarity between two word sets."""
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+class Vocabulary:
+    """Maps tokens to dense integer IDs, with a stable 64-bit hash per token."""
+    
+    def __init__(self):
+        self.ids = {}
+        self.tokens = []
+        self.hashes = []
+    
+    def __len__(self) -> int:
+        return len(self.tokens)
+    
+    def intern(self, token: str) -> int:
+        """Get the ID of a token, adding it if new."""
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.ids[token] = token_id
+            self.tokens.append(token)
+            self.hashes.append(stable_hash(token))
+        return token_id
+
+
+class MessageIR:
+    """
+    Normalized form of one message.
+    
+    Attributes:
+        lower: Lowercased text
+        token_ids: Array of vocabulary IDs, one per \\w+ token
+        words: Frozen set of significant (4+ char) words
+        words_hash: Order-independent 64-bit hash of words
+        vocab: Vocabulary the token IDs refer to
+    """
+    
+    __slots__ = ('lower', 'token_ids', 'words', 'words_hash', 'vocab')
+    
+    def __init__(self, text: str, vocab: "Vocabulary"):
+        self.lower = text.lower()
+        self.vocab = vocab
+        tokens = TOKEN_RE.findall(self.lower)
+        self.token_ids = array('I', [vocab.intern(token) for token in tokens])
+        self.words = frozenset(token for token in tokens if len(token) >= MIN_SIGNIFICANT_LENGTH)
+        words_hash = 0
+        for word in self.words:
+            words_hash = (words_hash + vocab.hashes[vocab.ids[word]]) & _MASK64
+        self.words_hash = words_hash
+    
+    def tokens(self) -> list[str]:
+        """Get the token strings."""
+        return [self.vocab.tokens[token_id] for token_id in self.token_ids]
+
+
+# Vocabulary shared by messages normalized without an explicit one
+_default_vocab = Vocabulary()
+
+
+def get_ir(msg: dict, vocab: Optional[Vocabulary] = None) -> MessageIR:
+    """
+    Get a message's normalized form, computing and caching it on first use.
+    
+    Args:
+        msg: Message dictionary with 'text' key (gains an 'ir' key)
+        vocab: Vocabulary to intern tokens into (defaults to a shared one)
+        
+    Returns:
+        The message's MessageIR
+    """
+    ir = msg.get('ir')
+    if ir is None:
+        ir = MessageIR(msg['text'], vocab or _default_vocab)
+        msg['ir'] = ir
+    return ir
+
+
+def normalize_messages(messages: list[dict], vocab: Optional[Vocabulary] = None) -> list[dict]:
+    """
+    Attach a MessageIR to every message that doesn't have one yet.
+    
+    Args:
+        messages: List of message dictionaries with 'text' key
+        vocab: Vocabulary to intern tokens into (a fresh one per call if None)
+        
+    Returns:
+        The same list, with an 'ir' key on each message
+    """
+    vocab = vocab or Vocabulary()
+    for msg in messages:
+        get_ir(msg, vocab)
+    return messages
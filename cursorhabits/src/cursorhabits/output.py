@@ -4,21 +4,27 @@ Output formatting module.
 Provides beautiful terminal output using the Rich library.
 """
 
+from math import ceil
 from pathlib import Path
 from datetime import datetime
 
-from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 from rich import box
 
 from .filters import clean_text
+from .ui import console
 
-console = Console()
 
-
-def print_results(patterns: dict, phrases: list, use_llm: bool = False):
+def print_results(
+    patterns: dict,
+    phrases: list,
+    use_llm: bool = False,
+    associations: dict = None,
+    phrase_intervals: dict = None,
+    corrections: list = None,
+):
     """
     Print analysis results in a beautiful format.
     
@@ -26,6 +32,11 @@ def print_results(patterns: dict, phrases: list, use_llm: bool = False):
         patterns: Dictionary of detected patterns
         phrases: List of (phrase, count) tuples
         use_llm: Whether LLM synthesis was used
+        associations: Optional pattern associations from find_pattern_associations
+        phrase_intervals: Optional (low, high) confidence intervals by phrase,
+            when counts are estimated from a sample
+        corrections: Optional instructions repeated within a session, from
+            find_repeated_corrections
     """
     console.print()
     
@@ -34,6 +45,23 @@ def print_results(patterns: dict, phrases: list, use_llm: bool = False):
         console.print("[dim]Try running with more chat history or fewer days filter.[/dim]")
         return
     
+    # Repeated within a chat (if any) - the habits the assistant forgets
+    if corrections:
+        console.print("[bold]Repeated Within a Chat[/bold] [dim](high priority)[/dim]")
+        console.print()
+        
+        for correction in corrections[:5]:
+            text = clean_text(correction['text'])
+            if len(text) > 70:
+                text = text[:67] + "..."
+            label = f"[bold]{correction['label']}[/bold] " if correction['label'] else ""
+            console.print(
+                f"  [red]![/red] {label}\"{text}\" "
+                f"[dim](repeated in {correction['sessions']} chats, {correction['repeats']}x)[/dim]"
+            )
+        
+        console.print()
+    
     # Patterns section
     console.print("[bold]Detected Patterns[/bold]")
     console.print()
@@ -44,7 +72,13 @@ def print_results(patterns: dict, phrases: list, use_llm: bool = False):
         examples = data.get('examples', [])
         
         # Pattern header
-        console.print(f"  [cyan][{i}][/cyan] [bold]{label}[/bold] [dim]({count} mentions)[/dim]")
+        new_tag = " [magenta]new[/magenta]" if data.get('discovered') else ""
+        if 'interval' in data:
+            low, high = data['interval']
+            mentions = f"~{count} mentions, 95% CI {low}–{high}"
+        else:
+            mentions = f"{count} mentions"
+        console.print(f"  [cyan][{i}][/cyan] [bold]{label}[/bold]{new_tag} [dim]({mentions})[/dim]")
         
         # Show top example
         if examples:
@@ -61,7 +95,26 @@ def print_results(patterns: dict, phrases: list, use_llm: bool = False):
         console.print()
         
         for phrase, count in phrases[:5]:
-            console.print(f"  [dim]({count}x)[/dim] \"{phrase}\"")
+            if phrase_intervals and phrase in phrase_intervals:
+                low, high = phrase_intervals[phrase]
+                console.print(f"  [dim](~{count}x, {low}–{high})[/dim] \"{phrase}\"")
+            else:
+                console.print(f"  [dim]({count}x)[/dim] \"{phrase}\"")
+        
+        console.print()
+    
+    # Habits that go together (if any)
+    rules = (associations or {}).get('rules', [])
+    if rules:
+        console.print("[bold]Habits That Go Together[/bold]")
+        console.print()
+        
+        for rule in rules[:5]:
+            antecedent = " + ".join(rule['antecedent_labels'])
+            console.print(
+                f"  {antecedent} [cyan]→[/cyan] {rule['consequent_label']} "
+                f"[dim]({rule['confidence']:.0%} of the time, {rule['lift']:.1f}x lift)[/dim]"
+            )
         
         console.print()
     
@@ -72,6 +125,121 @@ def print_results(patterns: dict, phrases: list, use_llm: bool = False):
         console.print("[dim]Tip: Run without --no-llm for AI-enhanced rules[/dim]")
 
 
+def print_sample_summary(report: dict, fraction: float, top: int = 5):
+    """
+    Print how far estimates from a sampled run can be trusted.
+    
+    Args:
+        report: Result of sampling.sample_report
+        fraction: Fraction of the history that was sampled
+        top: How many of the top patterns the ranking advice covers
+    """
+    console.print(
+        f"[dim]Estimated from {report['sample_size']} of ~{report['population']} messages "
+        f"({fraction:.0%} sample)[/dim]"
+    )
+    
+    needed = report['needed']
+    if needed is None:
+        return
+    if needed <= report['sample_size']:
+        console.print(f"[green]✓[/green] Top {top} ranking is stable at this sample size")
+    elif needed >= report['population']:
+        console.print(
+            f"[yellow]⚠[/yellow] Top {top} patterns are too close to rank reliably from a sample; "
+            f"run without --sample for exact counts"
+        )
+    else:
+        suggested = min(1.0, ceil(100 * needed / report['population']) / 100)
+        console.print(
+            f"[yellow]⚠[/yellow] Top {top} ranking needs ~{needed} messages to be stable; "
+            f"try [cyan]--sample {suggested:g}[/cyan]"
+        )
+
+
+def print_synthesis_stats(stats: dict, deadline: float):
+    """
+    Print how AI synthesis went, and why the basic rules were used if they were.
+    
+    Args:
+        stats: Stats from synthesizer.synthesize_with_deadline
+        deadline: The synthesis deadline in seconds
+    """
+    retries = f", {stats['retries']} {'retry' if stats['retries'] == 1 else 'retries'}" if stats['retries'] else ""
+    
+    if stats['source'] == 'llm':
+        console.print(f"[dim]AI synthesis took {stats['llm_seconds']:.1f}s{retries}[/dim]")
+    elif stats['fallback'] == 'deadline':
+        console.print(
+            f"[yellow]⚠[/yellow] AI synthesis missed the {deadline:g}s deadline{retries}; "
+            f"used the basic rules [dim](try --llm-timeout)[/dim]"
+        )
+    elif stats['fallback'] == 'error':
+        console.print(
+            f"[yellow]⚠[/yellow] AI synthesis failed after {stats['attempts']} "
+            f"{'attempt' if stats['attempts'] == 1 else 'attempts'}; used the basic rules"
+        )
+
+
+def _format_bytes(count) -> str:
+    """Format a byte count for a table cell, e.g. "12.3 MB" ("-" if unknown)."""
+    if count is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if abs(count) < 1024:
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+def print_profile(metrics: dict):
+    """
+    Print where the run spent its time and memory, stage by stage.
+    
+    Args:
+        metrics: Metrics from profiling.StageProfiler.to_dict
+    """
+    table = Table(box=box.SIMPLE, title="Run profile")
+    table.add_column("Stage")
+    table.add_column("Wall", justify="right")
+    table.add_column("CPU", justify="right")
+    table.add_column("Rows", justify="right")
+    table.add_column("Read", justify="right")
+    table.add_column("Peak memory", justify="right")
+    
+    def row(name, stage, style=None):
+        cpu = stage.get('cpu_seconds')
+        rows = stage.get('rows')
+        table.add_row(
+            name,
+            f"{stage['wall_seconds']:.3f}s",
+            f"{cpu:.3f}s" if cpu is not None else "-",
+            f"{rows:,}" if rows is not None else "-",
+            _format_bytes(stage.get('bytes_read')),
+            _format_bytes(stage.get('peak_memory_bytes')),
+            style=style,
+        )
+    
+    for stage in metrics['stages']:
+        name = "  " * stage['depth'] + stage['name']
+        if stage['process'] == 'worker':
+            name += " [dim](worker)[/dim]"
+        row(name, stage)
+    
+    table.add_section()
+    row("total", metrics['total'], style="bold")
+    console.print(table)
+    
+    max_rss = metrics['total'].get('max_rss_bytes')
+    notes = []
+    if max_rss is not None:
+        notes.append(f"peak RSS {_format_bytes(max_rss)}")
+    if metrics['memory_traced']:
+        notes.append("peak memory is Python allocations (tracemalloc), which slows the run down somewhat")
+    notes.append("total CPU includes worker processes")
+    console.print(f"[dim]{'; '.join(notes)}[/dim]")
+
+
 def save_rules(content: str, output_path: Path):
     """
     Save generated rules to a file.
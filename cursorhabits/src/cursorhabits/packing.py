@@ -0,0 +1,190 @@
+"""
+Prompt packing module.
+
+Fills the synthesis prompt's sections (corrections, patterns, phrases,
+clusters, associations) within a token budget. Every candidate line gets a
+value from how often it came up and how instruction-like it is; the most
+valuable lines are packed first, and lines that repeat one already packed
+are skipped, so the budget goes to the strongest, most varied evidence.
+"""
+
+import re
+from math import ceil
+from typing import Optional
+
+from .filters import calculate_instruction_score, clean_text
+from .normalize import jaccard, significant_words
+
+
+# Tokens for the variable part of the synthesis prompt
+DEFAULT_PROMPT_TOKENS = 1200
+
+# Word overlap at which a line repeats one already packed
+REDUNDANT_SIMILARITY = 0.6
+
+# Value multipliers by kind of line: repeated corrections are the strongest
+# evidence, an example is worth less than its pattern's header (so it is
+# never packed without it), and n-gram phrases are fragments
+CORRECTION_WEIGHT = 2.0
+EXAMPLE_WEIGHT = 0.9
+PHRASE_WEIGHT = 0.5
+CLUSTER_WEIGHT = 0.5
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens a text takes, without a tokenizer.
+    
+    Counts each punctuation mark as a token and each word as one token per
+    6 characters, which slightly overestimates typical BPE tokenizers on
+    English, so packed prompts stay within budget.
+    
+    Args:
+        text: Text to measure
+    
+    Returns:
+        Estimated token count
+    """
+    return sum(ceil(len(piece) / 6) for piece in _TOKEN_PIECES.findall(text))
+
+
+def _candidates(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: Optional[dict],
+    corrections: Optional[list],
+) -> list[dict]:
+    """
+    List every line that could go into the prompt.
+    
+    Returns:
+        Dictionaries with 'section', 'order' (position in the full prompt),
+        'text' (the prompt line), 'value', 'parent' (index of the line it
+        needs, or None) and 'evidence' (text checked for redundancy, or None)
+    """
+    items = []
+    
+    def add(section, text, value, parent=None, evidence=None):
+        items.append({
+            'section': section, 'order': len(items), 'text': text,
+            'value': value, 'parent': parent, 'evidence': evidence,
+        })
+        return len(items) - 1
+    
+    for correction in corrections or []:
+        label = f"{correction['label']}: " if correction['label'] else ""
+        text = clean_text(correction['text'])[:150]
+        add(
+            'corrections',
+            f"- {label}\"{text}\" (repeated in {correction['sessions']} sessions, {correction['repeats']} times)\n",
+            (correction['sessions'] + correction['repeats']) * CORRECTION_WEIGHT,
+            evidence=text,
+        )
+    
+    for name, data in patterns.items():
+        count = data['count']
+        header = add('patterns', f"\n### {data.get('label', name)} ({count} occurrences)\n", count)
+        examples = data.get('examples', [])
+        scores = data.get('example_scores') or [calculate_instruction_score(ex) for ex in examples]
+        for example, score in zip(examples, scores):
+            text = clean_text(example)[:150]
+            add('patterns', f"- \"{text}\"\n", count * EXAMPLE_WEIGHT * (0.5 + score / 2), header, text)
+    
+    for phrase, count in phrases:
+        add('phrases', f"- ({count}x) \"{phrase}\"\n", count * PHRASE_WEIGHT, evidence=phrase)
+    
+    for i, cluster in enumerate(clusters, 1):
+        size = len(cluster)
+        parent = None
+        for msg in cluster:
+            text = clean_text(msg)[:100]
+            line = f"- \"{text}\"\n"
+            value = size * CLUSTER_WEIGHT * (0.5 + calculate_instruction_score(msg) / 2)
+            if parent is None:
+                # A cluster's header only makes sense with a message under it
+                line = f"\nCluster {i} ({size} similar messages):\n" + line
+                parent = add('clusters', line, value, evidence=text)
+            else:
+                add('clusters', line, min(value, items[parent]['value']), parent, text)
+    
+    for rule in (associations or {}).get('rules', []):
+        antecedent = " + ".join(rule['antecedent_labels'])
+        add(
+            'associations',
+            f"- {antecedent} -> {rule['consequent_label']} "
+            f"(confidence {rule['confidence']:.0%}, lift {rule['lift']:.1f})\n",
+            rule['count'] * rule['confidence'],
+        )
+    
+    return items
+
+
+def pack_prompt(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: Optional[dict] = None,
+    corrections: Optional[list] = None,
+    max_tokens: int = DEFAULT_PROMPT_TOKENS,
+) -> tuple[dict, dict]:
+    """
+    Pack the most valuable evidence into the synthesis prompt's sections.
+    
+    Lines are taken in order of value while they fit the budget. A line is
+    skipped if what it shows repeats a line already packed (mostly the same
+    significant words, or a phrase inside a packed message), or if the line
+    it belongs under (a pattern's header) didn't fit. Packed lines keep
+    their usual order within each section.
+    
+    Args:
+        patterns: Dictionary of detected patterns (with 'example_scores' if available)
+        phrases: List of (phrase, count) tuples
+        clusters: List of similar message groups
+        associations: Optional pattern associations from find_pattern_associations
+        corrections: Optional instructions repeated within a session
+        max_tokens: Token budget for all sections together
+    
+    Returns:
+        (sections, stats): prompt text for 'corrections', 'patterns',
+        'phrases', 'clusters' and 'associations' (empty if nothing was
+        packed), and stats with 'tokens', 'packed', 'redundant' and
+        'over_budget' line counts
+    """
+    items = _candidates(patterns, phrases, clusters, associations, corrections)
+    packed = set()
+    evidence = []  # (lowercased text, significant words) of packed lines
+    stats = {'tokens': 0, 'packed': 0, 'redundant': 0, 'over_budget': 0}
+    
+    for item in sorted(items, key=lambda item: (-item['value'], item['order'])):
+        if item['parent'] is not None and item['parent'] not in packed:
+            stats['over_budget'] += 1
+            continue
+        
+        words = None
+        if item['evidence']:
+            lower = item['evidence'].lower()
+            words = significant_words(lower)
+            if any(lower in packed_lower or jaccard(words, packed_words) >= REDUNDANT_SIMILARITY
+                   for packed_lower, packed_words in evidence):
+                stats['redundant'] += 1
+                continue
+        
+        tokens = estimate_tokens(item['text'])
+        if stats['tokens'] + tokens > max_tokens:
+            stats['over_budget'] += 1
+            continue
+        
+        packed.add(item['order'])
+        stats['tokens'] += tokens
+        stats['packed'] += 1
+        if words is not None:
+            evidence.append((lower, words))
+    
+    sections = dict.fromkeys(['corrections', 'patterns', 'phrases', 'clusters', 'associations'], "")
+    for item in items:
+        if item['order'] in packed:
+            sections[item['section']] += item['text']
+    return sections, stats
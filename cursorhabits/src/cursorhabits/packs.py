@@ -0,0 +1,207 @@
+"""
+Pattern pack module.
+
+Loads team-specific pattern packs (TOML or JSON files with regexes, labels
+and rule templates) and compiles them, together with the built-in patterns,
+into a single prefiltered matcher. Parsed packs are cached on disk keyed by
+a hash of their contents.
+
+Example pack (``~/.cursorhabits/packs/acme.toml``):
+
+    name = "acme"
+
+    [[patterns]]
+    name = "acme_deploy"
+    regex = "shipit|acme deploy"
+    label = "Deployment"
+    rule = "Deploy with `shipit`, never by hand"
+"""
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Optional
+
+from .analyzer import PATTERN_DEFINITIONS, PatternMatcher, required_literals
+from .storage import get_data_dir
+
+
+PACK_SUFFIXES = ('.toml', '.json')
+
+# Bump when the cached pack format (or literal extraction) changes
+PACK_CACHE_VERSION = 1
+
+
+def get_packs_dir() -> Path:
+    """Get the directory that is searched for pattern packs."""
+    return get_data_dir() / "packs"
+
+
+def _get_cache_dir() -> Path:
+    cache_dir = get_data_dir() / "cache" / "packs"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def find_pack_files(extra_paths: tuple = ()) -> list[Path]:
+    """
+    List pack files from the packs directory plus any given explicitly.
+    
+    Args:
+        extra_paths: Additional pack files
+        
+    Returns:
+        Pack file paths, packs directory first (sorted by name)
+    """
+    packs_dir = get_packs_dir()
+    paths = []
+    if packs_dir.is_dir():
+        paths = sorted(p for p in packs_dir.iterdir() if p.suffix in PACK_SUFFIXES)
+    return paths + [Path(p) for p in extra_paths]
+
+
+def _parse_pack(raw: bytes, path: Path) -> dict:
+    """Parse and validate a pack file's contents."""
+    try:
+        if path.suffix == '.toml':
+            try:
+                import tomllib
+            except ImportError:  # Python < 3.11
+                import tomli as tomllib
+            data = tomllib.loads(raw.decode('utf-8'))
+        else:
+            data = json.loads(raw.decode('utf-8'))
+    except ImportError:
+        raise ValueError(f"{path}: reading TOML packs needs Python 3.11+ or the 'tomli' package")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"{path}: could not parse pack ({e})")
+    
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: a pack must be a table (JSON object) with a 'patterns' list")
+    if not isinstance(data.get('patterns', []), list):
+        raise ValueError(f"{path}: 'patterns' must be a list")
+    if not isinstance(data.get('name') or '', str):
+        raise ValueError(f"{path}: 'name' must be a string")
+    
+    pack_name = data.get('name') or path.stem
+    patterns = []
+    for i, entry in enumerate(data.get('patterns', []), 1):
+        if not isinstance(entry, dict) or not entry.get('name') or not entry.get('regex'):
+            raise ValueError(f"{path}: pattern #{i} needs at least 'name' and 'regex'")
+        for field in ('name', 'regex', 'label', 'category', 'rule'):
+            if entry.get(field) is not None and not isinstance(entry[field], str):
+                raise ValueError(f"{path}: pattern #{i} '{field}' must be a string")
+        try:
+            re.compile(entry['regex'], re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"{path}: pattern '{entry['name']}' has an invalid regex ({e})")
+        
+        label = entry.get('label') or entry['name'].replace('_', ' ').title()
+        patterns.append({
+            'name': entry['name'],
+            'regex': entry['regex'],
+            'label': label,
+            'category': entry.get('category') or label,
+            'rule': entry.get('rule'),
+            'literals': required_literals(entry['regex']),
+        })
+    
+    return {'name': pack_name, 'path': str(path), 'patterns': patterns}
+
+
+def load_pack(path: Path) -> dict:
+    """
+    Load one pattern pack, using the on-disk cache when its contents are unchanged.
+    
+    Args:
+        path: Pack file (.toml or .json)
+        
+    Returns:
+        Dictionary with 'name', 'path' and 'patterns' (each with name,
+        regex, label, category, rule and literals)
+        
+    Raises:
+        ValueError: If the pack is malformed
+        FileNotFoundError: If the pack doesn't exist
+    """
+    path = Path(path)
+    raw = path.read_bytes()
+    key = hashlib.sha256(
+        raw + f"\0{PACK_CACHE_VERSION}\0{sys.version_info[:2]}\0{path.suffix}".encode()
+    ).hexdigest()
+    cache_file = _get_cache_dir() / f"{key}.json"
+    
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            pack = json.load(f)
+        pack['path'] = str(path)
+        return pack
+    except (OSError, json.JSONDecodeError):
+        pass
+    
+    pack = _parse_pack(raw, path)
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(pack, f, ensure_ascii=False)
+    except OSError:
+        pass  # Caching is an optimization only
+    return pack
+
+
+def load_packs(extra_paths: tuple = ()) -> list[dict]:
+    """
+    Load every installed pack plus any given explicitly.
+    
+    Args:
+        extra_paths: Additional pack files
+        
+    Returns:
+        List of loaded packs
+    """
+    return [load_pack(path) for path in find_pack_files(extra_paths)]
+
+
+def build_matcher(packs: list[dict]) -> PatternMatcher:
+    """
+    Compile the built-in patterns and all pack patterns into one matcher.
+    
+    Pack patterns are matched case-insensitively. A pack pattern with the
+    same name as a built-in one replaces it.
+    
+    Args:
+        packs: Loaded packs
+        
+    Returns:
+        Combined PatternMatcher
+    """
+    matcher = PatternMatcher(PATTERN_DEFINITIONS)
+    for pack in packs:
+        for pattern in pack['patterns']:
+            matcher.add(
+                pattern['name'],
+                pattern['regex'],
+                pattern['label'],
+                flags=re.IGNORECASE,
+                literals=pattern['literals'],
+            )
+    return matcher
+
+
+def pack_rule_templates(packs: list[dict]) -> dict:
+    """
+    Collect rule templates from packs for synthesize_rules_basic.
+    
+    Args:
+        packs: Loaded packs
+        
+    Returns:
+        Dictionary mapping pattern names to (category, rule) tuples
+    """
+    templates = {}
+    for pack in packs:
+        for pattern in pack['patterns']:
+            if pattern['rule']:
+                templates[pattern['name']] = (pattern['category'], pattern['rule'])
+    return templates
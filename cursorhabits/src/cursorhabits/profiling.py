@@ -0,0 +1,238 @@
+"""
+Stage profiling module.
+
+Records where a run spends its time and memory: wall and CPU time, rows
+processed, bytes read and peak memory for each stage (finding the
+database, extracting each database, filtering, each analyzer, synthesis,
+saving). Stages nest, so a stage's numbers include its sub-stages.
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+# Bump when the metrics JSON layout changes
+METRICS_VERSION = 1
+
+# tracemalloc.reset_peak is new in Python 3.9; before that, a stage's peak
+# memory is how much its traced memory grew
+RESETS_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+def bytes_read() -> Optional[int]:
+    """
+    Get the bytes this process has read so far (Linux only).
+    
+    Counts reads served from the page cache too, so it measures how much
+    data a stage pulled in whether or not the disk was touched.
+    
+    Returns:
+        Byte count, or None where the platform doesn't report it
+    """
+    try:
+        with open("/proc/self/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def max_rss() -> Optional[int]:
+    """
+    Get the process's peak resident memory in bytes.
+    
+    Returns:
+        Peak RSS, or None where the platform doesn't report it (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageProfiler:
+    """
+    Per-stage wall time, CPU time, rows, bytes read and peak memory.
+    
+    A disabled profiler measures nothing, so code can always wrap its
+    stages in profiler.stage() and only pay for it when profiling.
+    """
+    
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = []
+        self._open = []
+        self._started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._start_times = os.times()
+        self._start_read = bytes_read()
+        
+        # Reading /proc/self/io counts as a read too; stages don't pay for it
+        self._read_overhead = bytes_read() - self._start_read if self._start_read is not None else 0
+        
+        # Tracing allocations slows Python code down, so only while profiling
+        self._tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+    
+    def close(self):
+        """Stop tracing memory, if this profiler started it."""
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None):
+        """
+        Measure a stage.
+        
+        Args:
+            name: Stage name
+            rows: Rows (messages, records) the stage processes, if known
+                up front
+        
+        Yields:
+            The stage's record; set its 'rows' if they are only known inside
+        """
+        record = {'name': name, 'rows': rows}
+        if not self.enabled:
+            yield record
+            return
+        
+        record['depth'] = len(self._open)
+        record['process'] = 'main'
+        self.stages.append(record)
+        
+        # The enclosing stage keeps its peak so far, since ours resets it
+        if self.trace_memory:
+            if RESETS_PEAK:
+                if self._open:
+                    parent = self._open[-1]
+                    parent['_peak'] = max(parent['_peak'], tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+            else:
+                record['_start'] = tracemalloc.get_traced_memory()[0]
+            record['_peak'] = 0
+        self._open.append(record)
+        
+        read_before = bytes_read()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            read_after = bytes_read()
+            record['bytes_read'] = (
+                max(read_after - read_before - self._read_overhead, 0)
+                if read_before is not None and read_after is not None else None
+            )
+            self._open.pop()
+            
+            peak = None
+            if self.trace_memory:
+                current, process_peak = tracemalloc.get_traced_memory()
+                start = record.pop('_start', None)
+                grown = process_peak if start is None else current - start
+                peak = max(record.pop('_peak'), grown, 0)
+                if self._open:
+                    self._open[-1]['_peak'] = max(self._open[-1]['_peak'], peak)
+            record['peak_memory_bytes'] = peak
+            record['max_rss_bytes'] = max_rss()
+    
+    def add(self, name: str, wall_seconds: float, cpu_seconds: Optional[float] = None, rows: Optional[int] = None):
+        """
+        Record a sub-stage measured elsewhere, such as in a worker process.
+        
+        Args:
+            name: Stage name
+            wall_seconds: Wall time
+            cpu_seconds: CPU time in the process that ran it
+            rows: Rows processed
+        """
+        if not self.enabled:
+            return
+        self.stages.append({
+            'name': name,
+            'rows': rows,
+            'depth': len(self._open),
+            'process': 'worker',
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'bytes_read': None,
+            'peak_memory_bytes': None,
+            'max_rss_bytes': None,
+        })
+    
+    def totals(self) -> dict:
+        """
+        Measure the whole run so far.
+        
+        Returns:
+            Dictionary with 'wall_seconds', 'cpu_seconds' (including worker
+            processes that have finished), 'bytes_read', 'peak_memory_bytes'
+            and 'max_rss_bytes'
+        """
+        now = os.times()
+        read = bytes_read()
+        return {
+            'wall_seconds': time.perf_counter() - self._start,
+            'cpu_seconds': sum(now[:4]) - sum(self._start_times[:4]),
+            'bytes_read': read - self._start_read if read is not None and self._start_read is not None else None,
+            'peak_memory_bytes': max(
+                (stage['peak_memory_bytes'] for stage in self.stages if stage.get('peak_memory_bytes') is not None),
+                default=None,
+            ),
+            'max_rss_bytes': max_rss(),
+        }
+    
+    def to_dict(self) -> dict:
+        """
+        Get the metrics as JSON-ready data.
+        
+        Returns:
+            Dictionary with 'version', 'started_at', 'python', 'platform',
+            'memory_traced', 'total' (from totals) and 'stages' (one record
+            per stage, in the order they started)
+        """
+        return {
+            'version': METRICS_VERSION,
+            'started_at': self._started_at.isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': sys.platform,
+            'memory_traced': self.trace_memory,
+            'total': self.totals(),
+            'stages': [{key: value for key, value in stage.items() if not key.startswith('_')} for stage in self.stages],
+        }
+    
+    def write_json(self, path: Path, metrics: Optional[dict] = None):
+        """
+        Write the metrics to a JSON file.
+        
+        Args:
+            path: Where to write them
+            metrics: Metrics from to_dict (taken now if not given)
+        """
+        metrics = metrics or self.to_dict()
+        Path(path).write_text(json.dumps(metrics, indent=2) + "\n", encoding='utf-8')
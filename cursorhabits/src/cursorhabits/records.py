@@ -0,0 +1,197 @@
+"""
+Machine-readable output module.
+
+Turns a run's results into plain JSON-ready records for batch jobs and
+other tooling: patterns, phrases, clusters, associations, repeated
+corrections, the synthesized rules and per-stage metrics. Written either
+as one JSON document or as NDJSON, one record per line with a 'type'.
+Nothing here uses rich.
+"""
+
+import json
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+# Bump when the record layout changes
+RECORDS_VERSION = 1
+
+FORMATS = ('json', 'ndjson')
+
+# Lists in the JSON document, and the 'type' of their NDJSON records
+RECORD_TYPES = {
+    'patterns': 'pattern',
+    'phrases': 'phrase',
+    'clusters': 'cluster',
+    'association_rules': 'association',
+    'corrections': 'correction',
+    'rules': 'rule',
+}
+
+_BULLET = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+(.*\S)')
+
+
+def rule_records(rules_content: str) -> list[dict]:
+    """
+    Split a rules file into one record per rule.
+    
+    Args:
+        rules_content: Markdown from the synthesizer
+    
+    Returns:
+        List of {'section', 'text'}, where section is the rule's heading
+        (None before the first one)
+    """
+    records = []
+    section = None
+    for line in rules_content.splitlines():
+        if line.startswith('## '):
+            section = line[3:].strip()
+            continue
+        match = _BULLET.match(line)
+        if match:
+            records.append({'section': section, 'text': match.group(1)})
+    return records
+
+
+def build_report(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: dict,
+    rules_content: str,
+    rules_source: str,
+    phrase_intervals: dict = None,
+    corrections: list = None,
+    covered: dict = None,
+    synthesis: dict = None,
+    note: str = None,
+    metrics: dict = None,
+) -> dict:
+    """
+    Collect a run's results into one JSON-ready document.
+    
+    Args:
+        patterns: Detected patterns (including discovered ones and any
+            already covered by existing rules)
+        phrases: List of (phrase, count) tuples
+        clusters: Lists of similar messages
+        associations: Result of find_pattern_associations
+        rules_content: The synthesized rules (markdown)
+        rules_source: 'llm' or 'basic'
+        phrase_intervals: Optional (low, high) intervals by phrase, for
+            sampled runs
+        corrections: Optional result of find_repeated_corrections
+        covered: Optional result of coverage.find_covered
+        synthesis: Optional AI synthesis stats from synthesize_with_deadline
+        note: Optional coverage note from a --budget run
+        metrics: Optional StageProfiler.to_dict() result
+    
+    Returns:
+        The report, with one list per entry in RECORD_TYPES
+    """
+    covered_patterns = (covered or {}).get('patterns', {})
+    covered_clusters = (covered or {}).get('clusters', set())
+    phrase_intervals = phrase_intervals or {}
+    
+    return {
+        'version': RECORDS_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'rules_source': rules_source,
+        'note': note,
+        'synthesis': synthesis,
+        'patterns': [
+            {
+                'name': name,
+                'label': data.get('label', name.replace('_', ' ').title()),
+                'count': data['count'],
+                'discovered': bool(data.get('discovered')),
+                'interval': list(data['interval']) if 'interval' in data else None,
+                'examples': data.get('examples', []),
+                'covered_by': covered_patterns.get(name),
+            }
+            for name, data in patterns.items()
+        ],
+        'phrases': [
+            {
+                'phrase': phrase,
+                'count': count,
+                'interval': list(phrase_intervals[phrase]) if phrase in phrase_intervals else None,
+            }
+            for phrase, count in phrases
+        ],
+        'clusters': [
+            {'size': len(cluster), 'messages': cluster, 'covered': i in covered_clusters}
+            for i, cluster in enumerate(clusters)
+        ],
+        'association_rules': [
+            {
+                'antecedent': list(rule['antecedent']),
+                'consequent': rule['consequent'],
+                'antecedent_labels': rule['antecedent_labels'],
+                'consequent_label': rule['consequent_label'],
+                'confidence': rule['confidence'],
+                'lift': rule['lift'],
+            }
+            for rule in (associations or {}).get('rules', [])
+        ],
+        'corrections': corrections or [],
+        'rules': rule_records(rules_content),
+        'rules_markdown': rules_content,
+        'metrics': metrics,
+    }
+
+
+def ndjson_records(report: dict) -> Iterator[dict]:
+    """
+    Flatten a report into NDJSON records.
+    
+    The first record ('run') has the report's scalar fields and metric
+    totals; then come its list entries and one 'stage' record per metrics
+    stage, each with a 'type'.
+    
+    Args:
+        report: Result of build_report
+    
+    Yields:
+        Records in output order
+    """
+    metrics = report.get('metrics')
+    run = {key: value for key, value in report.items() if key not in RECORD_TYPES and key != 'metrics'}
+    if metrics:
+        run['metrics'] = {key: value for key, value in metrics.items() if key != 'stages'}
+    yield {'type': 'run', **run}
+    
+    for key, record_type in RECORD_TYPES.items():
+        for record in report[key]:
+            yield {'type': record_type, **record}
+    
+    for stage in (metrics or {}).get('stages', []):
+        yield {'type': 'stage', **stage}
+
+
+def write_records(report: dict, fmt: str, path: Optional[str] = None):
+    """
+    Write a report as JSON or NDJSON.
+    
+    Args:
+        report: Result of build_report
+        fmt: 'json' or 'ndjson'
+        path: File to write, or None or '-' for stdout
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    
+    if fmt == 'json':
+        text = json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+    else:
+        text = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in ndjson_records(report))
+    
+    if path is None or path == '-':
+        sys.stdout.write(text)
+        sys.stdout.flush()
+    else:
+        Path(path).write_text(text, encoding='utf-8')
@@ -0,0 +1,210 @@
+"""
+Sampling estimates module.
+
+Turns counts from a stratified sample of the history (see extract_messages'
+sample option) into history-wide estimates with confidence intervals, and
+estimates how big a sample is needed to rank the top patterns reliably.
+"""
+
+from math import ceil, sqrt
+from typing import Optional
+
+from .analyzer import PatternMatcher, message_patterns, message_weight
+from .normalize import get_ir
+
+
+Z_95 = 1.96
+
+
+def wilson_interval(successes: float, trials: float, z: float = Z_95) -> tuple[float, float]:
+    """
+    Wilson score interval for a proportion.
+    
+    Args:
+        successes: Number of sampled messages with the property
+        trials: Number of sampled messages
+        z: Normal quantile for the confidence level (1.96 for 95%)
+    
+    Returns:
+        (low, high) bounds of the proportion, within [0, 1]
+    """
+    if trials <= 0:
+        return 0.0, 1.0
+    
+    p = min(successes / trials, 1.0)
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def required_sample_size(counts: list[float], sample_size: float, top: int = 5, z: float = Z_95) -> Optional[int]:
+    """
+    Estimate how many messages are needed to rank the top patterns reliably.
+    
+    Each neighbouring pair in the ranking must differ by more than z standard
+    errors of the difference between their proportions.
+    
+    Args:
+        counts: Sampled pattern counts, in ranking order (may be fractional
+            when they are effective counts of a weighted sample)
+        sample_size: Number of sampled messages the counts come from
+        top: How many of the top patterns should be ranked reliably
+        z: Normal quantile for the confidence level (1.96 for 95%)
+    
+    Returns:
+        Number of messages needed, or None if no pair can be separated
+        (fewer than two patterns, or only exact ties)
+    """
+    if sample_size <= 0:
+        return None
+    
+    proportions = [count / sample_size for count in counts[:top]]
+    needed = None
+    
+    for p1, p2 in zip(proportions, proportions[1:]):
+        gap = p1 - p2
+        if gap <= 0:
+            continue
+        n = z * z * (p1 + p2 - gap * gap) / (gap * gap)
+        needed = max(needed or 0, ceil(n))
+    
+    return needed
+
+
+def pattern_members(patterns: dict, messages: list[dict], matcher: Optional[PatternMatcher] = None) -> dict:
+    """
+    Find which sampled messages each pattern result counted.
+    
+    Known patterns are matched like analyze_patterns does; discovered
+    categories (with 'terms') like discover_categories does, i.e. messages
+    matching no known pattern that mention one of the category's terms.
+    
+    Args:
+        patterns: Pattern results from analyze_patterns/discover_categories
+        messages: The messages the results were computed from
+        matcher: Patterns the results were matched with
+    
+    Returns:
+        Dictionary mapping pattern names to lists of message indices
+    """
+    members = {name: [] for name in patterns}
+    discovered = {name: set(data['terms']) for name, data in patterns.items() if data.get('terms')}
+    for i, msg in enumerate(messages):
+        names = message_patterns(msg, matcher)
+        for name in names:
+            if name in members:
+                members[name].append(i)
+        if not names and discovered:
+            words = get_ir(msg).words
+            for name, terms in discovered.items():
+                if terms.intersection(words):
+                    members[name].append(i)
+    return members
+
+
+def phrase_members(phrases: list, messages: list[dict]) -> list[tuple[str, list[int]]]:
+    """
+    Find the messages containing each phrase, rather than its occurrences.
+    
+    find_repeated_phrases counts every occurrence, so a phrase repeated
+    within one message counts more than once there. Proportions of the
+    sample need each message counted at most once.
+    
+    Args:
+        phrases: (phrase, count) tuples from find_repeated_phrases
+        messages: The messages the phrases were found in
+    
+    Returns:
+        (phrase, message indices) tuples in the same order
+    """
+    texts = [f" {' '.join(get_ir(msg).tokens())} " for msg in messages]
+    return [
+        (phrase, [i for i, text in enumerate(texts) if f" {phrase} " in text])
+        for phrase, _ in phrases
+    ]
+
+
+def sample_report(
+    patterns: dict,
+    phrases: list,
+    messages: list[dict],
+    top: int = 5,
+    matcher: Optional[PatternMatcher] = None,
+) -> dict:
+    """
+    Estimate history-wide counts from analysis results on a sample.
+    
+    Composers are sampled at different rates (small ones are kept whole),
+    so each matching message counts with its own sample_weight (a
+    Horvitz-Thompson estimate), and intervals use the Kish effective sample
+    size instead of treating the sample as a simple random one.
+    
+    Args:
+        patterns: Pattern results from analyze_patterns on the sample
+        phrases: (phrase, count) tuples from find_repeated_phrases on the sample
+        messages: The sampled messages the results were computed from
+        top: How many of the top patterns should be ranked reliably
+        matcher: Patterns the results were matched with
+    
+    Returns:
+        Dictionary with 'sample_size', 'effective_size', 'population'
+        (estimated messages in the full history), 'patterns' mapping names
+        to (estimate, low, high), 'phrases' as (phrase, estimate, low, high)
+        tuples estimating the messages that contain each phrase, and
+        'needed' (messages needed for a stable top ranking, or None)
+    """
+    weights = [message_weight(msg) * msg.get('sample_weight', 1) for msg in messages]
+    sample_size = sum(message_weight(msg) for msg in messages)
+    population = sum(weights)
+    squares = sum(message_weight(msg) * msg.get('sample_weight', 1) ** 2 for msg in messages)
+    effective = population * population / squares if squares else 0
+    
+    def share(indices):
+        return sum(weights[i] for i in indices) / population if population else 0.0
+    
+    def estimate(indices):
+        p = share(indices)
+        low, high = wilson_interval(p * effective, effective)
+        return round(p * population), round(low * population), round(high * population)
+    
+    members = pattern_members(patterns, messages, matcher)
+    estimates = {name: estimate(indices) for name, indices in members.items()}
+    ranked = sorted(members, key=lambda name: -estimates[name][0])
+    
+    # Sample size needed at this design effect, in sampled messages
+    needed = required_sample_size([share(members[name]) * effective for name in ranked], effective, top=top)
+    if needed is not None:
+        needed = ceil(needed * sample_size / effective)
+    
+    return {
+        'sample_size': sample_size,
+        'effective_size': round(effective),
+        'population': round(population),
+        'patterns': {name: estimates[name] for name in ranked},
+        'phrases': [(phrase, *estimate(indices)) for phrase, indices in phrase_members(phrases, messages)],
+        'needed': needed,
+    }
+
+
+def apply_estimates(patterns: dict, phrases: list, report: dict) -> tuple[dict, list]:
+    """
+    Replace sampled counts with history-wide estimates.
+    
+    Args:
+        patterns: Pattern results from the sample
+        phrases: (phrase, count) tuples from the sample
+        report: Result of sample_report for the same results
+    
+    Returns:
+        (patterns, phrases) with estimated counts, phrases re-sorted by
+        them; each pattern also gets an 'interval' of (low, high)
+    """
+    estimated = {}
+    for name, data in patterns.items():
+        count, low, high = report['patterns'][name]
+        estimated[name] = {**data, 'count': count, 'interval': (low, high)}
+    
+    # Counting messages rather than occurrences can reorder phrases
+    phrases = sorted(((phrase, count) for phrase, count, _, _ in report['phrases']), key=lambda x: -x[1])
+    return estimated, phrases
@@ -0,0 +1,333 @@
+"""
+Incremental analysis state module.
+
+Keeps pattern counts, n-gram counts and example reservoirs in a mergeable
+object that can be saved to disk, so a rerun only has to count new messages.
+The saved state is a SQLite database: seen message hashes and n-gram counts
+are indexed rows, so a rerun looks up and writes only what it adds instead
+of loading and rewriting the whole history.
+"""
+
+import hashlib
+import json
+import sqlite3
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .analyzer import (
+    DEFAULT_MATCHER,
+    ExampleReservoir,
+    PatternMatcher,
+    message_patterns,
+    message_score,
+    message_weight,
+    count_ngrams,
+    select_phrases,
+)
+from .storage import get_data_dir
+
+
+STATE_VERSION = 3
+
+# N-grams seen only once are dropped if they don't recur within this many
+# days; they are most of all n-grams and almost never become phrases
+SINGLETON_TTL_DAYS = 30
+
+# Keys per IN (...) query when looking up saved rows
+LOOKUP_CHUNK = 500
+
+
+def get_state_path() -> Path:
+    """Get the default path of the persisted analysis state."""
+    return get_data_dir() / "state.sqlite"
+
+
+def message_hash(msg: dict) -> str:
+    """Hash a message the same way the extractor deduplicates it."""
+    return hashlib.md5(msg['text'].encode()).hexdigest()
+
+
+class AnalysisState:
+    """
+    Mergeable pattern and phrase counts over a set of messages.
+    
+    Messages are identified by their text hash, so updating with a message
+    that was already counted is a no-op. The matcher itself is not
+    persisted, only its fingerprint: a state saved with different patterns
+    is discarded on load, so pattern counts always cover the whole history.
+    
+    A loaded state keeps its database open: seen hashes and n-gram counts
+    stay there, and ngram_counts and seen hold only what was added since.
+    """
+    
+    def __init__(self, max_examples: int = 5, matcher: Optional[PatternMatcher] = None):
+        self.max_examples = max_examples
+        self.matcher = matcher or DEFAULT_MATCHER
+        self.pattern_counts = Counter()
+        self.pattern_examples = {}
+        self.ngram_counts = Counter()
+        self.seen = set()
+        self.path = None
+        self.conn = None
+    
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _lookup(self, query: str, keys: Iterable[str]) -> list[tuple]:
+        """Run a query with an IN (...) list over saved rows, in chunks of keys."""
+        if self.conn is None:
+            return []
+        keys = list(keys)
+        rows = []
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            rows.extend(self.conn.execute(query.format(','.join('?' * len(chunk))), chunk))
+        return rows
+    
+    def unseen(self, messages: list[dict]) -> list[dict]:
+        """
+        Select the messages that are not yet part of this state.
+        
+        Args:
+            messages: List of message dictionaries with 'text' key
+            
+        Returns:
+            Messages whose text has not been counted yet
+        """
+        digests = [message_hash(msg) for msg in messages]
+        saved = {row[0] for row in self._lookup("SELECT hash FROM seen WHERE hash IN ({})", set(digests))}
+        
+        delta = []
+        batch = set()
+        for msg, digest in zip(messages, digests):
+            if digest not in self.seen and digest not in saved and digest not in batch:
+                batch.add(digest)
+                delta.append(msg)
+        return delta
+    
+    def update(self, messages: list[dict]) -> int:
+        """
+        Add new messages to the counts.
+        
+        Args:
+            messages: List of message dictionaries with 'text' key
+            
+        Returns:
+            Number of messages that were actually new
+        """
+        delta = self.unseen(messages)
+        
+        for msg in delta:
+            names = message_patterns(msg, self.matcher)
+            if names:
+                score = message_score(msg)
+                for name in names:
+                    self.pattern_counts[name] += message_weight(msg)
+                    self._reservoir(name).add(msg['text'], score, msg['ir'].words)
+            self.seen.add(message_hash(msg))
+        
+        self.ngram_counts.update(count_ngrams(delta))
+        return len(delta)
+    
+    def merge(self, other: "AnalysisState") -> "AnalysisState":
+        """
+        Combine two states built from disjoint sets of messages.
+        
+        Args:
+            other: State to merge into this one (not loaded from disk)
+            
+        Returns:
+            This state, updated in place
+            
+        Raises:
+            ValueError: If both states counted some of the same messages, or
+                other was loaded from disk
+        """
+        if other.conn is not None:
+            raise ValueError("Cannot merge a saved analysis state into another")
+        if self.seen & other.seen or self._lookup("SELECT hash FROM seen WHERE hash IN ({})", other.seen):
+            raise ValueError("Cannot merge analysis states that share messages")
+        
+        self.pattern_counts.update(other.pattern_counts)
+        self.ngram_counts.update(other.ngram_counts)
+        for name, reservoir in other.pattern_examples.items():
+            for score, text in reservoir.scored():
+                self._reservoir(name).add(text, score)
+        self.seen |= other.seen
+        return self
+    
+    def _reservoir(self, name: str) -> ExampleReservoir:
+        """Get (or create) the example reservoir for a pattern."""
+        if name not in self.pattern_examples:
+            self.pattern_examples[name] = ExampleReservoir(k=self.max_examples)
+        return self.pattern_examples[name]
+    
+    def patterns(self) -> dict:
+        """
+        Get pattern results in the same shape as analyze_patterns.
+        
+        Returns:
+            Dictionary mapping pattern names to their data (count, label, examples)
+        """
+        patterns = {}
+        for name in self.matcher.names:
+            if self.pattern_counts[name]:
+                scored = self._reservoir(name).scored()
+                patterns[name] = {
+                    'count': self.pattern_counts[name],
+                    'label': self.matcher.labels[name],
+                    'examples': [text for _, text in scored],
+                    'example_scores': [score for score, _ in scored],
+                }
+        return dict(sorted(patterns.items(), key=lambda x: -x[1]['count']))
+    
+    def phrases(self, min_count: int = 3) -> list[tuple[str, int]]:
+        """
+        Get repeated phrases in the same shape as find_repeated_phrases.
+        
+        Args:
+            min_count: Minimum occurrences to be considered repeated
+            
+        Returns:
+            List of (phrase, count) tuples, sorted by frequency
+        """
+        if self.conn is None:
+            return select_phrases(self.ngram_counts, min_count=min_count)
+        
+        # Saved n-grams that are already frequent enough, plus saved counts of new ones
+        counts = Counter(dict(self.conn.execute("SELECT ngram, count FROM ngrams WHERE count >= ?", (min_count,))))
+        missing = [ngram for ngram in self.ngram_counts if ngram not in counts]
+        counts.update(dict(self._lookup("SELECT ngram, count FROM ngrams WHERE ngram IN ({})", missing)))
+        counts.update(self.ngram_counts)
+        return select_phrases(counts, min_count=min_count)
+    
+    def save(self, path: Optional[Path] = None):
+        """
+        Save the state to disk as a SQLite database.
+        
+        Saving to the database the state was loaded from only adds the new
+        seen hashes and n-gram counts; anything else is written in full to a
+        temporary file that then replaces the target. The state stays
+        attached to the saved database afterwards.
+        
+        Args:
+            path: File to write (defaults to get_state_path())
+        """
+        path = Path(path) if path else get_state_path()
+        if self.conn is not None and self.path == path:
+            self._write(self.conn)
+            return
+        
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(tmp_path)
+        if self.conn is not None:
+            self.conn.backup(conn)
+        _create_tables(conn)
+        self._write(conn)
+        conn.close()
+        tmp_path.replace(path)
+        
+        self.close()
+        self.path = path
+        self.conn = sqlite3.connect(path)
+    
+    def _write(self, conn: sqlite3.Connection):
+        """Add the unsaved hashes and n-gram counts to a database, and replace its pattern counts."""
+        today = date.today().toordinal()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((digest,) for digest in self.seen))
+            conn.executemany(
+                "INSERT INTO ngrams VALUES (?, ?, ?) "
+                "ON CONFLICT (ngram) DO UPDATE SET count = count + excluded.count, touched = excluded.touched",
+                ((ngram, count, today) for ngram, count in self.ngram_counts.items()),
+            )
+            conn.execute(
+                "DELETE FROM ngrams WHERE count = 1 AND touched < ?", (today - SINGLETON_TTL_DAYS,)
+            )
+            conn.execute("DELETE FROM patterns")
+            conn.executemany(
+                "INSERT INTO patterns VALUES (?, ?, ?)",
+                (
+                    (name, self.pattern_counts[name], json.dumps(self._reservoir(name).scored(), ensure_ascii=False))
+                    for name in self.pattern_counts
+                ),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [
+                    ('version', str(STATE_VERSION)),
+                    ('matcher', self.matcher.fingerprint()),
+                    ('max_examples', str(self.max_examples)),
+                ],
+            )
+        self.seen = set()
+        self.ngram_counts = Counter()
+    
+    @classmethod
+    def load(cls, path: Optional[Path] = None, matcher: Optional[PatternMatcher] = None) -> "AnalysisState":
+        """
+        Load a saved state, or start fresh if none exists.
+        
+        Only pattern counts and examples are read; seen hashes and n-gram
+        counts are looked up in the database as needed. An unreadable or
+        outdated file, or one counted with different patterns (e.g. after
+        adding a --pack), also yields a fresh state, which is rebuilt from
+        the full history on the next update.
+        
+        Args:
+            path: File to read (defaults to get_state_path())
+            matcher: Patterns to count (defaults to PATTERN_DEFINITIONS)
+            
+        Returns:
+            Loaded (or empty) AnalysisState
+        """
+        path = Path(path) if path else get_state_path()
+        if not path.exists():
+            return cls(matcher=matcher)
+        
+        conn = sqlite3.connect(path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            rows = conn.execute("SELECT name, count, examples FROM patterns").fetchall()
+        except sqlite3.Error:
+            conn.close()
+            return cls(matcher=matcher)
+        
+        state = cls(max_examples=int(meta.get('max_examples', 5)), matcher=matcher)
+        if meta.get('version') != str(STATE_VERSION) or meta.get('matcher') != state.matcher.fingerprint():
+            conn.close()
+            return cls(matcher=matcher)
+        
+        for name, count, examples in rows:
+            state.pattern_counts[name] = count
+            for score, text in json.loads(examples):
+                state._reservoir(name).add(text, score)
+        state.path = path
+        state.conn = conn
+        return state
+
+
+def _create_tables(conn: sqlite3.Connection):
+    """Create the state tables in a new database."""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS seen (hash TEXT PRIMARY KEY) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS ngrams (
+            ngram TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            touched INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ngrams_by_count ON ngrams (count, touched);
+        CREATE TABLE IF NOT EXISTS patterns (name TEXT PRIMARY KEY, count INTEGER NOT NULL, examples TEXT NOT NULL);
+    """)
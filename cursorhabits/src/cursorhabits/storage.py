@@ -0,0 +1,22 @@
+"""
+Local storage module.
+
+Locates the directory where cursorhabits keeps persisted analysis data.
+"""
+
+import os
+from pathlib import Path
+
+
+def get_data_dir() -> Path:
+    """
+    Get the cursorhabits data directory, creating it if needed.
+    
+    Uses $CURSORHABITS_HOME if set, otherwise ~/.cursorhabits.
+    
+    Returns:
+        Path to the data directory
+    """
+    data_dir = Path(os.environ.get("CURSORHABITS_HOME") or Path.home() / ".cursorhabits")
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
@@ -5,17 +5,28 @@ Uses LLM (OpenAI) to transform raw patterns into well-written, actionable rules.
 Falls back to basic synthesis if no API key is available.
 """
 
-import os
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
 from typing import Optional
 
+from .backends import DEFAULT_SYNTHESIS_DEADLINE, SynthesisBackend, get_backend
+from .deadline import Deadline
 from .filters import clean_text
+from .llm_cache import LLMCache, request_key
+from .packing import DEFAULT_PROMPT_TOKENS, pack_prompt
 
 
 SYNTHESIS_PROMPT = """You are helping a developer create personalized rules for their AI coding assistant (Cursor).
 
 Based on their chat history patterns, synthesize clear, actionable rules. The patterns below show what instructions they frequently give.
 
+INSTRUCTIONS REPEATED WITHIN THE SAME SESSION (the assistant forgot these - highest priority):
+{corrections}
+
 PATTERNS DETECTED:
 {patterns}
 
@@ -25,6 +36,9 @@ FREQUENTLY REPEATED PHRASES:
 SIMILAR MESSAGE CLUSTERS:
 {clusters}
 
+HABITS THAT GO TOGETHER (same session):
+{associations}
+
 Generate well-organized cursor rules in markdown format. Guidelines:
 1. Group related rules under clear category headers (## Deployment, ## Code Quality, etc.)
 2. Write rules as clear, imperative statements ("Push to GitHub after every change", not "User wants to push to GitHub")
@@ -33,11 +47,71 @@ Generate well-organized cursor rules in markdown format. Guidelines:
 5. Focus on actionable behaviors, not vague preferences
 6. Include specific details from the examples when relevant
 7. Skip any patterns that seem like noise or one-off requests
+8. Put rules for instructions repeated within a session first, under ## High Priority
 
 Output ONLY the markdown rules, no explanations or preamble."""
 
 
-def synthesize_rules(patterns: dict, phrases: list, clusters: list) -> Optional[str]:
+SECTION_PROMPT = """You are helping a developer create personalized rules for their AI coding assistant (Cursor).
+
+Write the rules for the "{section}" section of their rules file, based on these instructions they frequently give in their chat history:
+{items}
+
+Guidelines:
+1. Write rules as clear, imperative statements ("Push to GitHub after every change", not "User wants to push to GitHub")
+2. Combine similar instructions into single, comprehensive rules
+3. Be concise - each rule should be 1-2 sentences max
+4. Include specific details from the examples when relevant
+5. Skip anything that seems like noise or a one-off request
+
+Output ONLY a markdown bullet list of rules, no headers, explanations or preamble."""
+
+# Concurrent section requests in synthesize_rules_streaming
+DEFAULT_CONCURRENCY = 4
+
+# Retry policy of synthesize_with_deadline
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+
+
+# Map pattern names to rule templates
+RULE_TEMPLATES = {
+    'github_push': ('Deployment', 'Push to GitHub after every meaningful change - don\'t wait to be asked'),
+    'vercel_deploy': ('Deployment', 'Deploy to Vercel and test on production URL, not localhost'),
+    'update_docs': ('Documentation', 'Update README/docs with current state after significant changes'),
+    'mobile_check': ('Quality', 'Always evaluate how changes look on mobile before considering done'),
+    'no_fallbacks': ('Error Handling', 'No silent error handling - log errors clearly, then throw'),
+    'check_before': ('Planning', 'Think before implementing - explain approach first for complex tasks'),
+    'api_keys': ('Environment', 'When user provides API keys, add to .env immediately and confirm'),
+    'be_concise': ('Communication', 'Be concise - don\'t over-explain, focus on actionable information'),
+    'verify_data': ('Quality', 'Verify all calculations - trace at least one example end-to-end'),
+    'comment_code': ('Quality', 'Comment code for external developers - explain the "why"'),
+    'user_perspective': ('Quality', 'Always consider the real user experience - what would they actually see?'),
+    'clean_code': ('Quality', 'Clean up as you go - remove dead code, archive outdated content'),
+}
+
+
+def _synthesized_header() -> str:
+    """Header of an LLM-synthesized rules file."""
+    return f"""# Cursor Rules
+# Generated by cursorhabits on {datetime.now().strftime('%Y-%m-%d %H:%M')}
+# Synthesized from your chat history patterns
+
+"""
+
+
+def synthesize_rules(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: dict = None,
+    timeout: Optional[float] = None,
+    corrections: list = None,
+    cache: Optional[LLMCache] = None,
+    prompt_tokens: int = DEFAULT_PROMPT_TOKENS,
+    backend: Optional[SynthesisBackend] = None,
+) -> Optional[str]:
     """
     Use OpenAI to synthesize patterns into well-written rules.
     
@@ -45,91 +119,165 @@ def synthesize_rules(patterns: dict, phrases: list, clusters: list) -> Optional[
         patterns: Dictionary of detected patterns
         phrases: List of (phrase, count) tuples
         clusters: List of similar message groups
+        associations: Optional pattern associations from find_pattern_associations
+        timeout: If set, give up on the LLM (without retrying) after this many seconds
+        corrections: Optional instructions repeated within a session, from find_repeated_corrections
+        cache: Optional response cache; a byte-identical request is answered from it
+            without a network call
+        prompt_tokens: Token budget for the evidence packed into the prompt
+        backend: Where to send the request (defaults to get_backend())
         
     Returns:
         Synthesized rules as markdown string, or None if LLM unavailable
     """
-    # Check for API key
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        # Also check common Cursor locations
-        api_key = os.environ.get("CURSOR_OPENAI_API_KEY")
-    
-    if not api_key:
-        return None
-    
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-    except ImportError:
+        backend = backend or get_backend()
+    except ValueError:
         return None
-    except Exception:
+    if backend is None:
         return None
     
-    # Format patterns for prompt
-    patterns_text = ""
-    for name, data in list(patterns.items())[:10]:
-        label = data.get('label', name)
-        count = data['count']
-        examples = data.get('examples', [])[:3]
-        
-        patterns_text += f"\n### {label} ({count} occurrences)\n"
-        for ex in examples:
-            clean_ex = clean_text(ex)[:150]
-            patterns_text += f"- \"{clean_ex}\"\n"
-    
-    # Format phrases
-    phrases_text = ""
-    for phrase, count in phrases[:10]:
-        phrases_text += f"- ({count}x) \"{phrase}\"\n"
-    
-    # Format clusters
-    clusters_text = ""
-    for i, cluster in enumerate(clusters[:5], 1):
-        clusters_text += f"\nCluster {i} ({len(cluster)} similar messages):\n"
-        for msg in cluster[:3]:
-            clean_msg = clean_text(msg)[:100]
-            clusters_text += f"- \"{clean_msg}\"\n"
-    
-    prompt = SYNTHESIS_PROMPT.format(
-        patterns=patterns_text or "None detected",
-        phrases=phrases_text or "None detected",
-        clusters=clusters_text or "None detected",
-    )
+    request = _synthesis_request(patterns, phrases, clusters, associations, corrections, prompt_tokens)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Fast and cheap
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that creates clear, actionable rules for AI coding assistants."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000,
-        )
-        
-        content = response.choices[0].message.content
-        
         # Add header
-        header = f"""# Cursor Rules
-# Generated by cursorhabits on {datetime.now().strftime('%Y-%m-%d %H:%M')}
-# Synthesized from your chat history patterns
-
-"""
-        return header + content
+        return _synthesized_header() + _complete(request, backend, timeout, cache)
         
     except Exception as e:
         # Silently fail and return None to trigger fallback
         return None
 
 
-def synthesize_rules_basic(patterns: dict, phrases: list) -> str:
+def _synthesis_request(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: dict = None,
+    corrections: list = None,
+    prompt_tokens: int = DEFAULT_PROMPT_TOKENS,
+) -> dict:
+    """Build the chat completion request that synthesizes the whole rules file."""
+    sections, _ = pack_prompt(patterns, phrases, clusters, associations, corrections, max_tokens=prompt_tokens)
+    
+    prompt = SYNTHESIS_PROMPT.format(**{
+        section: text or "None detected" for section, text in sections.items()
+    })
+    
+    request = {
+        'model': "gpt-4o-mini",  # Fast and cheap
+        'messages': [
+            {"role": "system", "content": "You are a helpful assistant that creates clear, actionable rules for AI coding assistants."},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0.7,
+        'max_tokens': 2000,
+    }
+    return request
+
+
+def _cache_key(request: dict, backend: SynthesisBackend) -> str:
+    """Cache key of a request as the backend sends it (a custom server counts as a different model)."""
+    if backend.base_url:
+        return request_key({**request, 'base_url': backend.base_url})
+    return request_key(request)
+
+
+def _complete(
+    request: dict,
+    backend: SynthesisBackend,
+    timeout: Optional[float] = None,
+    cache: Optional[LLMCache] = None,
+) -> str:
+    """
+    Run a chat completion request, answering from the cache when possible.
+    
+    Raises:
+        Whatever the backend raises
+    """
+    request = backend.prepare(request)
+    key = _cache_key(request, backend)
+    content = cache.get(key) if cache else None
+    if content is not None:
+        return content
+    
+    content = backend.complete(request, timeout)
+    if not content:
+        raise ValueError("LLM returned an empty response")
+    if cache:
+        cache.put(key, content)
+    return content
+
+
+def synthesize_rules_batch(
+    jobs: list[dict],
+    timeout: Optional[float] = None,
+    cache: Optional[LLMCache] = None,
+    prompt_tokens: int = DEFAULT_PROMPT_TOKENS,
+    backend: Optional[SynthesisBackend] = None,
+) -> list[Optional[str]]:
+    """
+    Synthesize several rules files at once (e.g. one per workspace).
+    
+    Requests not answered from the cache are submitted together, so they
+    run concurrently over the backend's pooled connections.
+    
+    Args:
+        jobs: Dictionaries with 'patterns', 'phrases', 'clusters' and
+            optionally 'associations' and 'corrections', as for synthesize_rules
+        timeout: If set, give up on each request (without retrying) after this many seconds
+        cache: Optional response cache
+        prompt_tokens: Token budget for the evidence packed into each prompt
+        backend: Where to send the requests (defaults to get_backend())
+    
+    Returns:
+        Synthesized rules per job, in order (None where the LLM was unavailable or failed)
+    """
+    try:
+        backend = backend or get_backend()
+    except ValueError:
+        backend = None
+    if backend is None:
+        return [None] * len(jobs)
+    
+    requests = [
+        backend.prepare(_synthesis_request(
+            job['patterns'], job['phrases'], job['clusters'],
+            job.get('associations'), job.get('corrections'), prompt_tokens,
+        ))
+        for job in jobs
+    ]
+    keys = [_cache_key(request, backend) for request in requests]
+    contents = [cache.get(key) if cache else None for key in keys]
+    
+    missing = [i for i, content in enumerate(contents) if content is None]
+    responses = backend.complete_batch([requests[i] for i in missing], timeout=timeout)
+    for i, response in zip(missing, responses):
+        if isinstance(response, str) and response:
+            contents[i] = response
+            if cache:
+                cache.put(keys[i], response)
+    
+    return [_synthesized_header() + content if content else None for content in contents]
+
+
+def synthesize_rules_basic(
+    patterns: dict,
+    phrases: list,
+    associations: dict = None,
+    rule_templates: dict = None,
+    corrections: list = None,
+) -> str:
     """
     Generate rules without LLM (basic template-based approach).
     
     Args:
         patterns: Dictionary of detected patterns
         phrases: List of (phrase, count) tuples
+        associations: Optional pattern associations from find_pattern_associations
+        rule_templates: Extra (category, rule) templates by pattern name,
+            e.g. from pattern packs (override RULE_TEMPLATES)
+        corrections: Optional instructions repeated within a session, from
+            find_repeated_corrections (listed first, as high priority)
         
     Returns:
         Basic rules as markdown string
@@ -140,50 +288,23 @@ def synthesize_rules_basic(patterns: dict, phrases: list) -> str:
         "",
     ]
     
-    # Map pattern names to rule templates
-    rule_templates = {
-        'github_push': ('Deployment', 'Push to GitHub after every meaningful change - don\'t wait to be asked'),
-        'vercel_deploy': ('Deployment', 'Deploy to Vercel and test on production URL, not localhost'),
-        'update_docs': ('Documentation', 'Update README/docs with current state after significant changes'),
-        'mobile_check': ('Quality', 'Always evaluate how changes look on mobile before considering done'),
-        'no_fallbacks': ('Error Handling', 'No silent error handling - log errors clearly, then throw'),
-        'check_before': ('Planning', 'Think before implementing - explain approach first for complex tasks'),
-        'api_keys': ('Environment', 'When user provides API keys, add to .env immediately and confirm'),
-        'be_concise': ('Communication', 'Be concise - don\'t over-explain, focus on actionable information'),
-        'verify_data': ('Quality', 'Verify all calculations - trace at least one example end-to-end'),
-        'comment_code': ('Quality', 'Comment code for external developers - explain the "why"'),
-        'user_perspective': ('Quality', 'Always consider the real user experience - what would they actually see?'),
-        'clean_code': ('Quality', 'Clean up as you go - remove dead code, archive outdated content'),
-    }
+    rule_templates = {**RULE_TEMPLATES, **(rule_templates or {})}
     
-    # Group by category
-    categories = {}
-    for name, data in patterns.items():
-        if name in rule_templates:
-            category, rule = rule_templates[name]
-            if category not in categories:
-                categories[category] = []
-            categories[category].append({
-                'rule': rule,
-                'count': data['count'],
-            })
-        else:
-            # Use first example as rule
-            label = data.get('label', name.replace('_', ' ').title())
-            examples = data.get('examples', [])
-            if examples:
-                if label not in categories:
-                    categories[label] = []
-                example_rule = clean_text(examples[0])
-                if len(example_rule) > 100:
-                    example_rule = example_rule[:97] + "..."
-                categories[label].append({
-                    'rule': example_rule,
-                    'count': data['count'],
-                })
+    # Instructions the user had to repeat within a session come first
+    prioritized = set()
+    if corrections:
+        lines.append("## High Priority")
+        lines.append("*You had to repeat these within the same chat:*")
+        lines.append("")
+        
+        for correction in corrections[:8]:
+            lines.append(f"- {_correction_rule(correction, rule_templates)} (repeated in {correction['sessions']} chats)")
+            prioritized.add(correction['pattern'])
+        
+        lines.append("")
     
     # Output categories
-    for category, rules in categories.items():
+    for category, rules in group_by_category(patterns, rule_templates, skip=prioritized).items():
         total_count = sum(r['count'] for r in rules)
         lines.append(f"## {category}")
         lines.append("")
@@ -204,10 +325,406 @@ def synthesize_rules_basic(patterns: dict, phrases: list) -> str:
         
         lines.append("")
     
-    # Add tips
+    # Add habits that co-occur in the same session, and tips
+    lines.extend(_closing_lines(associations))
+    
+    return '\n'.join(lines)
+
+
+def _correction_rule(correction: dict, rule_templates: dict) -> str:
+    """Rule text for a repeated correction: its pattern's template, or the instruction itself."""
+    if correction['pattern'] in rule_templates:
+        return rule_templates[correction['pattern']][1]
+    rule = clean_text(correction['text'])
+    if len(rule) > 100:
+        rule = rule[:97] + "..."
+    return rule
+
+
+def group_by_category(patterns: dict, rule_templates: dict, skip: set = frozenset()) -> dict:
+    """
+    Group patterns into rules-file categories, in pattern order.
+    
+    Patterns with a rule template go under its category; others get a
+    category of their own, named after their label, with their first example
+    as the rule.
+    
+    Args:
+        patterns: Dictionary of detected patterns
+        rule_templates: (category, rule) templates by pattern name
+        skip: Pattern names to leave out
+    
+    Returns:
+        Dictionary mapping category names to lists of dictionaries with
+        'name', 'label', 'rule', 'count' and 'examples'
+    """
+    categories = {}
+    for name, data in patterns.items():
+        if name in skip:
+            continue
+        label = data.get('label', name.replace('_', ' ').title())
+        examples = data.get('examples', [])
+        if name in rule_templates:
+            category, rule = rule_templates[name]
+        elif examples:
+            # Use first example as rule
+            category = label
+            rule = clean_text(examples[0])
+            if len(rule) > 100:
+                rule = rule[:97] + "..."
+        else:
+            continue
+        categories.setdefault(category, []).append({
+            'name': name,
+            'label': label,
+            'rule': rule,
+            'count': data['count'],
+            'examples': examples,
+        })
+    return categories
+
+
+def _closing_lines(associations: dict = None) -> list[str]:
+    """Closing lines of a rules file: habits that go together, then tips."""
+    lines = []
+    itemsets = (associations or {}).get('itemsets', [])
+    if itemsets:
+        lines.append("## Habits That Go Together")
+        lines.append("*These habits usually come up in the same session - handle them together:*")
+        lines.append("")
+        
+        for itemset in itemsets[:5]:
+            together = " + ".join(itemset['labels'])
+            lines.append(f"- {together} ({itemset['count']} sessions)")
+        
+        lines.append("")
+    
     lines.append("---")
     lines.append("")
     lines.append("*Copy these rules to Cursor Settings → Rules for AI, or run `cursorhabits apply`*")
+    return lines
+
+
+def _synthesis_sections(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    rule_templates: dict = None,
+    corrections: list = None,
+) -> list[dict]:
+    """
+    Split the detected habits into rules-file sections, one request each.
     
-    return '\n'.join(lines)
+    Returns:
+        Sections in output order, as dictionaries with 'title', 'items'
+        (prompt text) and 'fallback' (template-based markdown bullets)
+    """
+    rule_templates = {**RULE_TEMPLATES, **(rule_templates or {})}
+    sections = []
+    
+    prioritized = set()
+    if corrections:
+        items, fallback = [], []
+        for correction in corrections[:8]:
+            label = f"{correction['label']}: " if correction['label'] else ""
+            items.append(
+                f"- {label}\"{clean_text(correction['text'])[:150]}\" "
+                f"(repeated in {correction['sessions']} sessions, {correction['repeats']} times)"
+            )
+            fallback.append(f"- {_correction_rule(correction, rule_templates)} (repeated in {correction['sessions']} chats)")
+            prioritized.add(correction['pattern'])
+        sections.append({'title': "High Priority", 'items': items, 'fallback': fallback})
+    
+    for category, rules in group_by_category(patterns, rule_templates, skip=prioritized).items():
+        items = []
+        for r in rules:
+            items.append(f"- {r['label']} ({r['count']} occurrences)")
+            items.extend(f"  - \"{clean_text(ex)[:150]}\"" for ex in r['examples'][:3])
+        sections.append({'title': category, 'items': items, 'fallback': [f"- {r['rule']}" for r in rules]})
+    
+    if phrases or clusters:
+        items = [f"- ({count}x) \"{phrase}\"" for phrase, count in phrases[:10]]
+        for cluster in clusters[:5]:
+            items.append(f"- {len(cluster)} similar messages, e.g.:")
+            items.extend(f"  - \"{clean_text(msg)[:100]}\"" for msg in cluster[:3])
+        fallback = [f"- ({count}x) \"{phrase}\"" for phrase, count in phrases[:8]]
+        sections.append({'title': "Frequently Repeated", 'items': items, 'fallback': fallback})
+    
+    for section in sections:
+        section['items'] = '\n'.join(section['items'])
+        section['fallback'] = '\n'.join(section['fallback'])
+    return sections
+
+
+async def _stream_section(
+    backend: SynthesisBackend,
+    section: dict,
+    queue: asyncio.Queue,
+    semaphore: asyncio.Semaphore,
+    cache: Optional[LLMCache] = None,
+    timeout: Optional[float] = None,
+) -> bool:
+    """
+    Synthesize one section, putting its text on the queue as it arrives.
+    
+    The queue always ends with None. A section that fails before producing
+    any text gets its template-based fallback instead.
+    
+    Returns:
+        True if the section's text came from the LLM
+    """
+    request = backend.prepare({
+        'model': "gpt-4o-mini",
+        'messages': [
+            {"role": "system", "content": "You are a helpful assistant that creates clear, actionable rules for AI coding assistants."},
+            {"role": "user", "content": SECTION_PROMPT.format(section=section['title'], items=section['items'])}
+        ],
+        'temperature': 0.7,
+        'max_tokens': 600,
+    })
+    key = _cache_key(request, backend)
+    cached = cache.get(key) if cache else None
+    parts = []
+    
+    try:
+        if cached is not None:
+            parts.append(cached)
+            await queue.put(cached)
+        else:
+            async with semaphore:
+                async for text in backend.stream(request, timeout):
+                    parts.append(text)
+                    await queue.put(text)
+            if cache and parts:
+                cache.put(key, ''.join(parts))
+        return True
+    except Exception:
+        if not parts:
+            await queue.put(section['fallback'])
+        return bool(parts)
+    finally:
+        await queue.put(None)
+
+
+async def synthesize_rules_streaming(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: dict = None,
+    rule_templates: dict = None,
+    corrections: list = None,
+    output_path=None,
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = None,
+    cache: Optional[LLMCache] = None,
+    backend: Optional[SynthesisBackend] = None,
+) -> Optional[str]:
+    """
+    Use OpenAI to synthesize each rules section concurrently, streaming the result.
+    
+    Sections (high priority, one per category, frequently repeated) are
+    requested at once, at most max_concurrency at a time. They are written
+    in a fixed order: the section being written streams token by token,
+    while later ones buffer until their turn.
+    
+    Args:
+        patterns: Dictionary of detected patterns
+        phrases: List of (phrase, count) tuples
+        clusters: List of similar message groups
+        associations: Optional pattern associations from find_pattern_associations
+        rule_templates: Extra (category, rule) templates by pattern name
+        corrections: Optional instructions repeated within a session, from find_repeated_corrections
+        output_path: If set, the rules file to stream into
+        max_concurrency: Maximum requests in flight
+        timeout: If set, give up on each request (without retrying) after this many seconds
+        cache: Optional response cache, consulted per section
+        backend: Where to send the requests (defaults to get_backend())
+    
+    Returns:
+        Synthesized rules as markdown string, or None if LLM unavailable
+        (no backend, or every section failed)
+    """
+    try:
+        backend = backend or get_backend()
+    except ValueError:
+        return None
+    if backend is None:
+        return None
+    
+    sections = _synthesis_sections(patterns, phrases, clusters, rule_templates, corrections)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    queues = [asyncio.Queue() for _ in sections]
+    tasks = [
+        asyncio.ensure_future(_stream_section(backend, section, queue, semaphore, cache, timeout))
+        for section, queue in zip(sections, queues)
+    ]
+    
+    parts = []
+    out = open(output_path, 'w', encoding='utf-8') if output_path else None
+    
+    def write(text):
+        parts.append(text)
+        if out:
+            out.write(text)
+            out.flush()
+    
+    try:
+        write(_synthesized_header())
+        for section, queue in zip(sections, queues):
+            write(f"## {section['title']}\n\n")
+            while True:
+                text = await queue.get()
+                if text is None:
+                    break
+                write(text)
+            write("\n\n")
+        succeeded = await asyncio.gather(*tasks)
+        write('\n'.join(_closing_lines(associations)))
+    finally:
+        for task in tasks:
+            task.cancel()
+        if out:
+            out.close()
+        await backend.aclose()
+    
+    return ''.join(parts) if any(succeeded) else None
+
+
+def _complete_with_retries(
+    request: dict,
+    backend: SynthesisBackend,
+    deadline: Deadline,
+    retries: int,
+    stats: dict,
+    rng: Optional[random.Random] = None,
+) -> str:
+    """
+    Run a completion request, retrying transient errors until the deadline.
+    
+    Each attempt may use the time left before the deadline. Retries back off
+    exponentially with jitter, and stop early if the backoff would outlast
+    the deadline.
+    
+    Raises:
+        The last error, once retries or time run out
+    """
+    rng = rng or random.Random()
+    
+    for attempt in range(retries + 1):
+        stats['attempts'] += 1
+        try:
+            return _complete(request, backend, timeout=max(deadline.remaining(), 0.1))
+        except Exception as e:
+            stats['errors'] += 1
+            if attempt == retries or not backend.is_retryable(e):
+                raise
+            backoff = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * rng.uniform(0.5, 1.0)
+            if backoff >= deadline.remaining():
+                raise
+            stats['retries'] += 1
+            time.sleep(backoff)
+
 
+def synthesize_with_deadline(
+    patterns: dict,
+    phrases: list,
+    clusters: list,
+    associations: dict = None,
+    rule_templates: dict = None,
+    corrections: list = None,
+    deadline: float = DEFAULT_SYNTHESIS_DEADLINE,
+    retries: int = DEFAULT_RETRIES,
+    cache: Optional[LLMCache] = None,
+    prompt_tokens: int = DEFAULT_PROMPT_TOKENS,
+    backend: Optional[SynthesisBackend] = None,
+) -> tuple[str, dict]:
+    """
+    Synthesize rules with the LLM within a latency budget, falling back to basic rules.
+    
+    The template-based rules are built in parallel from the start, so if the
+    LLM is unavailable, keeps failing or misses the deadline, they are used
+    without further waiting. Transient API errors are retried with jittered
+    exponential backoff while time remains.
+    
+    Args:
+        patterns: Dictionary of detected patterns
+        phrases: List of (phrase, count) tuples
+        clusters: List of similar message groups
+        associations: Optional pattern associations from find_pattern_associations
+        rule_templates: Extra (category, rule) templates by pattern name
+        corrections: Optional instructions repeated within a session, from find_repeated_corrections
+        deadline: Seconds to wait for the LLM
+        retries: Maximum retries after the first attempt
+        cache: Optional response cache; only answers that arrive before
+            the deadline are saved
+        prompt_tokens: Token budget for the evidence packed into the prompt
+        backend: Where to send the request (defaults to get_backend())
+    
+    Returns:
+        (rules, stats): markdown rules, and stats with 'source' ('llm' or
+        'basic'), 'fallback' (None, 'no_backend', 'error' or 'deadline'),
+        'attempts', 'retries', 'errors', 'llm_seconds', 'basic_seconds'
+        and 'seconds'
+    """
+    limit = Deadline(deadline)
+    stats = {
+        'source': 'basic', 'fallback': None, 'attempts': 0, 'retries': 0, 'errors': 0,
+        'llm_seconds': 0.0, 'basic_seconds': 0.0, 'seconds': 0.0,
+    }
+    
+    def basic():
+        start = time.perf_counter()
+        rules = synthesize_rules_basic(patterns, phrases, associations, rule_templates, corrections)
+        stats['basic_seconds'] = time.perf_counter() - start
+        return rules
+    
+    executor = ThreadPoolExecutor(max_workers=1)
+    basic_future = executor.submit(basic)
+    executor.shutdown(wait=False)
+    try:
+        backend = backend or get_backend()
+    except ValueError:
+        backend = None
+    content = None
+    
+    if backend:
+        request = backend.prepare(
+            _synthesis_request(patterns, phrases, clusters, associations, corrections, prompt_tokens)
+        )
+        key = _cache_key(request, backend)
+        content = cache.get(key) if cache else None
+    
+    if backend and content is None:
+        # A daemon thread, so a request still running at the deadline never
+        # delays exit; its late result is dropped rather than cached
+        llm_future = Future()
+        
+        def run():
+            try:
+                llm_future.set_result(_complete_with_retries(request, backend, limit, retries, stats))
+            except Exception as e:
+                llm_future.set_exception(e)
+        
+        threading.Thread(target=run, name="cursorhabits-synthesis", daemon=True).start()
+        try:
+            content = llm_future.result(timeout=max(limit.remaining(), 0))
+        except FutureTimeoutError:
+            stats['fallback'] = 'deadline'
+        except Exception:
+            # The request's own timeout can fire just before ours
+            stats['fallback'] = 'deadline' if limit.expired() else 'error'
+        stats['llm_seconds'] = limit.elapsed()
+        if content and cache:
+            cache.put(key, content)
+    elif not backend:
+        stats['fallback'] = 'no_backend'
+    
+    if content:
+        rules = _synthesized_header() + content
+        stats['source'] = 'llm'
+    else:
+        rules = basic_future.result()
+    
+    stats['seconds'] = limit.elapsed()
+    # A request still running past the deadline keeps updating its own stats
+    return rules, dict(stats)
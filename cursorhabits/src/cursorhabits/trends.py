@@ -0,0 +1,384 @@
+"""
+Pattern trends module.
+
+Maintains a per-day × per-pattern × per-workspace count cube in SQLite so
+any time window, week-over-week comparison or sparkline can be answered
+without re-reading chat history. Each counted bubble's contribution is kept
+by its key, so an update reads only the bubbles added or rewritten since
+and replaces what they counted before.
+"""
+
+import json
+import sqlite3
+import time
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+from .analyzer import DEFAULT_MATCHER, PatternMatcher, message_patterns, message_weight
+from .storage import get_data_dir
+
+
+# Pseudo-pattern holding the number of messages per day and workspace
+TOTAL = '*'
+
+# Bump when the stored layout changes, so older cubes are rebuilt
+CUBE_VERSION = 2
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def get_cube_path() -> Path:
+    """Get the default path of the trends cube database."""
+    return get_data_dir() / "trends.sqlite"
+
+
+def to_day(timestamp) -> Optional[int]:
+    """
+    Convert a Cursor timestamp to a day number (proleptic Gregorian ordinal).
+    
+    Args:
+        timestamp: Epoch milliseconds/seconds or an ISO-8601 string
+        
+    Returns:
+        Day ordinal in local time, or None if the timestamp is unusable
+    """
+    try:
+        if isinstance(timestamp, str):
+            moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if moment.tzinfo is not None:
+                moment = moment.astimezone()
+        else:
+            seconds = float(timestamp)
+            if seconds > 1e11:  # Milliseconds
+                seconds /= 1000
+            moment = datetime.fromtimestamp(seconds)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+    return moment.date().toordinal()
+
+
+def message_day(msg: dict, composer_timestamps: Optional[dict] = None) -> Optional[int]:
+    """
+    Get the day a message was sent, falling back to its composer's creation time.
+    
+    Args:
+        msg: Message dictionary
+        composer_timestamps: Mapping from get_composer_timestamps
+        
+    Returns:
+        Day ordinal, or None if the message can't be placed on a day
+    """
+    timestamp = msg.get('created_at') or (composer_timestamps or {}).get(msg.get('composer_id'))
+    return to_day(timestamp) if timestamp else None
+
+
+def _bubble_key(msg: dict) -> tuple:
+    """Get the (composer_id, bubble_id) a message is stored under, or a key from its text if it has none."""
+    return (msg.get('composer_id') or '', msg.get('bubble_id') or msg['text'])
+
+
+def sparkline(values: list, width: Optional[int] = None) -> str:
+    """
+    Render a list of counts as a unicode sparkline.
+    
+    Args:
+        values: Counts in chronological order
+        width: If set, sum consecutive values so at most this many characters are drawn
+        
+    Returns:
+        One block character per value (or per bucket of values)
+    """
+    if width and len(values) > width:
+        size = -(-len(values) // width)
+        values = [sum(values[i:i + size]) for i in range(0, len(values), size)]
+    top = max(values, default=0)
+    if top <= 0:
+        return SPARK_CHARS[0] * len(values)
+    steps = len(SPARK_CHARS) - 1
+    return ''.join(SPARK_CHARS[round(v / top * steps)] for v in values)
+
+
+class PatternCube:
+    """
+    Day × pattern × workspace message counts stored in SQLite.
+    
+    Only non-zero cells are stored, keyed by (day, pattern, workspace), so
+    window queries are primary-key range scans. The day, workspace and
+    patterns each bubble was counted under are kept alongside, keyed by
+    (composer_id, bubble_id), so its counts can be replaced when it is read
+    again.
+    """
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else get_cube_path()
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS counts (
+                day INTEGER NOT NULL,
+                pattern TEXT NOT NULL,
+                workspace TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, pattern, workspace)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS bubbles (
+                composer_id TEXT NOT NULL,
+                bubble_id TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                workspace TEXT NOT NULL,
+                patterns TEXT NOT NULL,
+                weight INTEGER NOT NULL,
+                PRIMARY KEY (composer_id, bubble_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    @property
+    def built_at(self) -> float:
+        """Epoch seconds of the last rebuild or update (0.0 if never built)."""
+        value = self._meta('built_at')
+        return float(value) if value else 0.0
+    
+    @property
+    def sources(self) -> Optional[dict]:
+        """Signature of the source databases at the last rebuild or update (None if never built)."""
+        value = self._meta('sources')
+        return json.loads(value) if value else None
+    
+    def needs_rebuild(self, matcher: Optional[PatternMatcher] = None) -> bool:
+        """Check whether the cube was never built, is outdated, or counted different patterns."""
+        return (
+            self._meta('version') != str(CUBE_VERSION)
+            or self._meta('matcher') != (matcher or DEFAULT_MATCHER).fingerprint()
+        )
+    
+    def is_current(self, sources: dict, matcher: Optional[PatternMatcher] = None) -> bool:
+        """
+        Check whether the cube has counted everything in its sources.
+        
+        Args:
+            sources: Signature of each source database by path, from
+                extractor.get_bubble_signature
+            matcher: Patterns the cube should count (defaults to PATTERN_DEFINITIONS)
+            
+        Returns:
+            True if the cube is built with these patterns and no bubbles
+            were added since
+        """
+        return not self.needs_rebuild(matcher) and self._meta('sources') == json.dumps(sources, sort_keys=True)
+    
+    def rebuild(
+        self,
+        messages: list[dict],
+        composer_timestamps: Optional[dict] = None,
+        matcher: Optional[PatternMatcher] = None,
+        sources: Optional[dict] = None,
+    ) -> int:
+        """
+        Replace the cube contents with counts from a set of messages.
+        
+        Each message is bucketed by its own 'created_at', falling back to
+        its composer's creation time.
+        
+        Args:
+            messages: Filtered message dictionaries
+            composer_timestamps: Mapping from get_composer_timestamps
+            matcher: Patterns to count (defaults to PATTERN_DEFINITIONS)
+            sources: Signature of the source databases the messages came from
+            
+        Returns:
+            Number of messages that could be placed on a day
+        """
+        return self._count(messages, composer_timestamps, matcher, sources, replaced=None)
+    
+    def update(
+        self,
+        messages: list[dict],
+        composer_timestamps: Optional[dict] = None,
+        matcher: Optional[PatternMatcher] = None,
+        sources: Optional[dict] = None,
+        read: Optional[list[tuple]] = None,
+    ) -> int:
+        """
+        Count bubbles read since the last update, replacing their earlier counts.
+        
+        Bubbles are matched by (composer_id, bubble_id), so a bubble read
+        again (rewritten, or read twice) moves its counts rather than adding
+        to them, whatever day it falls on. Rebuilds instead if the cube was
+        never built or counted different patterns.
+        
+        Args:
+            messages: Filtered message dictionaries for the bubbles read
+            composer_timestamps: Mapping from get_composer_timestamps
+            matcher: Patterns to count (defaults to PATTERN_DEFINITIONS)
+            sources: Signature of the source databases the messages came from
+            read: (composer_id, bubble_id) of every bubble read, including
+                those filtered out, whose earlier counts are dropped
+                (defaults to the messages' own keys)
+            
+        Returns:
+            Number of messages counted
+        """
+        if self.needs_rebuild(matcher):
+            return self.rebuild(messages, composer_timestamps, matcher, sources)
+        if read is None:
+            read = [_bubble_key(msg) for msg in messages]
+        return self._count(messages, composer_timestamps, matcher, sources, replaced=read)
+    
+    def _count(
+        self,
+        messages: list[dict],
+        composer_timestamps: Optional[dict],
+        matcher: Optional[PatternMatcher],
+        sources: Optional[dict],
+        replaced: Optional[list[tuple]],
+    ) -> int:
+        """Drop the counts of the replaced bubbles (all of them if None), then add counts from messages."""
+        matcher = matcher or DEFAULT_MATCHER
+        cells = Counter()
+        rows = {}
+        
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS replaced "
+            "(composer_id TEXT, bubble_id TEXT, PRIMARY KEY (composer_id, bubble_id))"
+        )
+        self.conn.execute("DELETE FROM replaced")
+        if replaced is not None:
+            self.conn.executemany("INSERT OR IGNORE INTO replaced VALUES (?, ?)", replaced)
+            previous = self.conn.execute(
+                "SELECT b.day, b.workspace, b.patterns, b.weight FROM bubbles AS b "
+                "JOIN replaced AS r ON r.composer_id = b.composer_id AND r.bubble_id = b.bubble_id"
+            )
+            for day, workspace, patterns, weight in previous:
+                for name in [TOTAL] + json.loads(patterns):
+                    cells[(day, name, workspace)] -= weight
+        
+        for msg in messages:
+            day = message_day(msg, composer_timestamps)
+            if day is None:
+                continue
+            weight = message_weight(msg)
+            workspace = msg.get('workspace') or 'global'
+            names = message_patterns(msg, matcher)
+            for name in [TOTAL] + names:
+                cells[(day, name, workspace)] += weight
+            rows[_bubble_key(msg)] = (day, workspace, json.dumps(names), weight)
+        
+        with self.conn:
+            if replaced is None:
+                self.conn.execute("DELETE FROM counts")
+                self.conn.execute("DELETE FROM bubbles")
+            else:
+                self.conn.execute(
+                    "DELETE FROM bubbles WHERE (composer_id, bubble_id) IN (SELECT composer_id, bubble_id FROM replaced)"
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO bubbles VALUES (?, ?, ?, ?, ?, ?)",
+                (key + row for key, row in rows.items()),
+            )
+            self.conn.executemany(
+                "INSERT INTO counts (day, pattern, workspace, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (day, pattern, workspace) DO UPDATE SET count = count + excluded.count",
+                ((day, name, ws, count) for (day, name, ws), count in cells.items() if count),
+            )
+            self.conn.execute("DELETE FROM counts WHERE count <= 0")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ('version', str(CUBE_VERSION)),
+                    ('built_at', str(time.time())),
+                    ('matcher', matcher.fingerprint()),
+                    ('sources', json.dumps(sources, sort_keys=True)),
+                ],
+            )
+        
+        return sum(row[3] for row in rows.values())
+    
+    def window_counts(self, days: int, workspace: Optional[str] = None, end: Optional[int] = None) -> dict:
+        """
+        Count pattern mentions over the last N days.
+        
+        Args:
+            days: Window length in days (including the end day)
+            workspace: Only count this workspace (all workspaces if None)
+            end: Last day of the window as an ordinal (defaults to today)
+            
+        Returns:
+            Dictionary mapping pattern names (and TOTAL) to counts
+        """
+        end = end if end is not None else date.today().toordinal()
+        query = "SELECT pattern, SUM(count) FROM counts WHERE day > ? AND day <= ?"
+        params = [end - days, end]
+        if workspace:
+            query += " AND workspace = ?"
+            params.append(workspace)
+        query += " GROUP BY pattern"
+        return dict(self.conn.execute(query, params).fetchall())
+    
+    def week_over_week(self, workspace: Optional[str] = None, end: Optional[int] = None) -> dict:
+        """
+        Compare the last 7 days against the 7 days before them.
+        
+        Args:
+            workspace: Only count this workspace (all workspaces if None)
+            end: Last day of the current week as an ordinal (defaults to today)
+            
+        Returns:
+            Dictionary mapping pattern names to (this_week, last_week) tuples
+        """
+        end = end if end is not None else date.today().toordinal()
+        this_week = self.window_counts(7, workspace=workspace, end=end)
+        last_week = self.window_counts(7, workspace=workspace, end=end - 7)
+        return {
+            name: (this_week.get(name, 0), last_week.get(name, 0))
+            for name in set(this_week) | set(last_week)
+        }
+    
+    def daily_series(
+        self,
+        days: int,
+        workspace: Optional[str] = None,
+        end: Optional[int] = None,
+    ) -> dict:
+        """
+        Get per-day counts for every pattern over the last N days.
+        
+        Args:
+            days: Number of days in the series
+            workspace: Only count this workspace (all workspaces if None)
+            end: Last day of the series as an ordinal (defaults to today)
+            
+        Returns:
+            Dictionary mapping pattern names to lists of daily counts (oldest first)
+        """
+        end = end if end is not None else date.today().toordinal()
+        start = end - days + 1
+        query = "SELECT day, pattern, SUM(count) FROM counts WHERE day >= ? AND day <= ?"
+        params = [start, end]
+        if workspace:
+            query += " AND workspace = ?"
+            params.append(workspace)
+        query += " GROUP BY day, pattern"
+        
+        series = {}
+        for day, name, count in self.conn.execute(query, params):
+            series.setdefault(name, [0] * days)[day - start] = count
+        return series
+    
+    def workspaces(self) -> list[str]:
+        """List the workspaces present in the cube."""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT workspace FROM counts ORDER BY workspace")]
@@ -0,0 +1,104 @@
+"""
+Terminal UI module.
+
+Holds the console every command prints to. It is created, and rich
+imported, on first use, so commands that print nothing (like --help) and
+modules imported only for their helpers start without loading rich.
+
+Headless runs (machine-readable output) never load rich: messages go to
+stderr as plain text, keeping stdout for the records, and spinners do
+nothing.
+"""
+
+import re
+import sys
+
+
+# Rich markup tags like [bold] and [/dim]
+_MARKUP = re.compile(r'\[/?[a-z#@][^\[\]]*\]')
+
+
+class PlainConsole:
+    """Prints messages to stderr without rich, dropping markup and anything but text."""
+    
+    def __init__(self):
+        self._line_open = False
+    
+    def print(self, *objects, end: str = "\n", **kwargs):
+        text = " ".join(_MARKUP.sub("", obj) for obj in objects if isinstance(obj, str))
+        # Spacer lines are for the terminal report; a bare print() still ends an open line
+        if not text and not self._line_open:
+            return
+        sys.stderr.write(text + end)
+        self._line_open = not end.endswith("\n")
+
+
+class NullProgress:
+    """Stands in for a spinner in headless runs."""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def add_task(self, *args, **kwargs):
+        return None
+    
+    def update(self, *args, **kwargs):
+        pass
+
+
+class LazyConsole:
+    """Stands in for a rich Console, creating it on first use."""
+    
+    def __init__(self):
+        self._console = None
+        self.headless = False
+    
+    def get(self):
+        """Get the real Console (for APIs that need one, like Progress)."""
+        if self._console is None:
+            if self.headless:
+                self._console = PlainConsole()
+            else:
+                from rich.console import Console
+                self._console = Console()
+        return self._console
+    
+    def set_headless(self, headless: bool = True):
+        """
+        Switch between rich output and plain text on stderr.
+        
+        Args:
+            headless: True for machine-readable runs
+        """
+        self.headless = headless
+        self._console = None
+    
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+console = LazyConsole()
+
+
+def spinner():
+    """
+    Create a transient spinner for a long-running step.
+    
+    Returns:
+        A rich Progress to use as a context manager, with add_task and update
+        (a NullProgress in headless runs)
+    """
+    if console.headless:
+        return NullProgress()
+    
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=console.get(),
+        transient=True,
+    )
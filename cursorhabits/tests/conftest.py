@@ -0,0 +1,129 @@
+"""Shared fixtures."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cursorhabits import backends
+
+
+class StubOpenAIServer:
+    """
+    Local OpenAI-compatible server for chat completions.
+    
+    Replies with reply(body) (a list of text chunks, streamed when the
+    request asks for it) after delay(body) seconds, or with an error if
+    status(body) isn't 200. Records every request body, the most requests
+    it saw in flight at once, and the client connections they came over
+    (non-streamed replies keep the connection alive).
+    """
+    
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self.reply = lambda body: ["- Push to GitHub after every change"]
+        self.delay = lambda body: 0
+        self.status = lambda body: 200
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, *args):
+                pass
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.requests.append(body)
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay(body))
+                    status = stub.status(body)
+                    chunks = stub.reply(body)
+                    if status != 200:
+                        self._error(status)
+                    elif body.get('stream'):
+                        self._stream(chunks)
+                    else:
+                        self._complete(''.join(chunks))
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+            
+            def _stream(self, chunks):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for text in chunks:
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                        "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+            
+            def _error(self, status):
+                payload = json.dumps({"error": {"message": "stub error", "type": "server_error"}}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def _complete(self, text):
+                payload = json.dumps({
+                    "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+        
+        return Handler
+
+
+@pytest.fixture
+def openai_stub(monkeypatch):
+    """Serve a StubOpenAIServer and point the OpenAI client at it."""
+    stub = StubOpenAIServer()
+    thread = threading.Thread(target=stub.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", stub.base_url)
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_backends():
+    """Don't let synthesis backends (and their connections) outlive a test."""
+    yield
+    backends.close_backends()
@@ -0,0 +1,71 @@
+"""Tests for the analyzer module."""
+
+import pytest
+from cursorhabits.analyzer import analyze_patterns, find_pattern_associations, ExampleReservoir
+
+
+def _session(composer_id, *texts):
+    return [{"text": text, "composer_id": composer_id} for text in texts]
+
+
+class TestFindPatternAssociations:
+    """Tests for find_pattern_associations function."""
+    
+    def test_finds_habits_used_together(self):
+        messages = []
+        for i in range(6):
+            messages += _session(f"c{i}", "Deploy to vercel now", "Check how it looks on mobile")
+        for i in range(6, 12):
+            messages += _session(f"c{i}", "Update the readme please")
+        
+        result = find_pattern_associations(messages)
+        
+        assert result["sessions"] == 12
+        assert any(set(s["patterns"]) == {"vercel_deploy", "mobile_check"} for s in result["itemsets"])
+        rule = next(r for r in result["rules"] if r["consequent"] == "mobile_check")
+        assert rule["antecedent"] == ("vercel_deploy",)
+        assert rule["confidence"] == pytest.approx(1.0)
+        assert rule["lift"] == pytest.approx(2.0)
+    
+    def test_no_composer_ids(self):
+        result = find_pattern_associations([{"text": "Deploy to vercel"}])
+        assert result == {"sessions": 0, "itemsets": [], "rules": []}
+
+
+class TestExampleReservoir:
+    """Tests for ExampleReservoir."""
+    
+    def test_keeps_top_scoring_examples(self):
+        reservoir = ExampleReservoir(k=2)
+        reservoir.add("first distinct message here", 0.1)
+        reservoir.add("second unrelated instruction text", 0.9)
+        reservoir.add("third completely different sentence", 0.5)
+        
+        assert reservoir.examples() == [
+            "second unrelated instruction text",
+            "third completely different sentence",
+        ]
+    
+    def test_near_duplicates_keep_best_version(self):
+        reservoir = ExampleReservoir(k=3)
+        reservoir.add("push changes to github please", 0.2)
+        reservoir.add("Push changes to GitHub please!", 0.6)
+        reservoir.add("push changes to github please", 0.4)
+        
+        assert reservoir.examples() == ["Push changes to GitHub please!"]
+
+
+class TestAnalyzePatterns:
+    """Tests for analyze_patterns function."""
+    
+    def test_examples_ranked_by_instruction_score(self):
+        messages = [
+            {"text": "the github push thing", "instruction_score": 0.1},
+            {"text": "Always push to GitHub after every change", "instruction_score": 0.8},
+        ]
+        
+        patterns = analyze_patterns(messages)
+        
+        assert patterns["github_push"]["count"] == 2
+        assert patterns["github_push"]["examples"][0] == "Always push to GitHub after every change"
+        assert patterns["github_push"]["example_scores"] == [0.8, 0.1]
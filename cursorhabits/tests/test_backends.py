@@ -0,0 +1,179 @@
+"""Tests for synthesis backends."""
+
+import pytest
+from click.testing import CliRunner
+
+from cursorhabits import backends
+from cursorhabits.backends import (
+    SynthesisBackend,
+    get_backend,
+    load_backend_config,
+    register_backend,
+)
+from cursorhabits.cli import main
+from cursorhabits.llm_cache import LLMCache
+from cursorhabits.synthesizer import synthesize_rules, synthesize_rules_batch
+
+
+PATTERNS = {'github_push': {'count': 3, 'label': "Push to GitHub", 'examples': ["push it"]}}
+
+
+def _request(prompt="hi"):
+    return {'model': "gpt-4o-mini", 'messages': [{"role": "user", "content": prompt}], 'max_tokens': 10}
+
+
+class EchoBackend(SynthesisBackend):
+    """Backend that answers with the last message's length."""
+    
+    name = "echo"
+    
+    def __init__(self, api_key=None, base_url=None, model=None):
+        super().__init__(base_url, model)
+        self.requests = []
+    
+    def complete(self, request, timeout=None):
+        self.requests.append(request)
+        return f"- {len(request['messages'][-1]['content'])} characters"
+
+
+class TestLoadBackendConfig:
+    """Tests for load_backend_config function."""
+    
+    def test_reads_llm_table(self, tmp_path):
+        path = tmp_path / "config.toml"
+        path.write_text('[llm]\nbase_url = "http://gpu-box:8000/v1"\nmodel = "llama"\n')
+        
+        assert load_backend_config(path) == {'base_url': "http://gpu-box:8000/v1", 'model': "llama"}
+    
+    def test_environment_overrides_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "config.toml"
+        path.write_text('[llm]\nmodel = "llama"\n')
+        monkeypatch.setenv("CURSORHABITS_LLM_MODEL", "qwen")
+        monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:8080/v1")
+        
+        assert load_backend_config(path) == {'model': "qwen", 'base_url': "http://localhost:8080/v1"}
+    
+    def test_rejects_unknown_settings(self, tmp_path):
+        path = tmp_path / "config.toml"
+        path.write_text('[llm]\nmodle = "llama"\n')
+        
+        with pytest.raises(ValueError, match="modle"):
+            load_backend_config(path)
+    
+    def test_missing_file(self, tmp_path):
+        assert load_backend_config(tmp_path / "config.toml") == {}
+
+
+class TestGetBackend:
+    """Tests for get_backend function."""
+    
+    def test_none_without_key_or_server(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.delenv("CURSOR_OPENAI_API_KEY", raising=False)
+        
+        assert get_backend({}) is None
+    
+    def test_local_server_needs_no_key(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.delenv("CURSOR_OPENAI_API_KEY", raising=False)
+        
+        backend = get_backend({'base_url': "http://localhost:8080/v1"})
+        
+        assert backend.describe() == "openai (http://localhost:8080/v1)"
+    
+    def test_reuses_backend(self, openai_stub):
+        config = {'base_url': openai_stub.base_url}
+        
+        assert get_backend(config) is get_backend(config)
+    
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="Unknown synthesis backend"):
+            get_backend({'backend': "nope", 'base_url': "http://localhost"})
+    
+    def test_registered_backend(self, monkeypatch):
+        monkeypatch.setattr(backends, "BACKENDS", dict(backends.BACKENDS))
+        register_backend("echo", EchoBackend)
+        backend = get_backend({'backend': "echo", 'base_url': "local", 'model': "tiny"})
+        
+        rules = synthesize_rules(PATTERNS, [], [], backend=backend)
+        
+        assert "characters" in rules
+        assert backend.requests[0]['model'] == "tiny"
+    
+    def test_cli_closes_backends(self, monkeypatch):
+        closed = []
+        backend = EchoBackend()
+        backend.close = lambda: closed.append(True)
+        monkeypatch.setitem(backends._active, ("echo",), backend)
+        
+        result = CliRunner().invoke(main, ["similar", "push to github", "-k", "0"])
+        
+        assert result.exit_code == 2
+        assert closed == [True]
+
+
+class TestOpenAIBackend:
+    """Tests for OpenAIBackend against a local OpenAI-compatible server."""
+    
+    def test_requests_reuse_one_connection(self, openai_stub):
+        backend = get_backend({'base_url': openai_stub.base_url})
+        
+        for _ in range(3):
+            assert backend.complete(_request(), timeout=5)
+        
+        assert len(openai_stub.requests) == 3
+        assert len(openai_stub.connections) == 1
+    
+    def test_configured_model_is_sent(self, openai_stub):
+        backend = get_backend({'base_url': openai_stub.base_url, 'model': "llama-local"})
+        
+        synthesize_rules(PATTERNS, [], [], backend=backend)
+        
+        assert openai_stub.requests[0]['model'] == "llama-local"
+    
+    def test_batch_keeps_order_and_runs_concurrently(self, openai_stub):
+        openai_stub.delay = lambda body: 0.1
+        openai_stub.reply = lambda body: [body['messages'][-1]['content'].upper()]
+        backend = get_backend({'base_url': openai_stub.base_url})
+        
+        results = backend.complete_batch([_request(f"job {i}") for i in range(4)], timeout=5)
+        
+        assert results == ["JOB 0", "JOB 1", "JOB 2", "JOB 3"]
+        assert openai_stub.max_in_flight > 1
+    
+    def test_batch_reports_failures_per_request(self, openai_stub):
+        openai_stub.status = lambda body: 400 if "bad" in body['messages'][-1]['content'] else 200
+        backend = get_backend({'base_url': openai_stub.base_url})
+        
+        good, bad = backend.complete_batch([_request("good"), _request("bad")], timeout=5)
+        
+        assert isinstance(good, str)
+        assert isinstance(bad, Exception)
+        assert not backend.is_retryable(bad)
+
+
+class TestSynthesizeRulesBatch:
+    """Tests for synthesize_rules_batch function."""
+    
+    def test_one_request_per_job_then_cached(self, openai_stub, tmp_path):
+        jobs = [
+            {'patterns': {**PATTERNS, 'github_push': {**PATTERNS['github_push'], 'count': count}},
+             'phrases': [], 'clusters': []}
+            for count in (3, 4, 5)
+        ]
+        
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            first = synthesize_rules_batch(jobs, cache=cache)
+            second = synthesize_rules_batch(jobs, cache=cache)
+        
+        assert len(openai_stub.requests) == 3
+        assert all(rules and "Push to GitHub" in rules for rules in first)
+        assert [rules.split('\n', 3)[3] for rules in first] == [rules.split('\n', 3)[3] for rules in second]
+    
+    def test_no_backend(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("CURSORHABITS_HOME", str(tmp_path))
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.delenv("CURSOR_OPENAI_API_KEY", raising=False)
+        monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+        
+        assert synthesize_rules_batch([{'patterns': PATTERNS, 'phrases': [], 'clusters': []}] * 2) == [None, None]
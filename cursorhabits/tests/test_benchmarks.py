@@ -0,0 +1,59 @@
+"""Tests for the synthetic Cursor history generator and benchmark comparisons."""
+
+import sqlite3
+
+from benchmarks.run import compare
+from benchmarks.synthetic import generate_cursor_home, parse_size
+from cursorhabits.extractor import extract_messages, get_cursor_db_path, get_workspace_db_paths
+
+
+class TestGenerateCursorHome:
+    """Tests for generate_cursor_home function."""
+    
+    def test_extractor_reads_generated_history(self, tmp_path, monkeypatch):
+        stats = generate_cursor_home(tmp_path, bubbles=400, workspaces=2, seed=1, now=1_700_000_000)
+        for key, value in stats['env'].items():
+            monkeypatch.setenv(key, value)
+        
+        assert get_cursor_db_path() == stats['db_path']
+        assert len(get_workspace_db_paths()) == 2
+        
+        messages = extract_messages(stats['db_path'])
+        assert stats['bubbles'] == 400
+        assert 0 < len(messages) <= 200
+        assert all(msg['composer_id'] for msg in messages)
+    
+    def test_same_seed_same_rows(self, tmp_path):
+        rows = []
+        for name in ("a", "b"):
+            stats = generate_cursor_home(tmp_path / name, bubbles=100, workspaces=0, seed=7, now=1_700_000_000)
+            conn = sqlite3.connect(stats['db_path'])
+            rows.append(conn.execute("SELECT key, value FROM cursorDiskKV ORDER BY key").fetchall())
+            conn.close()
+        
+        assert rows[0] == rows[1]
+        assert sum(key.startswith("composerData:") for key, _ in rows[0]) > 1
+
+
+class TestParseSize:
+    """Tests for parse_size function."""
+    
+    def test_sizes(self):
+        assert parse_size("1M") == 1_000_000
+        assert parse_size("250k") == 250_000
+        assert parse_size("1234") == 1234
+
+
+class TestCompare:
+    """Tests for compare function."""
+    
+    def test_flags_slower_stages(self):
+        baseline = {'extract': {'seconds': 1.0}, 'filter': {'seconds': 1.0}, 'tiny': {'seconds': 0.001}}
+        results = {
+            'extract': {'seconds': 1.6},
+            'filter': {'seconds': 1.4},
+            'tiny': {'seconds': 0.05},
+            'new stage': {'seconds': 9.0},
+        }
+        
+        assert compare(results, baseline, tolerance=0.5) == ['extract']
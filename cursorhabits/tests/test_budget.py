@@ -0,0 +1,93 @@
+"""Tests for time-budgeted analysis."""
+
+import json
+import sqlite3
+
+from cursorhabits import extractor
+from cursorhabits.budget import analyze_within_budget, coverage_note
+from cursorhabits.deadline import Deadline
+from cursorhabits.extractor import iter_recent_messages
+
+
+def _batches(count):
+    for i in range(count):
+        yield {
+            'messages': [{"text": f"Always push to GitHub after change {i}", "composer_id": f"c{i}"}],
+            'composers': i + 1,
+            'total': count,
+            'since': 1_700_000_000_000 - i * 86_400_000,
+        }
+
+
+class TestAnalyzeWithinBudget:
+    """Tests for analyze_within_budget function."""
+    
+    def test_expired_budget_still_reports_newest_batch(self):
+        results, coverage = analyze_within_budget(_batches(5), Deadline(0))
+        
+        assert coverage['composers'] == 1
+        assert not coverage['complete']
+        assert results['patterns']['github_push']['count'] == 1
+        assert results['clusters'] == []
+    
+    def test_generous_budget_covers_everything(self):
+        results, coverage = analyze_within_budget(_batches(5), Deadline(60))
+        
+        assert coverage['complete']
+        assert results['patterns']['github_push']['count'] == 5
+        assert len(results['messages']) == 5
+    
+    def test_coverage_note(self):
+        _, coverage = analyze_within_budget(_batches(5), Deadline(0))
+        
+        note = coverage_note(coverage, 2)
+        assert "1 most recent of 5 chats" in note
+        assert "2s budget" in note
+        assert "weren't grouped" in note
+    
+    def test_clustering_stops_at_the_deadline(self):
+        class ExpiresWhileClustering(Deadline):
+            """Expires after the first clustering step."""
+            
+            calls = 0
+            
+            def remaining(self):
+                return 60.0
+            
+            def expired(self):
+                self.calls += 1
+                return self.calls > 3
+        
+        results, coverage = analyze_within_budget(_batches(5), ExpiresWhileClustering(60))
+        
+        assert coverage['complete']
+        assert coverage['clusters'] == 'truncated'
+        assert len(results['clusters']) <= 1
+        assert "ran out while grouping" in coverage_note(coverage, 60)
+        
+        _, coverage = analyze_within_budget(_batches(5), Deadline(60))
+        assert coverage['clusters'] == 'complete'
+        assert coverage_note(coverage, 60) == "Covers all 5 chats (finished within the 60s budget)."
+
+
+class TestIterRecentMessages:
+    """Tests for iter_recent_messages function."""
+    
+    def test_newest_composers_first(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(extractor, "get_workspace_db_paths", lambda: [])
+        
+        db_path = tmp_path / "state.vscdb"
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+        for i, created in enumerate([100, 300, 200]):
+            conn.execute("INSERT INTO cursorDiskKV VALUES (?, ?)", (f"composerData:c{i}", json.dumps({"createdAt": created})))
+            conn.execute("INSERT INTO cursorDiskKV VALUES (?, ?)", (f"bubbleId:c{i}:b0", json.dumps({"type": 1, "text": f"message from chat {i}"})))
+            conn.execute("INSERT INTO cursorDiskKV VALUES (?, ?)", (f"bubbleId:c{i}:b1", json.dumps({"type": 2, "text": "assistant reply"})))
+        conn.commit()
+        conn.close()
+        
+        batches = list(iter_recent_messages(db_path, batch_size=2))
+        
+        assert [[m['composer_id'] for m in b['messages']] for b in batches] == [["c1", "c2"], ["c0"]]
+        assert [b['composers'] for b in batches] == [2, 3]
+        assert batches[0]['since'] == 200
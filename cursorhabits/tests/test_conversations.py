@@ -0,0 +1,100 @@
+"""Tests for the conversations module."""
+
+import json
+import sqlite3
+
+import pytest
+
+from cursorhabits.conversations import ConversationIndex
+
+
+@pytest.fixture
+def cursor_db(tmp_path):
+    """A Cursor database with one header-based and one inline conversation."""
+    db_path = tmp_path / "state.vscdb"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    
+    # Key order (a, b, c) differs from conversation order (c, a, b)
+    headers = [{"bubbleId": "c", "type": 1}, {"bubbleId": "a", "type": 2}, {"bubbleId": "b", "type": 1}]
+    rows = {
+        "composerData:new": {"createdAt": 200, "fullConversationHeadersOnly": headers},
+        "bubbleId:new:a": {"type": 2, "text": "Done, I pushed it."},
+        "bubbleId:new:b": {"type": 1, "text": "Now deploy to vercel"},
+        "bubbleId:new:c": {"type": 1, "text": "Push to GitHub"},
+        "composerData:old": {"createdAt": 100, "conversation": [
+            {"bubbleId": "x", "type": 1, "text": "Fix the login bug"},
+            {"bubbleId": "y", "type": 2, "text": "Fixed."},
+        ]},
+    }
+    conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", [(k, json.dumps(v)) for k, v in rows.items()])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+class TestConversationIndex:
+    """Tests for ConversationIndex."""
+    
+    def test_conversation_in_order(self, cursor_db, tmp_path):
+        with ConversationIndex(tmp_path / "conversations.sqlite") as index:
+            assert index.rebuild(cursor_db) == 2
+            
+            turns = index.get_conversation(cursor_db, "new")
+            
+            assert [t['text'] for t in turns] == ["Push to GitHub", "Done, I pushed it.", "Now deploy to vercel"]
+            assert [t['type'] for t in turns] == [1, 2, 1]
+    
+    def test_inline_conversation(self, cursor_db, tmp_path):
+        with ConversationIndex(tmp_path / "conversations.sqlite") as index:
+            index.rebuild(cursor_db)
+            
+            assert [t['bubble_id'] for t in index.get_conversation(cursor_db, "old")] == ["x", "y"]
+            assert index.get_conversation(cursor_db, "missing") == []
+    
+    def test_recent_conversations(self, cursor_db, tmp_path):
+        with ConversationIndex(tmp_path / "conversations.sqlite") as index:
+            assert index.refresh(cursor_db)
+            assert not index.refresh(cursor_db)
+            
+            assert index.recent(1) == ["new"]
+            assert list(index.recent_conversations(cursor_db, 5)) == ["new", "old"]
+    
+    def test_positions(self, cursor_db, tmp_path):
+        with ConversationIndex(tmp_path / "conversations.sqlite") as index:
+            index.rebuild(cursor_db)
+            
+            assert index.positions(["new", "missing"]) == {"new": {"c": 0, "a": 1, "b": 2}}
+    
+    def test_refresh_updates_only_changed_composers(self, cursor_db, tmp_path, monkeypatch):
+        with ConversationIndex(tmp_path / "conversations.sqlite") as index:
+            assert index.refresh(cursor_db) == 2
+            
+            headers = [{"bubbleId": b, "type": 1} for b in ("c", "a", "b", "d")]
+            conn = sqlite3.connect(cursor_db)
+            conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", [
+                ("composerData:new", json.dumps({"createdAt": 200, "fullConversationHeadersOnly": headers})),
+                ("bubbleId:new:d", json.dumps({"type": 1, "text": "Check it on mobile"})),
+            ])
+            conn.execute("DELETE FROM cursorDiskKV WHERE key = 'composerData:old'")
+            conn.commit()
+            conn.close()
+            # The file changed, so only the composer hashes tell what to re-read
+            monkeypatch.setattr(ConversationIndex, "built_at", 0.0)
+            
+            assert index.refresh(cursor_db) == 2
+            assert index.composer_ids() == ["new"]
+            assert [t['bubble_id'] for t in index.get_conversation(cursor_db, "new", user_only=True)] == ["c", "b", "d"]
+            assert index.refresh(cursor_db) == 0
+    
+    def test_older_index_is_rebuilt(self, cursor_db, tmp_path):
+        path = tmp_path / "conversations.sqlite"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE composers (composer_id TEXT PRIMARY KEY, created_at INTEGER, updated_at INTEGER, inline INTEGER NOT NULL)")
+        conn.execute("INSERT INTO composers VALUES ('gone', 1, 1, 0)")
+        conn.commit()
+        conn.close()
+        
+        with ConversationIndex(path) as index:
+            assert index.refresh(cursor_db) == 2
+            assert index.composer_ids() == ["new", "old"]
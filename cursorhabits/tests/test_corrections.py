@@ -0,0 +1,85 @@
+"""Tests for the corrections module."""
+
+from cursorhabits.corrections import find_repeated_corrections, group_conversations
+
+
+def _session(composer_id, *texts):
+    return [{"text": text, "composer_id": composer_id} for text in texts]
+
+
+class TestFindRepeatedCorrections:
+    """Tests for find_repeated_corrections function."""
+    
+    def test_rephrased_pattern_repeated_in_sessions(self):
+        conversations = [
+            _session("c1", "Always push to GitHub when done", "Now fix the header layout", "You forgot to push to GitHub again"),
+            _session("c2", "Push to GitHub after this change", "Make the sidebar collapsible", "Push to GitHub please!"),
+            _session("c3", "Push to GitHub after this change", "Make the sidebar collapsible"),
+        ]
+        
+        corrections = find_repeated_corrections(conversations)
+        
+        assert [c['pattern'] for c in corrections] == ["github_push"]
+        assert corrections[0]['sessions'] == 2
+        assert corrections[0]['repeats'] == 2
+        assert corrections[0]['label'] == "GitHub Workflow"
+    
+    def test_retyped_free_text_instruction(self):
+        conversations = [
+            _session(f"c{i}", "Use tabs for indentation in this repo", "Rename the helper function", "use tabs for indentation in this repo pls")
+            for i in range(3)
+        ]
+        
+        corrections = find_repeated_corrections(conversations)
+        
+        assert len(corrections) == 1
+        assert corrections[0]['pattern'] is None
+        assert corrections[0]['sessions'] == 3
+        assert corrections[0]['text'] == "Use tabs for indentation in this repo"
+    
+    def test_repeats_across_sessions_only_do_not_count(self):
+        conversations = [_session(f"c{i}", "Use tabs for indentation in this repo") for i in range(5)]
+        
+        assert find_repeated_corrections(conversations) == []
+
+
+class TestGroupConversations:
+    """Tests for group_conversations function."""
+    
+    def test_sessions_in_turn_order(self):
+        messages = [
+            {"text": "second", "composer_id": "c1", "created_at": 20},
+            {"text": "other", "composer_id": "c2", "created_at": None},
+            {"text": "first", "composer_id": "c1", "created_at": 10},
+            {"text": "later", "composer_id": "c2", "created_at": 5},
+        ]
+        
+        conversations = group_conversations(messages)
+        
+        assert [[turn["text"] for turn in turns] for turns in conversations] == [
+            ["first", "second"],
+            ["other", "later"],
+        ]
+    
+    def test_conversation_positions_order_untimed_turns(self):
+        messages = [
+            {"text": "second", "composer_id": "c1", "bubble_id": "b", "created_at": None},
+            {"text": "first", "composer_id": "c1", "bubble_id": "c", "created_at": 10},
+            {"text": "third", "composer_id": "c1", "bubble_id": "a", "created_at": None},
+        ]
+        
+        conversations = group_conversations(messages, positions={"c1": {"c": 0, "b": 1, "a": 2}})
+        
+        assert [turn["text"] for turn in conversations[0]] == ["first", "second", "third"]
+    
+    def test_exact_repeats_in_extracted_turns(self):
+        messages = [
+            {"text": text, "composer_id": f"c{i}", "created_at": t}
+            for i in range(2)
+            for t, text in enumerate(["Use tabs for indentation in this repo", "Rename the helper function", "Use tabs for indentation in this repo"])
+        ]
+        
+        corrections = find_repeated_corrections(group_conversations(messages))
+        
+        assert [(c['text'], c['sessions']) for c in corrections] == [("Use tabs for indentation in this repo", 2)]
+        assert all('ir' not in msg for msg in messages)
@@ -0,0 +1,83 @@
+"""Tests for existing-rule coverage."""
+
+import json
+
+from cursorhabits.coverage import find_covered, read_existing_rules, uncovered
+
+
+RULES = [
+    {'text': "Always run the linter before committing code", 'source': "lint.mdc"},
+    {'text': "Test on mobile before finishing", 'source': "global aiRules"},
+]
+
+PATTERNS = {
+    'mobile_check': {'count': 5, 'label': "Mobile", 'examples': ["check it on mobile"]},
+    'lint': {'count': 4, 'label': "Linting", 'examples': ["run the linter before committing the code please"]},
+    'styling': {'count': 3, 'label': "Styling", 'examples': ["use tailwind classes for the buttons"]},
+}
+
+CLUSTERS = [
+    ["run the linter before committing code", "please run the linter before you commit code"],
+    ["rename the database table to users"],
+]
+
+
+class TestReadExistingRules:
+    """Tests for read_existing_rules function."""
+    
+    def test_reads_global_and_project_rules(self, tmp_path):
+        settings = tmp_path / "settings.json"
+        settings.write_text(json.dumps({
+            "cursor.general.aiRules": "# My Rules\n\n- Be concise\n- Never use silent fallbacks\n",
+        }))
+        rules_dir = tmp_path / "rules"
+        rules_dir.mkdir()
+        (rules_dir / "habits.mdc").write_text(
+            "---\ndescription: Habits\nalwaysApply: true\n---\n\n"
+            "## Workflow\n\n1. Push to GitHub after each change\n\n"
+            "*Copy these rules into Cursor.*\n\n- (12x) \"push to github\"\n"
+        )
+        
+        rules = read_existing_rules(settings, rules_dir)
+        
+        assert rules == [
+            {'text': "Be concise", 'source': "global aiRules"},
+            {'text': "Never use silent fallbacks", 'source': "global aiRules"},
+            {'text': "Push to GitHub after each change", 'source': "habits.mdc"},
+        ]
+    
+    def test_missing_or_broken_files(self, tmp_path):
+        settings = tmp_path / "settings.json"
+        settings.write_text("{not json")
+        
+        assert read_existing_rules(settings, tmp_path / "missing") == []
+
+
+class TestFindCovered:
+    """Tests for find_covered function."""
+    
+    def test_pattern_match_and_restated_examples(self):
+        coverage = find_covered(PATTERNS, CLUSTERS, RULES)
+        
+        assert coverage['patterns']['mobile_check'] == {
+            'rule': "Test on mobile before finishing", 'source': "global aiRules", 'score': 1.0,
+        }
+        assert coverage['patterns']['lint']['source'] == "lint.mdc"
+        assert 'styling' not in coverage['patterns']
+        assert coverage['clusters'] == {0}
+    
+    def test_no_rules_covers_nothing(self):
+        assert find_covered(PATTERNS, CLUSTERS, []) == {'patterns': {}, 'clusters': set()}
+
+
+class TestUncovered:
+    """Tests for uncovered function."""
+    
+    def test_drops_covered(self):
+        patterns, clusters = uncovered(PATTERNS, CLUSTERS, find_covered(PATTERNS, CLUSTERS, RULES))
+        
+        assert list(patterns) == ['styling']
+        assert clusters == [CLUSTERS[1]]
+    
+    def test_none_keeps_everything(self):
+        assert uncovered(PATTERNS, CLUSTERS, None) == (PATTERNS, CLUSTERS)
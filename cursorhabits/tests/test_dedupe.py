@@ -0,0 +1,40 @@
+"""Tests for the dedupe module."""
+
+from cursorhabits.analyzer import analyze_patterns, find_pattern_associations, find_repeated_phrases
+from cursorhabits.dedupe import collapse_near_duplicates
+
+
+MESSAGES = [
+    {"text": "push to github pls", "composer_id": "c1"},
+    {"text": "Push to GitHub please", "composer_id": "c2"},
+    {"text": "push to github", "composer_id": "c2"},
+    {"text": "Check how it looks on mobile", "composer_id": "c1"},
+]
+
+
+class TestCollapseNearDuplicates:
+    """Tests for collapse_near_duplicates function."""
+    
+    def test_collapses_retyped_variants(self):
+        collapsed = collapse_near_duplicates(MESSAGES)
+        
+        assert [m["text"] for m in collapsed] == ["push to github pls", "Check how it looks on mobile"]
+        assert collapsed[0]["occurrences"] == 3
+        assert collapsed[0]["composer_ids"] == ["c1", "c2"]
+        assert "occurrences" not in MESSAGES[0]
+    
+    def test_analyzers_weight_by_occurrences(self):
+        collapsed = collapse_near_duplicates(MESSAGES)
+        
+        assert analyze_patterns(collapsed)["github_push"]["count"] == analyze_patterns(MESSAGES)["github_push"]["count"]
+        assert find_pattern_associations(collapsed, min_support=0.0)["sessions"] == 2
+    
+    def test_phrase_counts_survive_collapse(self):
+        messages = [{"text": "always run the linter first"} for _ in range(3)]
+        messages[1] = {"text": "Always run the linter first!"}
+        
+        assert find_repeated_phrases(collapse_near_duplicates(messages)) == find_repeated_phrases(messages)
+    
+    def test_distinct_messages_are_kept(self):
+        messages = [{"text": "fix the login bug"}, {"text": "update the readme"}]
+        assert len(collapse_near_duplicates(messages)) == 2
@@ -0,0 +1,41 @@
+"""Tests for the discovery module."""
+
+from cursorhabits.discovery import discover_categories
+from cursorhabits.synthesizer import synthesize_rules_basic
+
+
+def _messages():
+    messages = []
+    for i in range(10):
+        messages.append({"text": f"Run the supabase migration script for table{i}"})
+        messages.append({"text": f"Use storybook stories for widget{i} variants"})
+        messages.append({"text": f"Rename variable{i} inside handler{i}"})
+    # Covered by the built-in GitHub pattern, so never part of a discovered category
+    messages += [{"text": "Push to github with supabase migration"} for _ in range(5)]
+    return messages
+
+
+class TestDiscoverCategories:
+    """Tests for discover_categories function."""
+    
+    def test_groups_co_occurring_terms(self):
+        categories = discover_categories(_messages())
+        
+        terms = [set(data["terms"]) for data in categories.values()]
+        assert {"supabase", "migration"} <= next(t for t in terms if "supabase" in t)
+        assert {"storybook", "stories"} <= next(t for t in terms if "storybook" in t)
+        
+        supabase = next(data for data in categories.values() if "supabase" in data["terms"])
+        assert supabase["count"] == 10
+        assert supabase["discovered"] is True
+        assert "supabase" in supabase["examples"][0].lower()
+    
+    def test_flows_into_basic_synthesis(self):
+        categories = discover_categories(_messages())
+        rules = synthesize_rules_basic(categories, [])
+        
+        for data in categories.values():
+            assert f"## {data['label']}" in rules
+    
+    def test_too_few_messages(self):
+        assert discover_categories([{"text": "Use storybook"}]) == {}
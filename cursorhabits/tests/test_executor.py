@@ -0,0 +1,60 @@
+"""Tests for the executor module."""
+
+from cursorhabits import executor
+from cursorhabits.executor import run_analyzers, run_partitioned, batch_partitions, ANALYSIS_STAGES
+from cursorhabits.extractor import partition_by_workspace
+from cursorhabits.normalize import normalize_messages
+
+
+MESSAGES = [
+    {"text": f"Always push to GitHub and deploy to vercel {i}", "composer_id": f"c{i % 7}"}
+    for i in range(40)
+]
+
+
+class TestRunAnalyzers:
+    """Tests for run_analyzers function."""
+    
+    def test_parallel_matches_sequential(self, monkeypatch):
+        monkeypatch.setattr(executor, "MIN_PARALLEL_MESSAGES", 0)
+        
+        parallel_results, timings = run_analyzers(MESSAGES, max_workers=2)
+        sequential_results, _ = run_analyzers(MESSAGES, parallel=False)
+        
+        assert parallel_results == sequential_results
+        assert set(timings) == set(ANALYSIS_STAGES) | {"total"}
+
+
+class TestRunPartitioned:
+    """Tests for per-workspace partitioned analysis."""
+    
+    def test_small_partitions_share_a_batch(self):
+        batches = batch_partitions({"big": 600, "a": 200, "b": 200, "c": 150}, min_batch=500)
+        
+        assert batches == [["big"], ["a", "b", "c"]]
+    
+    def test_partition_by_workspace_follows_composer(self):
+        messages = [
+            {"text": "from the global db", "composer_id": "c1"},
+            {"text": "from a workspace db", "composer_id": "c1", "workspace": "ws1"},
+            {"text": "unknown workspace", "composer_id": "c2"},
+        ]
+        
+        partitions = partition_by_workspace(messages)
+        
+        assert list(partitions) == ["ws1"]
+        assert len(partitions["ws1"]) == 2
+    
+    def test_parallel_matches_sequential(self, monkeypatch):
+        monkeypatch.setattr(executor, "MIN_PARALLEL_MESSAGES", 0)
+        partitions = {
+            "ws1": normalize_messages([dict(m, workspace="ws1") for m in MESSAGES[:20]]),
+            "ws2": normalize_messages([{"text": "Check how it looks on mobile please"}] * 3),
+        }
+        
+        parallel_results, _ = run_partitioned(partitions, max_workers=2)
+        sequential_results, _ = run_partitioned(partitions, parallel=False)
+        
+        assert parallel_results == sequential_results
+        assert parallel_results["ws1"]["patterns"]["github_push"]["count"] == 20
+        assert parallel_results["ws2"]["meaningful"] == 3
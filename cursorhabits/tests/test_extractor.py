@@ -0,0 +1,116 @@
+"""Tests for the extractor module."""
+
+import json
+import sqlite3
+
+import pytest
+
+from cursorhabits import extractor
+from cursorhabits.extractor import extract_messages, get_bubble_signature, iter_recent_messages, partition_by_workspace
+
+
+def _write_db(path, bubbles):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", [
+        (f"bubbleId:{composer}:{bubble}", json.dumps({"type": 1, "text": text}))
+        for composer, bubble, text in bubbles
+    ])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def workspace_layout(tmp_path, monkeypatch):
+    """A global database with every chat, and a workspace database with copies of one project's chats."""
+    project = [("c1", "b1", "Push the changes to GitHub"), ("c1", "b2", "Deploy it to vercel please")]
+    other = [("c2", "b3", "Check how it looks on mobile")]
+    global_db = tmp_path / "globalStorage" / "state.vscdb"
+    ws_db = tmp_path / "workspaceStorage" / "ws1hash" / "state.vscdb"
+    _write_db(global_db, project + other)
+    # Older workspace databases only copied some of a chat's bubbles
+    _write_db(ws_db, project[:1])
+    monkeypatch.setattr(extractor, "get_workspace_db_paths", lambda: [ws_db])
+    return global_db
+
+
+class TestWorkspaceTags:
+    """Tests for tagging messages with the workspace they were sent in."""
+    
+    def test_extract_messages_keeps_workspace_of_copied_chats(self, workspace_layout):
+        messages = extract_messages(workspace_layout)
+        
+        assert len(messages) == 3
+        partitions = partition_by_workspace(messages)
+        assert {ws: sorted(msg['bubble_id'] for msg in msgs) for ws, msgs in partitions.items()} == {
+            "ws1hash": ["b1", "b2"],
+        }
+    
+    def test_keep_repeats_keeps_each_bubble_once(self, workspace_layout):
+        _write_db(workspace_layout, [("c2", "b4", "Check how it looks on mobile")])
+        
+        turns = extract_messages(workspace_layout, keep_repeats=True)
+        
+        assert sorted((msg['bubble_id'], msg.get('workspace')) for msg in turns) == [
+            ("b1", "ws1hash"), ("b2", "ws1hash"), ("b3", None), ("b4", None),
+        ]
+        assert len(extract_messages(workspace_layout)) == 3
+    
+    def test_budgeted_extraction_matches(self, workspace_layout):
+        messages = [msg for batch in iter_recent_messages(workspace_layout) for msg in batch['messages']]
+        
+        assert sorted((msg['bubble_id'], msg.get('workspace')) for msg in messages) == [
+            ("b1", "ws1hash"), ("b2", "ws1hash"), ("b3", None),
+        ]
+
+
+class TestGetBubbleSignature:
+    """Tests for get_bubble_signature function."""
+    
+    def test_changes_only_with_bubbles(self, tmp_path):
+        db_path = tmp_path / "state.vscdb"
+        _write_db(db_path, [("c1", "b1", "Push the changes to GitHub")])
+        before = get_bubble_signature(db_path)
+        
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO cursorDiskKV VALUES ('composerData:c1', '{}')")
+        conn.commit()
+        conn.close()
+        assert get_bubble_signature(db_path) == before
+        
+        _write_db(db_path, [("c1", "b2", "Deploy it to vercel please")])
+        assert get_bubble_signature(db_path)[0] == before[0] + 1
+        assert get_bubble_signature(tmp_path / "missing" / "state.vscdb") is None
+    
+    def test_since_reads_only_new_bubbles(self, workspace_layout, tmp_path):
+        ws_db = tmp_path / "workspaceStorage" / "ws1hash" / "state.vscdb"
+        sources = {str(path): get_bubble_signature(path) for path in [workspace_layout, ws_db]}
+        
+        # One new bubble, and one rewritten in place (the key conflict replaces the row)
+        _write_db(workspace_layout, [("c2", "b4", "Make it work offline"), ("c1", "b1", "Push the changes to GitLab")])
+        
+        messages = extract_messages(workspace_layout, keep_repeats=True, since=sources)
+        assert sorted(msg['bubble_id'] for msg in messages) == ["b1", "b4"]
+        assert extract_messages(workspace_layout, keep_repeats=True, since={}) == extract_messages(
+            workspace_layout, keep_repeats=True
+        )
+    
+    def test_since_reads_everything_after_rowids_are_renumbered(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(extractor, "get_workspace_db_paths", lambda: [])
+        db_path = tmp_path / "state.vscdb"
+        _write_db(db_path, [("c1", f"b{i}", f"Message number {i} here") for i in range(3)])
+        conn = sqlite3.connect(db_path)
+        conn.execute("DELETE FROM cursorDiskKV WHERE key = 'bubbleId:c1:b1'")
+        conn.commit()
+        conn.close()
+        sources = {str(db_path): get_bubble_signature(db_path)}
+        
+        # VACUUM may close the rowid gap, so the new bubble can reuse an old rowid
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE cursorDiskKV SET rowid = rowid - 1 WHERE key = 'bubbleId:c1:b2'")
+        conn.commit()
+        conn.close()
+        _write_db(db_path, [("c1", "b9", "Message number 9 here")])
+        
+        assert sorted(msg['bubble_id'] for msg in extract_messages(db_path, since=sources)) == ["b0", "b2", "b9"]
@@ -0,0 +1,64 @@
+"""Tests for CLI cold-start cost, from `python -X importtime`."""
+
+import subprocess
+import sys
+
+import pytest
+
+
+# Modules --help and `apply` must not pay for
+HEAVY_MODULES = ['numpy', 'rich', 'openai', 'asyncio', 'sqlite3', 'cursorhabits.analyzer', 'cursorhabits.synthesizer']
+
+# Generous ceiling on cumulative import time of the CLI module (microseconds);
+# it measures about 50ms, against over 200ms when everything loaded eagerly
+MAX_CLI_IMPORT_US = 150_000
+
+
+def _import_times(code: str) -> dict:
+    """Run code in a fresh interpreter and get cumulative import time (us) per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestColdStart:
+    """Tests for what starting the CLI imports."""
+    
+    @pytest.mark.parametrize("argv", [["--help"], ["apply", "--help"], ["trends", "--help"]])
+    def test_help_skips_heavy_modules(self, argv):
+        times = _import_times(
+            "from cursorhabits.cli import main\n"
+            f"main({argv!r}, standalone_mode=False)"
+        )
+        
+        assert 'cursorhabits.cli' in times
+        assert [name for name in HEAVY_MODULES if name in times] == []
+    
+    def test_cli_import_time(self):
+        # Best of three, to ride out a busy machine
+        best = min(_import_times("import cursorhabits.cli")['cursorhabits.cli'] for _ in range(3))
+        
+        assert best < MAX_CLI_IMPORT_US
+    
+    def test_package_exports_load_on_access(self):
+        times = _import_times("import cursorhabits")
+        assert 'cursorhabits.extractor' not in times
+        
+        import cursorhabits
+        assert callable(cursorhabits.filter_noise)
+        assert 'extract_messages' in dir(cursorhabits)
+    
+    def test_synthesizer_skips_analysis_stack(self):
+        times = _import_times("import cursorhabits.synthesizer")
+        
+        assert 'cursorhabits.deadline' in times
+        assert [name for name in ['numpy', 'cursorhabits.analyzer', 'cursorhabits.budget'] if name in times] == []
@@ -0,0 +1,78 @@
+"""Tests for the index module."""
+
+import numpy as np
+from click.testing import CliRunner
+from cursorhabits import index as index_module
+from cursorhabits.cli import main
+from cursorhabits.index import SimilarityIndex, embed_messages, embed_text
+
+
+class TestEmbedding:
+    """Tests for embed_messages and embed_text."""
+    
+    def test_rows_are_unit_length(self):
+        vectors = embed_messages([{"text": "push to github"}, {"text": "!!!"}])
+        
+        assert vectors.shape == (2, 128)
+        assert abs(np.linalg.norm(vectors[0]) - 1.0) < 1e-6
+        assert not vectors[1].any()
+    
+    def test_retyped_variants_are_closer_than_unrelated(self):
+        query = embed_text("push to github pls")
+        
+        assert query @ embed_text("Push to GitHub please") > query @ embed_text("check the mobile layout")
+
+
+class TestSimilarityIndex:
+    """Tests for SimilarityIndex."""
+    
+    def test_build_and_search(self, tmp_path):
+        index = SimilarityIndex(tmp_path)
+        messages = [
+            {"text": "Always push to GitHub after changes", "composer_id": "c1"},
+            {"text": "Check how it looks on mobile", "composer_id": "c2"},
+            {"text": "Deploy to vercel, not localhost", "composer_id": "c3"},
+        ]
+        
+        assert index.is_stale()
+        assert index.build(messages) == 3
+        assert not index.is_stale()
+        
+        results = SimilarityIndex(tmp_path).search("push to github", k=2)
+        
+        assert results[0]["text"] == "Always push to GitHub after changes"
+        assert results[0]["composer_id"] == "c1"
+        assert results[0]["score"] >= results[-1]["score"]
+    
+    def test_update_appends_only_new_bubbles(self, tmp_path, monkeypatch):
+        index = SimilarityIndex(tmp_path)
+        messages = [
+            {"text": "Always push to GitHub after changes", "composer_id": "c1", "bubble_id": "b1"},
+            {"text": "Check how it looks on mobile", "composer_id": "c2", "bubble_id": "b2"},
+        ]
+        index.update(messages, {"state.vscdb": [2, 2]})
+        
+        assert not index.is_stale({"state.vscdb": [2, 2]})
+        assert index.is_stale({"state.vscdb": [3, 3]})
+        
+        embedded = []
+        monkeypatch.setattr(index_module, "embed_messages", lambda msgs: embedded.extend(msgs) or embed_messages(msgs))
+        messages.append({"text": "Deploy to vercel, not localhost", "composer_id": "c2", "bubble_id": "b3"})
+        
+        assert index.update(messages, {"state.vscdb": [3, 3]}) == 1
+        assert [msg["bubble_id"] for msg in embedded] == ["b3"]
+        assert index.meta["count"] == 3
+        assert not index.is_stale({"state.vscdb": [3, 3]})
+        assert SimilarityIndex(tmp_path).search("deploy to vercel", k=1)[0]["text"] == "Deploy to vercel, not localhost"
+    
+    def test_min_score_filters_everything(self, tmp_path):
+        index = SimilarityIndex(tmp_path)
+        index.build([{"text": "Always push to GitHub"}])
+        
+        assert index.search("zebra llama", min_score=0.5) == []
+    
+    def test_cli_rejects_empty_top_k(self):
+        result = CliRunner().invoke(main, ["similar", "push to github", "-k", "0"])
+        
+        assert result.exit_code == 2
+        assert "-k" in result.output
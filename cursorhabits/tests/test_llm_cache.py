@@ -0,0 +1,85 @@
+"""Tests for the LLM response cache."""
+
+from cursorhabits import llm_cache
+from cursorhabits.llm_cache import LLMCache, request_key
+from cursorhabits.synthesizer import synthesize_rules
+
+
+def _request(prompt="Summarize my patterns"):
+    return {
+        'model': "gpt-4o-mini",
+        'messages': [{"role": "user", "content": prompt}],
+        'temperature': 0.7,
+        'max_tokens': 2000,
+    }
+
+
+class TestRequestKey:
+    """Tests for request_key function."""
+    
+    def test_identical_requests_share_a_key(self):
+        assert request_key(_request()) == request_key(_request())
+    
+    def test_any_change_changes_the_key(self):
+        key = request_key(_request())
+        
+        assert request_key(_request("Something else")) != key
+        assert request_key({**_request(), 'temperature': 0.2}) != key
+        assert request_key({**_request(), 'model': "gpt-4o"}) != key
+
+
+class TestLLMCache:
+    """Tests for LLMCache class."""
+    
+    def test_put_then_get(self, tmp_path):
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            assert cache.get("k") is None
+            cache.put("k", "rules")
+            
+            assert cache.get("k") == "rules"
+            assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_persists_across_instances(self, tmp_path):
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            cache.put("k", "rules")
+        
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            assert cache.get("k") == "rules"
+    
+    def test_expired_entries_miss(self, tmp_path, monkeypatch):
+        with LLMCache(tmp_path / "llm.sqlite", ttl=60) as cache:
+            cache.put("k", "rules")
+            now = llm_cache.time.time()
+            monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+            
+            assert cache.get("k") is None
+    
+    def test_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        clock = iter(range(1_000, 2_000))
+        monkeypatch.setattr(llm_cache.time, "time", lambda: next(clock))
+        
+        with LLMCache(tmp_path / "llm.sqlite", max_bytes=25) as cache:
+            cache.put("a", "x" * 10)
+            cache.put("b", "x" * 10)
+            cache.get("a")
+            cache.put("c", "x" * 10)
+            
+            assert cache.get("a") is not None
+            assert cache.get("b") is None
+            assert cache.get("c") is not None
+
+
+class TestSynthesizeRulesCache:
+    """Tests for synthesize_rules with a response cache."""
+    
+    def test_rerun_makes_no_api_call(self, openai_stub, tmp_path):
+        openai_stub.reply = lambda body: ["- Always push to GitHub"]
+        patterns = {'github_push': {'count': 3, 'label': "Push to GitHub", 'examples': ["push it"]}}
+        
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            first = synthesize_rules(patterns, [], [], cache=cache)
+            second = synthesize_rules(patterns, [], [], cache=cache)
+        
+        assert len(openai_stub.requests) == 1
+        assert "Always push to GitHub" in first and "Always push to GitHub" in second
+        assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,37 @@
+"""Tests for the normalize module."""
+
+import pickle
+
+from cursorhabits.normalize import MessageIR, Vocabulary, get_ir, normalize_messages
+
+
+class TestMessageIR:
+    """Tests for MessageIR."""
+    
+    def test_tokens_and_significant_words(self):
+        ir = MessageIR("Don't push to GitHub, deploy_now!", Vocabulary())
+        
+        assert ir.lower == "don't push to github, deploy_now!"
+        assert ir.tokens() == ["don", "t", "push", "to", "github", "deploy_now"]
+        assert ir.words == {"push", "github", "deploy_now"}
+    
+    def test_words_hash_ignores_order_and_case(self):
+        vocab = Vocabulary()
+        assert MessageIR("push to GitHub", vocab).words_hash == MessageIR("github PUSH", Vocabulary()).words_hash
+        assert MessageIR("push to GitHub", vocab).words_hash != MessageIR("push to vercel", vocab).words_hash
+    
+    def test_survives_pickling(self):
+        messages = normalize_messages([{"text": "Always push to GitHub"}, {"text": "push again"}])
+        restored = pickle.loads(pickle.dumps(messages))
+        
+        assert restored[0]["ir"].vocab is restored[1]["ir"].vocab
+        assert restored[1]["ir"].tokens() == ["push", "again"]
+
+
+class TestGetIR:
+    """Tests for get_ir function."""
+    
+    def test_computed_once_and_cached(self):
+        msg = {"text": "Always push to GitHub"}
+        assert get_ir(msg) is get_ir(msg)
+        assert msg["ir"].lower == "always push to github"
@@ -0,0 +1,101 @@
+"""Tests for token-budgeted prompt packing."""
+
+from cursorhabits.packing import estimate_tokens, pack_prompt
+
+
+def _pattern(label, count, examples, scores=None):
+    return {
+        'count': count,
+        'label': label,
+        'examples': examples,
+        'example_scores': scores or [0.5] * len(examples),
+    }
+
+
+class TestEstimateTokens:
+    """Tests for estimate_tokens function."""
+    
+    def test_counts_words_and_punctuation(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("push to github") == 3
+        assert estimate_tokens('- "push"') == 4
+    
+    def test_long_words_cost_more(self):
+        assert estimate_tokens("internationalization") > estimate_tokens("deploy")
+
+
+class TestPackPrompt:
+    """Tests for pack_prompt function."""
+    
+    def test_stays_within_budget(self):
+        patterns = {
+            f"p{i}": _pattern(f"Pattern {i}", 100 - i, [f"example number {i} about topic {j} {'x' * j}" for j in range(5)])
+            for i in range(20)
+        }
+        
+        sections, stats = pack_prompt(patterns, [], [], max_tokens=150)
+        
+        assert stats['tokens'] <= 150
+        assert estimate_tokens(sections['patterns']) <= 150
+        assert stats['over_budget'] > 0
+    
+    def test_prefers_strong_examples(self):
+        patterns = {'push': _pattern(
+            "Push to GitHub", 10,
+            ["ok so yeah github", "Always push to GitHub after every change"],
+            [0.1, 0.9],
+        )}
+        header = estimate_tokens("\n### Push to GitHub (10 occurrences)\n")
+        strong = estimate_tokens('- "Always push to GitHub after every change"\n')
+        
+        sections, _ = pack_prompt(patterns, [], [], max_tokens=header + strong)
+        
+        assert "Always push to GitHub" in sections['patterns']
+        assert "ok so yeah" not in sections['patterns']
+    
+    def test_examples_need_their_header(self):
+        patterns = {'push': _pattern("Push to GitHub", 10, ["Always push to GitHub after every change"])}
+        
+        sections, _ = pack_prompt(patterns, [], [], max_tokens=3)
+        
+        assert sections['patterns'] == ""
+    
+    def test_skips_redundant_lines(self):
+        shared = "Always push to GitHub after every change"
+        patterns = {
+            'push': _pattern("Push to GitHub", 10, [shared]),
+            'workflow': _pattern("Git Workflow", 8, [shared, "Commit with a clear message"]),
+        }
+        phrases = [("push to github after every", 6)]
+        
+        sections, stats = pack_prompt(patterns, phrases, [])
+        
+        assert sections['patterns'].count(shared) == 1
+        assert "Commit with a clear message" in sections['patterns']
+        assert sections['phrases'] == ""
+        assert stats['redundant'] == 2
+    
+    def test_keeps_prompt_order(self):
+        patterns = {
+            'first': _pattern("First", 5, ["deploy the preview build"]),
+            'second': _pattern("Second", 50, ["check the layout on mobile"]),
+        }
+        
+        sections, _ = pack_prompt(patterns, [], [])
+        
+        assert sections['patterns'].index("### First") < sections['patterns'].index("### Second")
+    
+    def test_fills_every_section(self):
+        corrections = [{'text': "use tabs", 'label': None, 'sessions': 3, 'repeats': 4}]
+        associations = {'rules': [{
+            'antecedent_labels': ["Deployment"], 'consequent_label': "Mobile-First",
+            'confidence': 0.8, 'lift': 2.0, 'count': 5,
+        }]}
+        clusters = [["fix the flaky login test", "fix the flaky signup test"]]
+        
+        sections, _ = pack_prompt({}, [("run the linter", 4)], clusters, associations, corrections)
+        
+        assert '"use tabs" (repeated in 3 sessions, 4 times)' in sections['corrections']
+        assert "Cluster 1 (2 similar messages)" in sections['clusters']
+        assert "Deployment -> Mobile-First" in sections['associations']
+        assert "run the linter" in sections['phrases']
@@ -0,0 +1,98 @@
+"""Tests for the packs module."""
+
+import json
+import re
+
+import pytest
+from cursorhabits.analyzer import PATTERN_DEFINITIONS, DEFAULT_MATCHER, analyze_patterns, required_literals
+from cursorhabits.packs import build_matcher, load_pack, load_packs, pack_rule_templates
+from cursorhabits.synthesizer import synthesize_rules_basic
+
+
+PACK = {
+    "name": "acme",
+    "patterns": [
+        {
+            "name": "acme_ticket",
+            "regex": r"ACME-\d+|ticket",
+            "label": "Tickets",
+            "category": "Workflow",
+            "rule": "Reference the ticket in every commit",
+        },
+    ],
+}
+
+
+@pytest.fixture
+def data_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("CURSORHABITS_HOME", str(tmp_path))
+    return tmp_path
+
+
+class TestRequiredLiterals:
+    """Tests for required_literals function."""
+    
+    def test_alternations_and_groups(self):
+        assert required_literals(r"vercel|deploy") == ["deploy", "vercel"]
+        assert required_literals(r"update.*(readme|doc)") == ["update"]
+        assert required_literals(r"\w+") is None
+    
+    def test_prefiltered_matcher_agrees_with_regexes(self):
+        texts = ["push to github", "double-check the math", "go live now", "nothing here", "api_key please"]
+        for text in texts:
+            expected = [name for name, regex, _ in PATTERN_DEFINITIONS if re.search(regex, text)]
+            assert DEFAULT_MATCHER.match(text) == expected
+
+
+class TestPacks:
+    """Tests for pack loading and compilation."""
+    
+    def test_load_and_match(self, data_home, tmp_path):
+        path = tmp_path / "acme.json"
+        path.write_text(json.dumps(PACK))
+        
+        packs = load_packs((path,))
+        matcher = build_matcher(packs)
+        patterns = analyze_patterns([{"text": "Close ACME-123 when done"}], matcher=matcher)
+        
+        assert patterns["acme_ticket"]["label"] == "Tickets"
+        assert pack_rule_templates(packs) == {"acme_ticket": ("Workflow", "Reference the ticket in every commit")}
+        assert "Reference the ticket in every commit" in synthesize_rules_basic(
+            patterns, [], rule_templates=pack_rule_templates(packs)
+        )
+    
+    def test_installed_packs_and_cache(self, data_home):
+        packs_dir = data_home / "packs"
+        packs_dir.mkdir()
+        (packs_dir / "acme.toml").write_text('[[patterns]]\nname = "acme_ticket"\nregex = "ticket"\n')
+        
+        first = load_packs()
+        cached = list((data_home / "cache" / "packs").iterdir())
+        second = load_packs()
+        
+        assert len(cached) == 1
+        assert first == second
+        assert first[0]["name"] == "acme"
+        assert first[0]["patterns"][0]["label"] == "Acme Ticket"
+    
+    def test_invalid_regex_is_reported(self, data_home, tmp_path):
+        path = tmp_path / "bad.json"
+        path.write_text(json.dumps({"patterns": [{"name": "bad", "regex": "("}]}))
+        
+        with pytest.raises(ValueError, match="bad"):
+            load_pack(path)
+    
+    @pytest.mark.parametrize("data", [
+        ["not", "a", "table"],
+        "just a string",
+        42,
+        {"patterns": {"name": "x"}},
+        {"patterns": [{"name": "x", "regex": 5}]},
+        {"patterns": [{"name": "x", "regex": "x", "label": ["X"]}]},
+    ])
+    def test_malformed_pack_is_a_value_error(self, data_home, tmp_path, data):
+        path = tmp_path / "malformed.json"
+        path.write_text(json.dumps(data))
+        
+        with pytest.raises(ValueError, match="malformed.json"):
+            load_pack(path)
@@ -0,0 +1,127 @@
+"""Tests for per-stage profiling."""
+
+import json
+import sqlite3
+import tracemalloc
+
+from cursorhabits import executor, extractor, profiling
+from cursorhabits.executor import ANALYSIS_STAGES, run_analyzers
+from cursorhabits.extractor import extract_messages
+from cursorhabits.profiling import StageProfiler
+
+
+MESSAGES = [
+    {"text": f"Always push to GitHub and deploy to vercel {i}", "composer_id": f"c{i % 7}"}
+    for i in range(40)
+]
+
+
+class TestStageProfiler:
+    """Tests for StageProfiler class."""
+    
+    def test_nested_stages(self):
+        with StageProfiler() as profiler:
+            with profiler.stage("outer", rows=3):
+                with profiler.stage("inner") as stage:
+                    data = [bytearray(1024) for _ in range(2000)]
+                    stage['rows'] = len(data)
+                del data
+        
+        outer, inner = profiler.stages
+        assert (outer['name'], outer['depth'], outer['rows']) == ("outer", 0, 3)
+        assert (inner['name'], inner['depth'], inner['rows']) == ("inner", 1, 2000)
+        assert inner['peak_memory_bytes'] >= 2000 * 1024
+        assert outer['peak_memory_bytes'] >= inner['peak_memory_bytes']
+        assert outer['wall_seconds'] >= inner['wall_seconds'] > 0
+        assert inner['cpu_seconds'] > 0
+    
+    def test_growth_without_reset_peak(self, monkeypatch):
+        monkeypatch.setattr(profiling, "RESETS_PEAK", False)
+        
+        with StageProfiler() as profiler:
+            with profiler.stage("outer"):
+                with profiler.stage("inner"):
+                    data = [bytearray(1024) for _ in range(2000)]
+        
+        outer, inner = profiler.stages
+        assert inner['peak_memory_bytes'] >= 2000 * 1024
+        assert outer['peak_memory_bytes'] >= inner['peak_memory_bytes']
+        del data
+    
+    def test_close_stops_tracing(self):
+        profiler = StageProfiler()
+        assert tracemalloc.is_tracing()
+        
+        profiler.close()
+        assert not tracemalloc.is_tracing()
+    
+    def test_disabled_records_nothing(self):
+        profiler = StageProfiler(enabled=False)
+        
+        with profiler.stage("stage") as stage:
+            stage['rows'] = 5
+        profiler.add("worker stage", 1.0)
+        
+        assert profiler.stages == []
+        assert not tracemalloc.is_tracing()
+    
+    def test_write_json(self, tmp_path):
+        with StageProfiler() as profiler:
+            with profiler.stage("stage", rows=1):
+                pass
+        path = tmp_path / "metrics.json"
+        
+        profiler.write_json(path)
+        
+        metrics = json.loads(path.read_text())
+        assert metrics['version'] == 1
+        assert [stage['name'] for stage in metrics['stages']] == ["stage"]
+        assert set(metrics['total']) == {'wall_seconds', 'cpu_seconds', 'bytes_read', 'peak_memory_bytes', 'max_rss_bytes'}
+
+
+class TestProfiledStages:
+    """Tests for the stages the pipeline records."""
+    
+    def test_inline_analyzers(self):
+        with StageProfiler() as profiler:
+            run_analyzers(MESSAGES, parallel=False, profiler=profiler)
+        
+        assert [stage['name'] for stage in profiler.stages] == list(ANALYSIS_STAGES)
+        assert {stage['process'] for stage in profiler.stages} == {'main'}
+        assert {stage['rows'] for stage in profiler.stages} == {len(MESSAGES)}
+    
+    def test_worker_analyzers(self, monkeypatch):
+        monkeypatch.setattr(executor, "MIN_PARALLEL_MESSAGES", 0)
+        
+        with StageProfiler() as profiler:
+            run_analyzers(MESSAGES, max_workers=2, profiler=profiler)
+        
+        assert [stage['name'] for stage in profiler.stages] == list(ANALYSIS_STAGES)
+        assert {stage['process'] for stage in profiler.stages} == {'worker'}
+        assert all(stage['cpu_seconds'] is not None for stage in profiler.stages)
+    
+    def test_each_database_extracted(self, tmp_path, monkeypatch):
+        paths = []
+        for name, count in [("global", 3), ("ws1", 2)]:
+            path = tmp_path / name / "state.vscdb"
+            path.parent.mkdir()
+            conn = sqlite3.connect(path)
+            conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+            conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", [
+                (f"bubbleId:{name}:b{i}", json.dumps({"type": 1, "text": f"Please fix {name} bug {i}"}))
+                for i in range(count)
+            ])
+            conn.commit()
+            conn.close()
+            paths.append(path)
+        monkeypatch.setattr(extractor, "get_workspace_db_paths", lambda: paths[1:])
+        
+        with StageProfiler(trace_memory=False) as profiler:
+            messages = extract_messages(paths[0], profiler=profiler)
+        
+        assert len(messages) == 5
+        assert [(stage['name'], stage['rows']) for stage in profiler.stages] == [
+            ("state.vscdb", 3),
+            ("ws1/state.vscdb", 2),
+        ]
+        assert profiler.stages[0]['peak_memory_bytes'] is None
@@ -0,0 +1,92 @@
+"""Tests for machine-readable output."""
+
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.synthetic import generate_cursor_home
+from cursorhabits.records import build_report, ndjson_records, rule_records, write_records
+
+
+PATTERNS = {
+    'github_push': {'count': 5, 'label': 'GitHub Workflow', 'examples': ["push to github"]},
+    'discovered_tests': {'count': 3, 'label': 'Tests', 'examples': ["run the tests"], 'discovered': True},
+}
+RULES = "# Cursor Rules\n\n## GitHub Workflow\n*Note*\n\n- Push after every change\n\n## Tests\n1. Run the tests first\n"
+
+
+def _report(**kwargs):
+    return build_report(
+        PATTERNS, [("push to github", 4)], [["a", "b"], ["c", "d"]], {'rules': []},
+        rules_content=RULES, rules_source='basic', **kwargs,
+    )
+
+
+class TestRuleRecords:
+    """Tests for rule_records function."""
+    
+    def test_bullets_under_sections(self):
+        assert rule_records(RULES) == [
+            {'section': "GitHub Workflow", 'text': "Push after every change"},
+            {'section': "Tests", 'text': "Run the tests first"},
+        ]
+
+
+class TestBuildReport:
+    """Tests for build_report function."""
+    
+    def test_marks_covered_habits(self):
+        covered = {'patterns': {'github_push': {'rule': "Always push", 'source': "global", 'score': 1.0}}, 'clusters': {1}}
+        
+        report = _report(covered=covered, phrase_intervals={"push to github": (3, 6)})
+        
+        assert [p['covered_by'] for p in report['patterns']] == [covered['patterns']['github_push'], None]
+        assert [p['discovered'] for p in report['patterns']] == [False, True]
+        assert [c['covered'] for c in report['clusters']] == [False, True]
+        assert report['phrases'] == [{'phrase': "push to github", 'count': 4, 'interval': [3, 6]}]
+        json.dumps(report)
+
+
+class TestNdjsonRecords:
+    """Tests for ndjson_records function."""
+    
+    def test_run_record_then_typed_records(self):
+        metrics = {'version': 1, 'total': {'wall_seconds': 1.0}, 'stages': [{'name': "extract", 'rows': 10}]}
+        
+        records = list(ndjson_records(_report(metrics=metrics)))
+        
+        assert records[0]['type'] == 'run'
+        assert records[0]['metrics'] == {'version': 1, 'total': {'wall_seconds': 1.0}}
+        assert [r['type'] for r in records[1:]] == ['pattern', 'pattern', 'phrase', 'cluster', 'cluster', 'rule', 'rule', 'stage']
+        assert records[-1] == {'type': 'stage', 'name': "extract", 'rows': 10}
+    
+    def test_write_to_file(self, tmp_path):
+        path = tmp_path / "report.ndjson"
+        
+        write_records(_report(), 'ndjson', str(path))
+        
+        lines = path.read_text().splitlines()
+        assert len(lines) == 8
+        assert all(json.loads(line)['type'] for line in lines)
+
+
+class TestHeadlessRun:
+    """Tests for `cursorhabits --format`."""
+    
+    def test_records_on_stdout_without_rich(self, tmp_path):
+        stats = generate_cursor_home(tmp_path / "home", bubbles=600, workspaces=1, seed=3)
+        env = {**os.environ, **stats['env'], 'CURSORHABITS_HOME': str(tmp_path / "data"), 'OPENAI_API_KEY': ''}
+        
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "cursorhabits.cli", "--no-llm", "--format", "ndjson"],
+            cwd=tmp_path, env=env, capture_output=True, text=True, check=True,
+        )
+        
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        types = {record['type'] for record in records}
+        assert records[0]['type'] == 'run' and records[0]['rules_source'] == 'basic'
+        assert {'pattern', 'rule', 'stage'} <= types
+        assert "Found" in result.stderr
+        assert " rich" not in result.stderr
+        assert not (tmp_path / "suggested_rules.md").exists()
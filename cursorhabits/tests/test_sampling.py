@@ -0,0 +1,113 @@
+"""Tests for sampled extraction and the sampling module."""
+
+import json
+import sqlite3
+
+import pytest
+
+from cursorhabits import extractor
+from cursorhabits.extractor import extract_messages
+from cursorhabits.sampling import apply_estimates, required_sample_size, sample_report, wilson_interval
+
+
+@pytest.fixture
+def cursor_db(tmp_path, monkeypatch):
+    """A Cursor database with one large and one single-message chat."""
+    monkeypatch.setattr(extractor, "get_workspace_db_paths", lambda: [])
+    
+    db_path = tmp_path / "state.vscdb"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    rows = [(f"bubbleId:big:b{i}", {"type": 1, "text": f"Please fix bug number {i}"}) for i in range(40)]
+    rows.append(("bubbleId:small:b0", {"type": 1, "text": "Always push to GitHub"}))
+    conn.executemany("INSERT INTO cursorDiskKV VALUES (?, ?)", [(k, json.dumps(v)) for k, v in rows])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+class TestSampledExtraction:
+    """Tests for extract_messages with a sample fraction."""
+    
+    def test_samples_every_composer(self, cursor_db):
+        messages = extract_messages(cursor_db, sample=0.25)
+        
+        by_composer = {}
+        for msg in messages:
+            by_composer.setdefault(msg['composer_id'], []).append(msg)
+        
+        assert len(by_composer['big']) == 10
+        assert by_composer['small'][0]['sample_weight'] == 1
+        assert sum(msg['sample_weight'] for msg in messages) == 41
+    
+    def test_sample_is_reproducible(self, cursor_db):
+        first = extract_messages(cursor_db, sample=0.25, seed=7)
+        second = extract_messages(cursor_db, sample=0.25, seed=7)
+        
+        assert [m['text'] for m in first] == [m['text'] for m in second]
+    
+    def test_full_extraction_is_unweighted(self, cursor_db):
+        messages = extract_messages(cursor_db)
+        
+        assert len(messages) == 41
+        assert all('sample_weight' not in msg for msg in messages)
+
+
+class TestEstimates:
+    """Tests for confidence intervals and sample size estimates."""
+    
+    def test_wilson_interval(self):
+        low, high = wilson_interval(10, 100)
+        
+        assert low == pytest.approx(0.0552, abs=1e-3)
+        assert high == pytest.approx(0.1744, abs=1e-3)
+        assert wilson_interval(0, 50)[0] == 0.0
+    
+    def test_required_sample_size(self):
+        # Close proportions need far more messages than clearly separated ones
+        close = required_sample_size([50, 45], 100)
+        apart = required_sample_size([50, 10], 100)
+        
+        assert close > apart
+        assert required_sample_size([5, 5], 100) is None
+    
+    def test_sample_report_scales_to_population(self):
+        messages = [
+            {"text": "push this to github" if i < 10 else f"message {i}", "sample_weight": 4}
+            for i in range(50)
+        ]
+        messages[0]["text"] = "run the tests first and push this to github"
+        patterns = {"github_push": {"count": 10, "label": "GitHub Workflow"}}
+        phrases = [("run the tests first", 1)]
+        
+        report = sample_report(patterns, phrases, messages)
+        estimated, phrases = apply_estimates(patterns, phrases, report)
+        
+        assert report['population'] == 200
+        assert report['effective_size'] == 50
+        assert estimated['github_push']['count'] == 40
+        low, high = estimated['github_push']['interval']
+        assert low < 40 < high
+        assert phrases == [("run the tests first", 4)]
+    
+    def test_each_message_counts_with_its_own_weight(self):
+        # A small chat kept whole must not count like the thinned large one
+        thinned = [{"text": f"message {i}", "sample_weight": 10} for i in range(20)]
+        whole = [{"text": "push this to github", "sample_weight": 1} for _ in range(5)]
+        patterns = {"github_push": {"count": 5, "label": "GitHub Workflow"}}
+        
+        report = sample_report(patterns, [], thinned + whole)
+        
+        assert report['population'] == 205
+        assert report['patterns']['github_push'][0] == 5
+        assert report['effective_size'] < report['sample_size']
+    
+    def test_phrase_repeated_within_a_message_counts_once(self):
+        text = "run the tests first. " * 6
+        messages = [{"text": text, "sample_weight": 10}] + [{"text": f"message {i}", "sample_weight": 10} for i in range(3)]
+        
+        report = sample_report({}, [("run the tests first", 6)], messages)
+        
+        phrase, estimate, low, high = report['phrases'][0]
+        assert estimate == 10
+        assert low <= estimate <= high <= report['population']
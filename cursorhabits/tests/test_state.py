@@ -0,0 +1,112 @@
+"""Tests for the state module."""
+
+import sqlite3
+from datetime import date
+
+import pytest
+from cursorhabits.analyzer import PATTERN_DEFINITIONS, PatternMatcher, analyze_patterns, find_repeated_phrases
+from cursorhabits.state import SINGLETON_TTL_DAYS, AnalysisState
+
+
+MESSAGES = [
+    {"text": f"Always push to GitHub after every change number {i}"} for i in range(8)
+] + [
+    {"text": f"Make sure to check mobile layout before deploying build {i}"} for i in range(5)
+]
+
+
+class TestAnalysisState:
+    """Tests for AnalysisState."""
+    
+    def test_matches_batch_analysis(self):
+        state = AnalysisState()
+        state.update(MESSAGES)
+        
+        assert state.patterns() == analyze_patterns(MESSAGES)
+        assert state.phrases() == find_repeated_phrases(MESSAGES)
+    
+    def test_incremental_update_only_counts_new_messages(self):
+        state = AnalysisState()
+        assert state.update(MESSAGES[:6]) == 6
+        assert state.update(MESSAGES) == len(MESSAGES) - 6
+        assert state.update(MESSAGES) == 0
+        
+        assert state.patterns() == analyze_patterns(MESSAGES)
+    
+    def test_merge_disjoint_states(self):
+        left, right = AnalysisState(), AnalysisState()
+        left.update(MESSAGES[:6])
+        right.update(MESSAGES[6:])
+        
+        merged = left.merge(right)
+        
+        assert merged.phrases() == find_repeated_phrases(MESSAGES)
+        with pytest.raises(ValueError):
+            merged.merge(right)
+    
+    def test_save_and_load_roundtrip(self, tmp_path):
+        state = AnalysisState()
+        state.update(MESSAGES)
+        path = tmp_path / "state.sqlite"
+        state.save(path)
+        
+        with AnalysisState.load(path) as loaded:
+            assert loaded.patterns() == state.patterns()
+            assert loaded.phrases() == find_repeated_phrases(MESSAGES)
+            assert loaded.update(MESSAGES) == 0
+        state.close()
+    
+    def test_saving_adds_only_new_rows(self, tmp_path):
+        path = tmp_path / "state.sqlite"
+        with AnalysisState() as state:
+            state.update(MESSAGES[:6])
+            state.save(path)
+        
+        with AnalysisState.load(path) as loaded:
+            assert loaded.update(MESSAGES) == len(MESSAGES) - 6
+            assert len(loaded.seen) == len(MESSAGES) - 6
+            assert loaded.phrases() == find_repeated_phrases(MESSAGES)
+            loaded.save(path)
+            assert loaded.seen == set()
+            assert loaded.phrases() == find_repeated_phrases(MESSAGES)
+        
+        with AnalysisState.load(path) as loaded:
+            assert loaded.patterns() == analyze_patterns(MESSAGES)
+            assert loaded.update(MESSAGES) == 0
+    
+    def test_old_singleton_ngrams_are_pruned(self, tmp_path):
+        path = tmp_path / "state.sqlite"
+        with AnalysisState() as state:
+            state.update(MESSAGES)
+            state.save(path)
+        
+        conn = sqlite3.connect(path)
+        singletons = conn.execute("SELECT COUNT(*) FROM ngrams WHERE count = 1").fetchone()[0]
+        conn.execute("UPDATE ngrams SET touched = ?", (date.today().toordinal() - SINGLETON_TTL_DAYS - 1,))
+        conn.commit()
+        conn.close()
+        
+        with AnalysisState.load(path) as loaded:
+            loaded.save(path)
+            assert singletons > 0
+            assert loaded.conn.execute("SELECT COUNT(*) FROM ngrams WHERE count = 1").fetchone()[0] == 0
+            assert loaded.phrases() == find_repeated_phrases(MESSAGES)
+    
+    def test_missing_file_starts_fresh(self, tmp_path):
+        state = AnalysisState.load(tmp_path / "missing.sqlite")
+        assert state.patterns() == {}
+    
+    def test_different_patterns_start_fresh(self, tmp_path):
+        state = AnalysisState()
+        state.update(MESSAGES)
+        path = tmp_path / "state.sqlite"
+        state.save(path)
+        
+        # Like adding a --pack: the new pattern would only be counted on new messages
+        matcher = PatternMatcher(PATTERN_DEFINITIONS + [("layout", r"layout", "Layout")])
+        loaded = AnalysisState.load(path, matcher=matcher)
+        
+        assert loaded.seen == set()
+        assert loaded.update(MESSAGES) == len(MESSAGES)
+        assert loaded.patterns()['layout']['count'] == 5
+        assert AnalysisState.load(path, matcher=PatternMatcher(PATTERN_DEFINITIONS)).update(MESSAGES) == 0
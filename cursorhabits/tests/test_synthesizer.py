@@ -0,0 +1,176 @@
+"""Tests for rule synthesis."""
+
+import asyncio
+import threading
+import time
+
+from cursorhabits import synthesizer
+from cursorhabits.llm_cache import LLMCache
+from cursorhabits.synthesizer import (
+    group_by_category,
+    synthesize_rules_basic,
+    synthesize_rules_streaming,
+    synthesize_with_deadline,
+    RULE_TEMPLATES,
+)
+
+
+PATTERNS = {
+    'github_push': {'count': 9, 'label': "Push to GitHub", 'examples': ["push to github"]},
+    'mobile_check': {'count': 7, 'label': "Check mobile", 'examples': ["how does it look on mobile"]},
+    'vercel_deploy': {'count': 5, 'label': "Deploy to Vercel", 'examples': ["deploy to vercel"]},
+    'be_concise': {'count': 3, 'label': "Be concise", 'examples': ["shorter please"]},
+}
+
+
+def _section(body):
+    """The section title a stub request asks for."""
+    return body['messages'][-1]['content'].split('"')[1]
+
+
+class TestGroupByCategory:
+    """Tests for group_by_category function."""
+    
+    def test_groups_in_pattern_order(self):
+        categories = group_by_category(PATTERNS, RULE_TEMPLATES)
+        
+        assert list(categories) == ["Deployment", "Quality", "Communication"]
+        assert [r['name'] for r in categories["Deployment"]] == ['github_push', 'vercel_deploy']
+    
+    def test_untemplated_patterns_get_own_category(self):
+        patterns = {'tabs': {'count': 2, 'label': "Use tabs", 'examples': ["use tabs not spaces"]}}
+        
+        categories = group_by_category(patterns, RULE_TEMPLATES)
+        
+        assert categories == {"Use tabs": [{
+            'name': 'tabs', 'label': "Use tabs", 'rule': "use tabs not spaces", 'count': 2,
+            'examples': ["use tabs not spaces"],
+        }]}
+    
+    def test_basic_rules_use_categories(self):
+        rules = synthesize_rules_basic(PATTERNS, [])
+        
+        assert rules.index("## Deployment") < rules.index("## Quality") < rules.index("## Communication")
+
+
+class TestSynthesizeRulesStreaming:
+    """Tests for synthesize_rules_streaming against a local OpenAI-compatible server."""
+    
+    def test_sections_keep_order_when_finishing_out_of_order(self, openai_stub, tmp_path):
+        # Earlier sections answer last
+        delays = {"Deployment": 0.3, "Quality": 0.15, "Communication": 0}
+        openai_stub.delay = lambda body: delays[_section(body)]
+        openai_stub.reply = lambda body: [f"- Rule for ", f"{_section(body)}"]
+        output = tmp_path / "rules.md"
+        
+        rules = asyncio.run(synthesize_rules_streaming(PATTERNS, [], [], output_path=output))
+        
+        assert openai_stub.max_in_flight == 3
+        assert all(body['stream'] for body in openai_stub.requests)
+        assert rules.index("## Deployment") < rules.index("- Rule for Deployment") < rules.index("## Quality")
+        assert rules.index("- Rule for Quality") < rules.index("## Communication") < rules.index("- Rule for Communication")
+        assert output.read_text() == rules
+    
+    def test_concurrency_is_bounded(self, openai_stub):
+        openai_stub.delay = lambda body: 0.05
+        
+        asyncio.run(synthesize_rules_streaming(PATTERNS, [("push it", 4)], [], max_concurrency=2))
+        
+        assert len(openai_stub.requests) == 4
+        assert openai_stub.max_in_flight == 2
+    
+    def test_failed_section_falls_back_to_template(self, openai_stub):
+        def reply(body):
+            if _section(body) == "Quality":
+                raise RuntimeError("boom")
+            return ["- Synthesized"]
+        openai_stub.reply = reply
+        
+        rules = asyncio.run(synthesize_rules_streaming(PATTERNS, [], [], timeout=5))
+        
+        assert RULE_TEMPLATES['mobile_check'][1] in rules
+        assert rules.count("- Synthesized") == 2
+    
+    def test_cached_sections_skip_the_server(self, openai_stub, tmp_path):
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            first = asyncio.run(synthesize_rules_streaming(PATTERNS, [], [], cache=cache))
+            second = asyncio.run(synthesize_rules_streaming(PATTERNS, [], [], cache=cache))
+        
+        assert len(openai_stub.requests) == 3
+        assert cache.hits == 3
+        assert first.split('\n', 3)[3] == second.split('\n', 3)[3]
+    
+    def test_no_api_key(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.delenv("CURSOR_OPENAI_API_KEY", raising=False)
+        
+        assert asyncio.run(synthesize_rules_streaming(PATTERNS, [], [])) is None
+
+
+class TestSynthesizeWithDeadline:
+    """Tests for synthesize_with_deadline against a local OpenAI-compatible server."""
+    
+    def test_uses_llm_rules_in_time(self, openai_stub):
+        rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=10)
+        
+        assert "- Push to GitHub after every change" in rules
+        assert "Synthesized from your chat history" in rules
+        assert stats['source'] == 'llm'
+        assert (stats['attempts'], stats['retries'], stats['fallback']) == (1, 0, None)
+    
+    def test_retries_server_errors(self, openai_stub, monkeypatch):
+        monkeypatch.setattr(synthesizer, "BACKOFF_BASE", 0.01)
+        statuses = iter([503, 429])
+        openai_stub.status = lambda body: next(statuses, 200)
+        
+        rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=10)
+        
+        assert stats['source'] == 'llm'
+        assert (stats['attempts'], stats['retries'], stats['errors']) == (3, 2, 2)
+    
+    def test_gives_up_on_client_errors(self, openai_stub):
+        openai_stub.status = lambda body: 401
+        
+        rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=10)
+        
+        assert stats['source'] == 'basic'
+        assert (stats['attempts'], stats['fallback']) == (1, 'error')
+        assert rules.split('\n', 2)[2] == synthesize_rules_basic(PATTERNS, []).split('\n', 2)[2]
+    
+    def test_falls_back_at_deadline(self, openai_stub):
+        openai_stub.delay = lambda body: 2
+        
+        rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=0.3)
+        
+        assert stats['source'] == 'basic'
+        assert stats['fallback'] == 'deadline'
+        assert stats['seconds'] < 1
+        assert "## Deployment" in rules
+    
+    def test_late_response_is_not_cached(self, openai_stub, tmp_path):
+        openai_stub.delay = lambda body: 0.5
+        
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=0.1, cache=cache)
+        running = [t for t in threading.enumerate() if t.name == "cursorhabits-synthesis"]
+        # The request finishes after the cache is closed, and is dropped
+        time.sleep(0.6)
+        
+        assert stats['fallback'] == 'deadline'
+        assert running and all(t.daemon for t in running)
+        with LLMCache(tmp_path / "llm.sqlite") as cache:
+            rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=10, cache=cache)
+            assert (cache.hits, stats['source'], stats['attempts']) == (0, 'llm', 1)
+            
+            rules, stats = synthesize_with_deadline(PATTERNS, [], [], deadline=10, cache=cache)
+            assert (cache.hits, stats['source'], stats['attempts']) == (1, 'llm', 0)
+    
+    def test_no_api_key(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.delenv("CURSOR_OPENAI_API_KEY", raising=False)
+        
+        rules, stats = synthesize_with_deadline(PATTERNS, [], [])
+        
+        assert stats['fallback'] == 'no_backend'
+        assert stats['attempts'] == 0
+        assert rules.split('\n', 2)[2] == synthesize_rules_basic(PATTERNS, []).split('\n', 2)[2]
@@ -0,0 +1,96 @@
+"""Tests for the trends module."""
+
+from datetime import date, datetime, timedelta
+
+from cursorhabits.analyzer import PatternMatcher
+from cursorhabits.trends import PatternCube, TOTAL, sparkline, to_day
+
+
+def _ms(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).timestamp() * 1000
+
+
+class TestPatternCube:
+    """Tests for PatternCube."""
+    
+    def test_window_and_week_over_week(self, tmp_path):
+        messages = [
+            {"text": "Always push to GitHub", "created_at": _ms(1)},
+            {"text": "Always push to GitHub again", "created_at": _ms(2), "workspace": "ws1"},
+            {"text": "Always push to GitHub later", "created_at": _ms(9)},
+            {"text": "Deploy to vercel", "composer_id": "c1"},
+            {"text": "No timestamp anywhere"},
+        ]
+        
+        with PatternCube(tmp_path / "cube.sqlite") as cube:
+            placed = cube.rebuild(messages, {"c1": _ms(3)})
+            
+            assert placed == 4
+            assert cube.window_counts(7) == {TOTAL: 3, "github_push": 2, "vercel_deploy": 1}
+            assert cube.window_counts(30, workspace="ws1") == {TOTAL: 1, "github_push": 1}
+            assert cube.week_over_week()["github_push"] == (2, 1)
+            
+            assert cube.daily_series(3)["github_push"] == [1, 1, 0]
+    
+    def test_rebuild_replaces_contents(self, tmp_path):
+        with PatternCube(tmp_path / "cube.sqlite") as cube:
+            cube.rebuild([{"text": "Always push to GitHub", "created_at": _ms(0)}])
+            cube.rebuild([])
+            assert cube.window_counts(7) == {}
+            assert cube.built_at > 0
+    
+    def test_update_counts_only_read_bubbles(self, tmp_path):
+        with PatternCube(tmp_path / "cube.sqlite") as cube:
+            assert cube.needs_rebuild()
+            cube.rebuild([
+                {"text": "Always push to GitHub", "composer_id": "c1", "bubble_id": "b1", "created_at": _ms(5)},
+                {"text": "Always push to GitHub now", "composer_id": "c1", "bubble_id": "b2", "created_at": _ms(2)},
+            ], sources={"state.vscdb": [2, 2]})
+            assert cube.is_current({"state.vscdb": [2, 2]})
+            assert not cube.is_current({"state.vscdb": [3, 3]})
+            assert cube.sources == {"state.vscdb": [2, 2]}
+            
+            # A new bubble in an old chat counts on its composer's day, however long ago
+            new = [{"text": "Deploy to vercel", "composer_id": "c0", "bubble_id": "b9"}]
+            assert cube.update(new, {"c0": _ms(20)}, sources={"state.vscdb": [3, 3]}) == 1
+            
+            assert cube.window_counts(7) == {TOTAL: 2, "github_push": 2}
+            assert cube.window_counts(30) == {TOTAL: 3, "github_push": 2, "vercel_deploy": 1}
+            assert cube.is_current({"state.vscdb": [3, 3]})
+    
+    def test_update_replaces_a_rewritten_bubble(self, tmp_path):
+        with PatternCube(tmp_path / "cube.sqlite") as cube:
+            cube.rebuild([{"text": "Always push to GitHub", "composer_id": "c1", "bubble_id": "b1", "created_at": _ms(2)}])
+            
+            rewritten = [{"text": "Deploy to vercel", "composer_id": "c1", "bubble_id": "b1", "created_at": _ms(1)}]
+            cube.update(rewritten)
+            assert cube.window_counts(7) == {TOTAL: 1, "vercel_deploy": 1}
+            
+            # Read again but filtered out as noise: its earlier counts go
+            cube.update([], read=[("c1", "b1")])
+            assert cube.window_counts(7) == {}
+    
+    def test_different_patterns_rebuild(self, tmp_path):
+        matcher = PatternMatcher([("tabs", r"\btabs\b", "Tabs")])
+        
+        with PatternCube(tmp_path / "cube.sqlite") as cube:
+            cube.rebuild([{"text": "Always push to GitHub", "created_at": _ms(5)}])
+            
+            assert cube.needs_rebuild(matcher)
+            cube.update([{"text": "Use tabs please", "created_at": _ms(5)}], matcher=matcher)
+            assert cube.window_counts(7) == {TOTAL: 1, "tabs": 1}
+
+
+class TestHelpers:
+    """Tests for to_day and sparkline."""
+    
+    def test_to_day_accepts_ms_and_iso(self):
+        today = date.today().toordinal()
+        assert to_day(datetime.now().timestamp() * 1000) == today
+        assert to_day(datetime.now().isoformat()) == today
+        assert to_day("not a date") is None
+    
+    def test_sparkline(self):
+        assert sparkline([0, 4, 8]) == "▁▅█"
+        assert sparkline([0, 0]) == "▁▁"
+        assert len(sparkline(list(range(100)), width=10)) == 10